@@ -4,15 +4,26 @@ Application package initializer and app factory.
 """
 
 import os
-from flask import Flask, Blueprint
-from .config import Config
-from .extensions import db, migrate, jwt, cors, limiter, logger_setup
 
-def _clone_blueprint(bp: Blueprint, new_name: str) -> Blueprint:
+# Flask and the extensions are only imported by create_app() and on first
+# access to app.db & co., so spawned worker processes can import
+# app.services.attachment_stages without loading them.
+_EXTENSIONS = ("db", "migrate", "jwt", "cors", "limiter", "logger_setup")
+
+
+def __getattr__(name):
+    if name in _EXTENSIONS:
+        from . import extensions
+        return getattr(extensions, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _clone_blueprint(bp: "Blueprint", new_name: str) -> "Blueprint":
     """
     Create a shallow clone of a Blueprint so it can be registered again
     under a different name / url_prefix.
     """
+    from flask import Blueprint
+
     new_bp = Blueprint(new_name, bp.import_name, url_prefix=bp.url_prefix,
                        template_folder=bp.template_folder, static_folder=bp.static_folder)
     # copy deferred functions so route registration is duplicated
@@ -20,6 +31,10 @@ def _clone_blueprint(bp: Blueprint, new_name: str) -> Blueprint:
     return new_bp
 
 def create_app(config_object=None):
+    from flask import Flask
+    from .config import Config
+    from .extensions import db, migrate, jwt, cors, limiter, logger_setup
+
     app = Flask(__name__, instance_relative_config=False)
 
     # load config
@@ -75,6 +90,49 @@ def create_app(config_object=None):
     except Exception:
         app.logger.exception("Failed to clone/register /admin alias")
 
+    # request metrics + GET /metrics
+    from app.services.metrics import init_metrics
+    init_metrics(app)
+
+    # per-request SQL profile headers/log fields (SQL_PROFILE_ENABLED)
+    from app.services.sqlprofile import init_sql_profiler
+    init_sql_profiler(app)
+
+    # DB pool metrics + GET /ready
+    from app.services.pool import init_pool_telemetry
+    init_pool_telemetry(app)
+
+    # per-endpoint-class concurrency limits (ADMISSION_LIMITS)
+    from app.services.admission import init_admission
+    init_admission(app)
+
+    # listing result cache (LIST_CACHE_BACKEND)
+    from app.services.listcache import init_list_cache
+    init_list_cache(app)
+
+    # in-process hub behind the SSE change feed
+    from app.services.events import init_change_feed
+    init_change_feed(app)
+
+    # full-text search backend (SEARCH_BACKEND)
+    from app.services.search import init_search
+    init_search(app)
+
+    # attachment byte storage
+    from app.services.storage import init_storage
+    init_storage(app)
+    from app.services.uploads import init_uploads
+    init_uploads(app)
+    from app.services.blobs import init_blob_gc
+    init_blob_gc(app)
+    # post-upload attachment processing (PROCESSING_WORKERS)
+    from app.services.processing import init_processing
+    init_processing(app)
+
+    # optional background audit writer (AUDIT_ASYNC)
+    from app.services.audit import init_audit_writer
+    init_audit_writer(app)
+
     @app.route("/health")
     def health():
         return {"status": "ok"}
@@ -1,6 +1,10 @@
 # app/auth/utils.py
-from typing import Any, Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 
+from flask import current_app
 from flask_jwt_extended import create_access_token, create_refresh_token
 
 
@@ -8,35 +12,116 @@ def make_tokens(user) -> Dict[str, str]:
     """
     Create access & refresh tokens embedding user's role.
     `user` can be a model instance with .id and .role attributes.
+    The user's token_version is embedded as `tv` so role changes can
+    invalidate outstanding tokens (see resolve_role).
     """
     identity = str(user.id)
-    additional = {"role": getattr(user, "role", "user")}
+    additional = {"role": getattr(user, "role", "user"), "tv": getattr(user, "token_version", 0) or 0}
     access = create_access_token(identity=identity, additional_claims=additional)
     refresh = create_refresh_token(identity=identity, additional_claims=additional)
     return {"access_token": access, "refresh_token": refresh}
 
 
-def get_role_from_token_or_db(claims: Dict[str, Any], identity: Optional[str]) -> str:
+class RoleCache:
     """
-    Read 'role' from JWT claims if present, otherwise fallback to DB lookup.
-    Import User lazily here to avoid circular imports at module import time.
-    """
-    # 1) Try token claims first
-    if isinstance(claims, dict):
-        role = claims.get("role")
-        if role:
-            return role
-
-    # 2) Fallback: lazy import to avoid circular dependency
-    try:
-        from app.models import User  # local import
-    except Exception:
-        return "user"
+    Per-process TTL + LRU cache of user id -> (role, token_version).
+    Entries are dropped explicitly when a role changes in this process;
+    other processes pick the change up when their entry expires.
+    """
+
+    def __init__(self, maxsize=10000, ttl=30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            item = self._data.get(user_id)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return value
+
+    def set(self, user_id, value):
+        with self._lock:
+            self._data[user_id] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
 
+    def invalidate(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+
+def get_role_cache() -> RoleCache:
+    cache = current_app.extensions.get("role_cache")
+    if cache is None:
+        cache = RoleCache(
+            maxsize=int(current_app.config.get("ROLE_CACHE_SIZE", 10000)),
+            ttl=float(current_app.config.get("ROLE_CACHE_TTL", 30)),
+        )
+        current_app.extensions["role_cache"] = cache
+    return cache
+
+
+def lookup_role(identity: Optional[str]) -> Optional[Tuple[str, int]]:
+    """
+    Return the user's current (role, token_version), from the role cache
+    when possible, else from the DB. None if the user does not exist.
+    """
     if identity is None:
+        return None
+    cache = get_role_cache()
+    cached = cache.get(identity)
+    if cached is not None:
+        return cached
+
+    # lazy import to avoid circular dependency
+    from app.extensions import db
+    from app.models import User
+
+    row = db.session.query(User.role, User.token_version).filter(User.id == identity).first()
+    if row is None:
+        return None
+    value = (row.role, row.token_version or 0)
+    cache.set(identity, value)
+    return value
+
+
+def invalidate_role(identity: str) -> None:
+    """Drop a user's cached role after it changed."""
+    get_role_cache().invalidate(identity)
+
+
+def resolve_role(claims: Dict[str, Any], identity: Optional[str]) -> str:
+    """
+    Role for the current request without a DB round trip in the common case.
+    The role claim is trusted while the token's `tv` matches the user's
+    current token_version; a stale token gets the current role instead.
+    Returns 'user' for unknown identities.
+    """
+    current = lookup_role(identity)
+    if current is None:
         return "user"
+    role, version = current
+    if isinstance(claims, dict) and claims.get("role") and (claims.get("tv") or 0) == version:
+        return claims["role"]
+    return role
 
-    user = User.query.get(identity)
-    if user:
-        return getattr(user, "role", "user")
-    return "user"
+
+def get_role_from_token_or_db(claims: Dict[str, Any], identity: Optional[str]) -> str:
+    """
+    Read 'role' from JWT claims if present, otherwise fallback to DB lookup.
+    Both paths go through the cached resolver, so a token issued before a
+    promote/demote no longer carries the old role.
+    """
+    if identity is None:
+        role = claims.get("role") if isinstance(claims, dict) else None
+        return role or "user"
+    return resolve_role(claims, identity)
@@ -21,6 +21,143 @@ class Config:
 
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000")
     RATELIMIT_STORAGE_URI = "memory://"   # explicit - ok for dev only
+    # role resolver cache (app/auth/utils.py): per-process, so a role change
+    # made in another worker is seen after at most ROLE_CACHE_TTL seconds
+    ROLE_CACHE_TTL = float(os.getenv("ROLE_CACHE_TTL", "30"))
+    ROLE_CACHE_SIZE = int(os.getenv("ROLE_CACHE_SIZE", "10000"))
+    # password hashing pool (app/services/passwords.py)
+    PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt")   # bcrypt | pbkdf2
+    PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+    PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "600000"))
+    PASSWORD_HASH_POOL = os.getenv("PASSWORD_HASH_POOL", "process")      # process | thread
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "8"))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+    PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+    # /metrics (app/services/metrics.py). Set METRICS_MULTIPROC_DIR to a
+    # directory shared by all gunicorn workers to aggregate across them
+    # (and call metrics.mark_process_dead from gunicorn's child_exit hook).
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+    METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1.0"))
+    # GET /ready (app/services/pool.py): not ready once checked-out
+    # connections reach this fraction of pool_size + max_overflow; the DB
+    # ping behind it is cached for READY_PING_TTL seconds
+    READY_POOL_SATURATION = float(os.getenv("READY_POOL_SATURATION", "1.0"))
+    READY_PING_TTL = float(os.getenv("READY_PING_TTL", "2.0"))
+    # admission control (app/services/admission.py): concurrent requests per
+    # endpoint class; excess requests get 503 + Retry-After. Limits shrink
+    # while the smoothed pool checkout wait is above ADMISSION_TARGET_WAIT.
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+    ADMISSION_LIMITS = os.getenv("ADMISSION_LIMITS", "listing=16,export=4,auth=8,events=64,uploads=8")
+    ADMISSION_TARGET_WAIT = float(os.getenv("ADMISSION_TARGET_WAIT", "0.05"))
+    ADMISSION_ADJUST_INTERVAL = float(os.getenv("ADMISSION_ADJUST_INTERVAL", "1.0"))
+    ADMISSION_MIN_LIMIT = int(os.getenv("ADMISSION_MIN_LIMIT", "1"))
+    ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+    # GET /api/applications/ result cache (app/services/listcache.py):
+    # memory (per process) | sqlite (shared by the workers of one host) | none
+    # Either way writes invalidate every worker at commit: the generation
+    # counters are in the database (listing_generations). sqlite only
+    # shares the cached pages, so workers also share their hits.
+    LIST_CACHE_BACKEND = os.getenv("LIST_CACHE_BACKEND", "memory")
+    LIST_CACHE_PATH = os.getenv("LIST_CACHE_PATH")  # default: <instance>/list_cache.sqlite
+    LIST_CACHE_SIZE = int(os.getenv("LIST_CACHE_SIZE", "1024"))
+    LIST_CACHE_TTL = float(os.getenv("LIST_CACHE_TTL", "30"))
+    # SSE change feed (app/services/events.py). Each open stream holds a
+    # worker thread, so serve it from threaded/async workers; streams end
+    # after SSE_MAX_SECONDS and clients resume with Last-Event-ID.
+    SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+    SSE_MAX_SECONDS = float(os.getenv("SSE_MAX_SECONDS", "300"))
+    SSE_REPLAY_GRACE = float(os.getenv("SSE_REPLAY_GRACE", "2"))
+    SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "1000"))
+    # GET /api/applications/search (app/services/search.py):
+    # auto (fts5 on SQLite, oracle on Oracle, else memory) | fts5 | oracle | memory
+    SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+    SEARCH_MEMORY_REFRESH = float(os.getenv("SEARCH_MEMORY_REFRESH", "300"))
+    # memory backend: start building the index when the app is created
+    # instead of on the first search (which then waits for it)
+    SEARCH_MEMORY_WARM = os.getenv("SEARCH_MEMORY_WARM", "true").lower() in ("1", "true", "yes")
+    # search pages walk a per-process snapshot of the first page's top
+    # SEARCH_SNAPSHOT_SIZE hits, kept SEARCH_SNAPSHOT_TTL seconds
+    SEARCH_SNAPSHOT_SIZE = int(os.getenv("SEARCH_SNAPSHOT_SIZE", "1000"))
+    SEARCH_SNAPSHOT_TTL = float(os.getenv("SEARCH_SNAPSHOT_TTL", "300"))
+    SEARCH_SNAPSHOT_CACHE_SIZE = int(os.getenv("SEARCH_SNAPSHOT_CACHE_SIZE", "256"))
+    # attachment storage (app/services/storage.py). A relative UPLOAD_FOLDER
+    # is resolved against the instance folder; uploads are streamed in
+    # STORAGE_CHUNK_SIZE pieces and rejected beyond ATTACHMENT_MAX_BYTES.
+    # Set USE_X_SENDFILE=true when a front-end proxy serves the files.
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+    UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "uploads")
+    STORAGE_CHUNK_SIZE = int(os.getenv("STORAGE_CHUNK_SIZE", str(1024 * 1024)))
+    ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(25 * 1024 * 1024)))
+    USE_X_SENDFILE = os.getenv("USE_X_SENDFILE", "false").lower() in ("1", "true", "yes")
+    # STORAGE_BACKEND=s3: blobs in S3_BUCKET (any S3-compatible store via
+    # S3_ENDPOINT_URL; credentials fall back to the usual AWS chain).
+    # UPLOAD_FOLDER then only spools uploads in flight. Objects above
+    # S3_MULTIPART_THRESHOLD go up as multipart uploads, S3_MAX_CONCURRENCY
+    # parts at a time per worker; downloads redirect to presigned URLs valid
+    # for S3_URL_EXPIRES seconds.
+    S3_BUCKET = os.getenv("S3_BUCKET", "")
+    S3_PREFIX = os.getenv("S3_PREFIX", "attachments/")
+    S3_REGION = os.getenv("S3_REGION", "")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")
+    S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY", "")
+    S3_SECRET_KEY = os.getenv("S3_SECRET_KEY", "")
+    S3_ADDRESSING_STYLE = os.getenv("S3_ADDRESSING_STYLE", "auto")
+    S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))
+    S3_MULTIPART_CHUNKSIZE = int(os.getenv("S3_MULTIPART_CHUNKSIZE", str(8 * 1024 * 1024)))
+    S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "8"))
+    S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32"))
+    S3_URL_EXPIRES = int(os.getenv("S3_URL_EXPIRES", "300"))
+    # resumable uploads (app/services/uploads.py): sessions expire this many
+    # seconds after their last chunk
+    UPLOAD_SESSION_TTL = float(os.getenv("UPLOAD_SESSION_TTL", "86400"))
+    UPLOAD_DIGEST_CACHE_SIZE = int(os.getenv("UPLOAD_DIGEST_CACHE_SIZE", "1024"))
+    # blob GC (app/services/blobs.py): removes attachment blobs unreferenced
+    # for BLOB_GC_GRACE seconds and expired upload sessions. 0 = no
+    # background thread; run scripts/attachment_gc.py from cron instead.
+    BLOB_GC_INTERVAL = float(os.getenv("BLOB_GC_INTERVAL", "0"))
+    BLOB_GC_BATCH_SIZE = int(os.getenv("BLOB_GC_BATCH_SIZE", "100"))
+    BLOB_GC_GRACE = float(os.getenv("BLOB_GC_GRACE", "3600"))
+    # post-upload processing (app/services/processing.py): PROCESSING_STAGES
+    # run on PROCESSING_WORKERS background threads, optionally handing the
+    # work to a process pool (PROCESSING_EXECUTOR=process). Off by default so
+    # CLI commands and scripts don't start a pool; set it for the web
+    # workers, or run scripts/process_attachments.py. Failures are retried
+    # with exponential backoff from PROCESSING_RETRY_BACKOFF seconds.
+    PROCESSING_WORKERS = int(os.getenv("PROCESSING_WORKERS", "0"))
+    PROCESSING_EXECUTOR = os.getenv("PROCESSING_EXECUTOR", "thread")
+    PROCESSING_STAGES = os.getenv("PROCESSING_STAGES", "checksum,sniff")
+    PROCESSING_MAX_ATTEMPTS = int(os.getenv("PROCESSING_MAX_ATTEMPTS", "5"))
+    PROCESSING_RETRY_BACKOFF = float(os.getenv("PROCESSING_RETRY_BACKOFF", "30"))
+    PROCESSING_LEASE = float(os.getenv("PROCESSING_LEASE", "300"))
+    PROCESSING_POLL_INTERVAL = float(os.getenv("PROCESSING_POLL_INTERVAL", "30"))
+    PROCESSING_BATCH_SIZE = int(os.getenv("PROCESSING_BATCH_SIZE", "100"))
+    PROCESSING_QUEUE_MAXSIZE = int(os.getenv("PROCESSING_QUEUE_MAXSIZE", "1000"))
+    # per-request SQL profiler (app/services/sqlprofile.py): statement count,
+    # DB time and repeated statements (likely N+1) as X-SQL-* headers / log fields
+    SQL_PROFILE_ENABLED = os.getenv("SQL_PROFILE_ENABLED", "false").lower() in ("1", "true", "yes")
+    SQL_PROFILE_HEADERS = os.getenv("SQL_PROFILE_HEADERS", "true").lower() in ("1", "true", "yes")
+    SQL_PROFILE_LOG = os.getenv("SQL_PROFILE_LOG", "true").lower() in ("1", "true", "yes")
+    SQL_PROFILE_N1_THRESHOLD = int(os.getenv("SQL_PROFILE_N1_THRESHOLD", "3"))
+    SQL_PROFILE_SLOWEST = int(os.getenv("SQL_PROFILE_SLOWEST", "3"))
     # JWT defaults
     JWT_ACCESS_TOKEN_EXPIRES_MINUTES = 15
     JWT_REFRESH_TOKEN_EXPIRES_DAYS = 7
+
+    # rows fetched per server-side cursor batch by GET /api/applications/export
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    # upper bound on ids accepted by POST /api/applications/bulk-transition
+    BULK_TRANSITION_MAX_IDS = int(os.getenv("BULK_TRANSITION_MAX_IDS", "1000"))
+    # batch submit: rows accepted per request / rows written per commit
+    SUBMIT_BATCH_MAX_ROWS = int(os.getenv("SUBMIT_BATCH_MAX_ROWS", "5000"))
+    SUBMIT_BATCH_CHUNK_SIZE = int(os.getenv("SUBMIT_BATCH_CHUNK_SIZE", "500"))
+
+    # Async audit writer (app/services/audit.py). Off by default: audit rows
+    # are then committed on the request path as before.
+    AUDIT_ASYNC = os.getenv("AUDIT_ASYNC", "false").lower() in ("1", "true", "yes")
+    AUDIT_SPOOL_DIR = os.getenv("AUDIT_SPOOL_DIR")  # default: <instance>/audit_spool
+    AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+    AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+    AUDIT_QUEUE_MAXSIZE = int(os.getenv("AUDIT_QUEUE_MAXSIZE", "10000"))
+    AUDIT_SPOOL_FSYNC = os.getenv("AUDIT_SPOOL_FSYNC", "true").lower() in ("1", "true", "yes")
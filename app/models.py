@@ -1,9 +1,8 @@
 # app/models.py
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Text, Integer, ForeignKey
+from sqlalchemy import Column, String, DateTime, Text, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.extensions import db
 
 
@@ -21,6 +20,8 @@ class User(db.Model):
     email = Column(String(255), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
     role = Column(String(30), nullable=False, default="user", index=True)
+    # bumped on every role change; tokens carry it as the `tv` claim
+    token_version = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
@@ -40,8 +41,9 @@ class User(db.Model):
         """
         if raw_password is None:
             raise ValueError("Password cannot be None")
-        # method uses pbkdf2:sha256 by default via werkzeug
-        self.password_hash = generate_password_hash(raw_password)
+        # runs inline (scripts / tests); request handlers use the hashing pool
+        from app.services.passwords import configured_params, hash_password_sync
+        self.password_hash = hash_password_sync(raw_password, **configured_params())
 
     def check_password(self, raw_password: str) -> bool:
         """
@@ -49,7 +51,8 @@ class User(db.Model):
         """
         if not self.password_hash:
             return False
-        return check_password_hash(self.password_hash, raw_password)
+        from app.services.passwords import verify_password_sync
+        return verify_password_sync(raw_password, self.password_hash)
 
 
 
@@ -58,6 +61,13 @@ class User(db.Model):
 # -----------------------
 class Application(db.Model):
     __tablename__ = "applications"
+    __table_args__ = (
+        # keyset pagination walks (created_at DESC, id DESC), optionally
+        # narrowed by the status / department filters of the list endpoint
+        Index("ix_applications_created_at_id", "created_at", "id"),
+        Index("ix_applications_status_created_at", "status", "created_at", "id"),
+        Index("ix_applications_department_created_at", "department", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=gen_uuid, unique=True, nullable=False)
     sr_no = Column(Integer, nullable=False, index=True)
@@ -73,9 +83,9 @@ class Application(db.Model):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
-    # Relationships
-    creator = relationship("User", backref="applications", lazy="joined")
-    attachments = relationship("Attachment", back_populates="application", lazy="joined")
+    # Relationships (lazy by default; each endpoint declares its own loader options)
+    creator = relationship("User", backref="applications", lazy="select")
+    attachments = relationship("Attachment", back_populates="application", lazy="select")
 
     def to_dict(self):
         return {
@@ -107,9 +117,9 @@ class ActionLog(db.Model):
     comment = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
-    # Relationships
-    application = relationship("Application", backref="action_logs", lazy="joined")
-    actor = relationship("User", lazy="joined")
+    # Relationships (lazy by default; each endpoint declares its own loader options)
+    application = relationship("Application", backref="action_logs", lazy="select")
+    actor = relationship("User", lazy="select")
 
     def to_dict(self):
         # actor_role is derived from the related User (no schema change needed)
@@ -137,9 +147,22 @@ class Attachment(db.Model):
     filename = Column(String(255), nullable=False)
     mime_type = Column(String(100), nullable=False)
     size = Column(Integer, nullable=False)
+    # where the bytes live in the storage backend (app/services/storage.py)
+    storage_key = Column(String(255), nullable=True)
+    # SHA-256 of the content; shared blobs are ref-counted in attachment_blobs
+    digest = Column(String(64), ForeignKey("attachment_blobs.digest"), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # post-upload processing (app/services/processing.py):
+    # pending -> processing -> ready | failed; pending again between retries
+    processing_status = Column(String(20), nullable=False, default="pending", index=True)
+    processing_attempts = Column(Integer, nullable=False, default=0)
+    # pending: not before; processing: the worker's lease runs out
+    processing_due_at = Column(DateTime, nullable=True)
+    processing_error = Column(String(500), nullable=True)
+    processed_at = Column(DateTime, nullable=True)
+    detected_mime_type = Column(String(100), nullable=True)
 
-    application = relationship("Application", back_populates="attachments", lazy="joined")
+    application = relationship("Application", back_populates="attachments", lazy="select")
 
     def to_dict(self):
         return {
@@ -149,4 +172,107 @@ class Attachment(db.Model):
             "mime_type": self.mime_type,
             "size": self.size,
             "created_at": self.created_at.isoformat() if self.created_at else None,
+            "processing_status": self.processing_status,
         }
+
+
+# -----------------------
+# AttachmentBlob model
+# -----------------------
+class AttachmentBlob(db.Model):
+    """
+    One stored file, shared by every Attachment with the same content.
+    refcount is maintained by app/services/blobs.py; blobs that stay
+    unreferenced for the GC grace period are removed with their bytes.
+    """
+    __tablename__ = "attachment_blobs"
+
+    digest = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # set when refcount drops to 0, cleared when it is referenced again
+    unreferenced_at = Column(DateTime, nullable=True, index=True)
+
+    def to_dict(self):
+        return {
+            "digest": self.digest,
+            "size": self.size,
+            "refcount": self.refcount,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+# -----------------------
+# UploadSession model
+# -----------------------
+class UploadSession(db.Model):
+    """
+    A resumable attachment upload in progress (app/services/uploads.py).
+    The bytes received so far are the session file in storage; its size is
+    the upload offset. Completed sessions become an Attachment and are
+    deleted, abandoned ones are removed after expires_at.
+    """
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(36), primary_key=True, default=gen_uuid, nullable=False)
+    application_id = Column(String(36), ForeignKey("applications.id"), nullable=False, index=True)
+    created_by = Column(String(36), ForeignKey("users.id"), nullable=False)
+    filename = Column(String(255), nullable=False)
+    mime_type = Column(String(100), nullable=False)
+    size = Column(Integer, nullable=False)
+    # hex SHA-256 announced by the client, checked before the attachment is created
+    sha256 = Column(String(64), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def to_dict(self, offset=None):
+        return {
+            "id": self.id,
+            "application_id": self.application_id,
+            "filename": self.filename,
+            "mime_type": self.mime_type,
+            "size": self.size,
+            "offset": offset,
+            "sha256": self.sha256,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+        }
+
+
+# -----------------------
+# ApplicationStat model
+# -----------------------
+class ApplicationStat(db.Model):
+    """
+    Running count of applications per (department, status).
+    Maintained in the same transaction as every write that creates an
+    application or changes its status; see app/services/stats.py.
+    """
+    __tablename__ = "application_stats"
+
+    department = Column(String(100), primary_key=True)
+    status = Column(String(50), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "department": self.department,
+            "status": self.status,
+            "total": self.total,
+        }
+
+
+# -----------------------
+# ListingGeneration model
+# -----------------------
+class ListingGeneration(db.Model):
+    """
+    Write counter per department for the listing cache key. Bumped in the
+    same transaction as the write, so every worker reads the new value as
+    soon as it commits; see app/services/listcache.py.
+    """
+    __tablename__ = "listing_generations"
+
+    department = Column(String(100), primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
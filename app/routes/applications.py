@@ -1,9 +1,40 @@
 # app/routes/applications.py
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+import csv
+import io
+import json
+import mimetypes
+from datetime import datetime
+from flask import (
+    Blueprint, Response, current_app, redirect, request, jsonify, send_file, stream_with_context, url_for,
+)
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from sqlalchemy import func, select
+from app.auth.utils import resolve_role
 from app.extensions import db
-from app.models import Application, ActionLog, User
+from app.models import Application, ActionLog, Attachment, UploadSession, User
+from app.services.admission import admission_limited
 from app.services.audit import create_action_log
+from app.services.blobs import release_blob, store_attachment
+from app.services.etags import client_has, make_etag, not_modified, with_etag
+from app.services.events import event_stream
+from app.services.fields import DETAIL_DEFAULT_FIELDS, LIST_DEFAULT_FIELDS, InvalidFields, parse_fields
+from app.services.pagination import decode_cursor, keyset_page, InvalidCursor
+from app.services.processing import processing_status
+from app.services.search import InvalidQuery, index_applications, search_page
+from app.services.serializers import application_select, application_serializer, logs_select, serialize_logs
+from app.services.stats import get_stats, record_transition
+from app.services.storage import OffsetMismatch, SessionBusy, TooLarge, get_storage
+from app.services.uploads import (
+    UploadError,
+    append_chunk,
+    cancel_session,
+    complete_session,
+    create_session,
+    current_offset,
+    parse_chunk_offset,
+    parse_sha256,
+)
+from app.services.workflow import TRANSITIONS, bulk_transition, chunked, submit_many, transition
 from flask import jsonify, request, Blueprint
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..models import Application
@@ -12,21 +43,15 @@ from ..extensions import db
 
 app_bp = Blueprint("applications_bp", __name__)
 
+# Read views select plain rows (app.services.serializers) rather than ORM
+# instances; the models are used for writes.
 
-@app_bp.route("/", methods=["POST"])
-@jwt_required()
-def submit():
-    data = request.get_json() or {}
-    expected = ["sr_no", "purpose", "department", "emp_no", "emp_name"]
-    missing = [f for f in expected if f not in data]
-    if missing:
-        return jsonify({"msg": "missing fields", "missing": missing}), 400
+REQUIRED_FIELDS = ["sr_no", "purpose", "department", "emp_no", "emp_name"]
+OPTIONAL_FIELDS = ["designation", "remarks"]
 
-    created_by = get_jwt_identity()
-    if not created_by:
-        return jsonify({"msg": "invalid token / identity"}), 401
 
-    app_data = {
+def _application_data(data, created_by):
+    return {
         "sr_no": data.get("sr_no"),
         "purpose": data.get("purpose"),
         "department": data.get("department"),
@@ -39,9 +64,56 @@ def submit():
         "status": "submitted",
     }
 
-    app_obj = Application(**app_data)
+
+def _invalid_fields(row):
+    """
+    Field -> problem for a batch row whose values would fail the insert:
+    sr_no must be an integer, the other fields strings that fit their
+    column, and the required ones non-empty.
+    """
+    columns = Application.__table__.c
+    problems = {}
+    sr_no = row.get("sr_no")
+    if not isinstance(sr_no, int) or isinstance(sr_no, bool):
+        problems["sr_no"] = "must be an integer"
+    for field in REQUIRED_FIELDS[1:] + OPTIONAL_FIELDS:
+        value = row.get(field)
+        if value is None:
+            if field in REQUIRED_FIELDS:
+                problems[field] = "must not be null"
+        elif not isinstance(value, str):
+            problems[field] = "must be a string"
+        elif field in REQUIRED_FIELDS and not value.strip():
+            problems[field] = "must not be empty"
+        elif columns[field].type.length and len(value) > columns[field].type.length:
+            problems[field] = f"longer than {columns[field].type.length} characters"
+    return problems
+
+
+@app_bp.route("/", methods=["POST"])
+@jwt_required()
+def submit():
+    """
+    Submit one application (JSON object) or a batch (JSON array of objects).
+    """
+    data = request.get_json(silent=True)
+    if isinstance(data, list):
+        return _submit_batch(data)
+    data = data or {}
+    missing = [f for f in REQUIRED_FIELDS if f not in data]
+    if missing:
+        return jsonify({"msg": "missing fields", "missing": missing}), 400
+
+    created_by = get_jwt_identity()
+    if not created_by:
+        return jsonify({"msg": "invalid token / identity"}), 401
+
+    app_obj = Application(**_application_data(data, created_by))
     db.session.add(app_obj)
     try:
+        db.session.flush()
+        index_applications([app_obj])
+        record_transition(app_obj.department, None, app_obj.status)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
@@ -62,59 +134,108 @@ def submit():
     return jsonify(app_obj.to_dict()), 201
 
 
+def _submit_batch(rows):
+    """
+    Batch form of submit. Every row is validated (required fields present,
+    values of the right type and length) before anything is written; valid
+    rows are inserted with their 'created' ActionLogs via executemany, one
+    transaction per SUBMIT_BATCH_CHUNK_SIZE rows.
+
+    Returns 201 when every row was created, 207 when only some were, and
+    400 when none were; `results` carries one entry per input row.
+    """
+    created_by = get_jwt_identity()
+    if not created_by:
+        return jsonify({"msg": "invalid token / identity"}), 401
+
+    max_rows = int(current_app.config.get("SUBMIT_BATCH_MAX_ROWS", 5000))
+    if not rows:
+        return jsonify({"msg": "empty batch"}), 400
+    if len(rows) > max_rows:
+        return jsonify({"msg": "batch too large", "max": max_rows}), 400
+
+    results = [None] * len(rows)
+    valid = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            results[index] = {"index": index, "status": "invalid", "msg": "row must be an object"}
+            continue
+        missing = [f for f in REQUIRED_FIELDS if f not in row]
+        if missing:
+            results[index] = {"index": index, "status": "invalid", "msg": "missing fields", "missing": missing}
+            continue
+        invalid = _invalid_fields(row)
+        if invalid:
+            results[index] = {"index": index, "status": "invalid", "msg": "invalid fields", "invalid": invalid}
+            continue
+        valid.append((index, _application_data(row, created_by)))
+
+    chunk_size = int(current_app.config.get("SUBMIT_BATCH_CHUNK_SIZE", 500))
+    for chunk in chunked(valid, chunk_size):
+        try:
+            ids = submit_many([app_data for _, app_data in chunk], actor_id=created_by)
+        except Exception:
+            # the driver's message names tables, constraints and values: log it, don't return it
+            current_app.logger.exception("db error on batch submit")
+            for index, _ in chunk:
+                results[index] = {"index": index, "status": "error", "msg": "db error"}
+            continue
+        for (index, _), app_id in zip(chunk, ids):
+            results[index] = {"index": index, "status": "created", "id": app_id}
+
+    created = sum(1 for r in results if r["status"] == "created")
+    if created == len(rows):
+        code = 201
+    elif created:
+        code = 207
+    else:
+        code = 400
+    return jsonify({"created": created, "failed": len(rows) - created, "results": results}), code
+
+
 def _require_admin(identity):
     """
-    Helper: return User instance if admin, else None.
+    Helper: return True if the caller is an admin, else False.
+    Uses the JWT role claim / role cache, so the hot path skips the DB.
     """
-    user = User.query.get(identity)
-    if not user or user.role != "admin":
-        return None
-    return user
+    return resolve_role(get_jwt(), identity) == "admin"
 
 
-@app_bp.route("/<id>/verify", methods=["PATCH"])
-@jwt_required()
-def verify(id):
+def _transition(id, to_status):
     """
-    Verify an application.
-    Allowed only from status 'submitted' -> 'verified'.
-    Admin only.
-    Optional JSON body: { "note": "..."} or { "comment": "..." }.
+    Shared body of verify / approve: admin check, then one guarded UPDATE
+    plus its ActionLog in a single commit (see app.services.workflow).
     """
     identity = get_jwt_identity()
-    admin_user = _require_admin(identity)
-    if not admin_user:
+    if not _require_admin(identity):
         return jsonify({"msg": "admin required"}), 403
 
-    app_obj = Application.query.get(id)
-    if not app_obj:
-        return jsonify({"msg": "not found"}), 404
-
-    current = (app_obj.status or "").lower()
-    if current != "submitted":
-        return jsonify({"msg": "invalid transition", "from": current, "to": "verified"}), 400
+    payload = request.get_json(silent=True) or {}
+    note = payload.get("note") or payload.get("comment")
 
-    app_obj.status = "verified"
     try:
-        db.session.commit()
+        ok, current = transition(id, to_status, actor_id=identity, comment=note)
     except Exception as e:
-        db.session.rollback()
         return jsonify({"msg": "db error", "error": str(e)}), 500
 
-    payload = request.get_json(silent=True) or {}
-    note = payload.get("note") or payload.get("comment")
+    if not ok:
+        if current is None:
+            return jsonify({"msg": "not found"}), 404
+        return jsonify({"msg": "invalid transition", "from": current.lower(), "to": to_status}), 400
 
-    try:
-        create_action_log(
-            application_id=id,
-            action="verified",
-            actor_id=identity,
-            comment=note,
-        )
-    except Exception:
-        return jsonify({"msg": "verified (log failed)"}), 200
+    return jsonify({"msg": to_status}), 200
 
-    return jsonify({"msg": "verified"}), 200
+
+@app_bp.route("/<id>/verify", methods=["PATCH"])
+@jwt_required()
+def verify(id):
+    """
+    Verify an application.
+    Allowed only from status 'submitted' -> 'verified'.
+    Admin only.
+    Optional JSON body: { "note": "..."} or { "comment": "..." }.
+    """
+    return _transition(id, "verified")
 
 
 @app_bp.route("/<id>/approve", methods=["PATCH"])
@@ -126,40 +247,42 @@ def approve(id):
     Admin only.
     Optional JSON body: { "note": "..."} or { "comment": "..." }.
     """
-    identity = get_jwt_identity()
-    admin_user = _require_admin(identity)
-    if not admin_user:
-        return jsonify({"msg": "admin required"}), 403
+    return _transition(id, "approved")
 
-    app_obj = Application.query.get(id)
-    if not app_obj:
-        return jsonify({"msg": "not found"}), 404
 
-    current = (app_obj.status or "").lower()
-    if current != "verified":
-        return jsonify({"msg": "invalid transition", "from": current, "to": "approved"}), 400
-
-    app_obj.status = "approved"
-    try:
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"msg": "db error", "error": str(e)}), 500
+@app_bp.route("/bulk-transition", methods=["POST"])
+@jwt_required()
+def bulk_transition_view():
+    """
+    Verify or approve many applications in one request.
+    Admin only.
+    JSON body: { "ids": [...], "to": "verified" | "approved", "note": "..." }.
+    Returns the ids that transitioned and, for the rest, why they were skipped.
+    """
+    identity = get_jwt_identity()
+    if not _require_admin(identity):
+        return jsonify({"msg": "admin required"}), 403
 
     payload = request.get_json(silent=True) or {}
+    ids = payload.get("ids")
+    to_status = payload.get("to")
     note = payload.get("note") or payload.get("comment")
 
+    if to_status not in TRANSITIONS:
+        return jsonify({"msg": "to must be one of", "allowed": sorted(TRANSITIONS)}), 400
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, str) for i in ids):
+        return jsonify({"msg": "ids must be a non-empty list of strings"}), 400
+    max_ids = int(current_app.config.get("BULK_TRANSITION_MAX_IDS", 1000))
+    if len(ids) > max_ids:
+        return jsonify({"msg": "too many ids", "max": max_ids}), 400
+
     try:
-        create_action_log(
-            application_id=id,
-            action="approved",
-            actor_id=identity,
-            comment=note,
-        )
+        transitioned, skipped = bulk_transition(ids, to_status, actor_id=identity, comment=note)
     except Exception:
-        return jsonify({"msg": "approved (log failed)"}), 200
+        current_app.logger.exception("db error on bulk transition")
+        return jsonify({"msg": "db error"}), 500
 
-    return jsonify({"msg": "approved"}), 200
+    return jsonify({"to": to_status, "transitioned": transitioned, "skipped": skipped}), 200
 
 
 @app_bp.route("/<id>/logs", methods=["GET"])
@@ -168,35 +291,415 @@ def get_logs(id):
     """
     Return action logs for an application.
     Any authenticated user can see logs here (change if needed).
+    The ETag is built from the latest log timestamp and the log count, read
+    in the same query as the existence check; a matching If-None-Match gets
+    304 without loading the logs.
+    """
+    version = (
+        db.session.query(Application.id, func.max(ActionLog.created_at), func.count(ActionLog.id))
+        .outerjoin(ActionLog, ActionLog.application_id == Application.id)
+        .filter(Application.id == id)
+        .group_by(Application.id)
+        .first()
+    )
+    if not version:
+        return jsonify({"msg": "not found"}), 404
+    etag = make_etag("logs", *version)
+    if client_has(etag):
+        return not_modified(etag)
+
+    logs = serialize_logs(db.session.execute(logs_select(id)))
+    return with_etag((jsonify({"logs": logs}), 200), etag)
+
+
+# multipart framing (boundaries, part headers) on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+@app_bp.route("/<id>/attachments", methods=["POST"])
+@jwt_required()
+@admission_limited("uploads")
+def upload_attachment(id):
     """
-    app_obj = Application.query.get(id)
-    if not app_obj:
+    Store a file for an application. Either send the file as the raw
+    request body (Content-Type = the file's type, name in ?filename= or the
+    X-Filename header), which is streamed straight into storage, or as the
+    `file` field of a multipart/form-data body, which Werkzeug spools to a
+    temporary file first. Files over ATTACHMENT_MAX_BYTES get 413.
+    """
+    exists = db.session.query(Application.id).filter_by(id=id).first()
+    if not exists:
         return jsonify({"msg": "not found"}), 404
 
-    logs = (
-        ActionLog.query.filter_by(application_id=id)
-        .order_by(ActionLog.created_at.asc())
+    max_size = int(current_app.config.get("ATTACHMENT_MAX_BYTES", 25 * 1024 * 1024))
+    multipart = request.mimetype == "multipart/form-data"
+    declared = request.content_length
+    if declared is not None and declared > max_size + (MULTIPART_OVERHEAD if multipart else 0):
+        return jsonify({"msg": "attachment too large", "max_bytes": max_size}), 413
+
+    if multipart:
+        upload = request.files.get("file")
+        if upload is None:
+            return jsonify({"msg": "missing file field"}), 400
+        stream, filename, mime_type = upload.stream, upload.filename, upload.mimetype
+    else:
+        stream = request.stream
+        filename = request.args.get("filename") or request.headers.get("X-Filename")
+        mime_type = request.mimetype
+    if not filename:
+        return jsonify({"msg": "missing filename"}), 400
+    if not mime_type or mime_type == "application/octet-stream":
+        mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    storage = get_storage()
+    try:
+        staged = storage.stage(stream, max_size)
+    except TooLarge:
+        return jsonify({"msg": "attachment too large", "max_bytes": max_size}), 413
+
+    try:
+        att = store_attachment(storage, id, staged, filename, mime_type)
+    except Exception:
+        current_app.logger.exception("Failed to record attachment")
+        return jsonify({"msg": "failed to store attachment"}), 500
+    return _attachment_created(att)
+
+
+def _attachment_created(att):
+    response = jsonify(att.to_dict())
+    response.headers["Location"] = url_for(
+        ".download_attachment", id=att.application_id, attachment_id=att.id, _external=True
+    )
+    return response, 201
+
+
+@app_bp.route("/<id>/attachments", methods=["GET"])
+@jwt_required()
+def list_attachments(id):
+    """Attachment metadata of an application, oldest first."""
+    exists = db.session.query(Application.id).filter_by(id=id).first()
+    if not exists:
+        return jsonify({"msg": "not found"}), 404
+    rows = (
+        Attachment.query.filter_by(application_id=id)
+        .order_by(Attachment.created_at.asc(), Attachment.id.asc())
         .all()
     )
-    return jsonify({"logs": [log.to_dict() for log in logs]}), 200
+    return jsonify({"attachments": [a.to_dict() for a in rows]}), 200
+
+
+@app_bp.route("/<id>/attachments/<attachment_id>", methods=["GET"])
+@jwt_required()
+def download_attachment(id, attachment_id):
+    """
+    Download an attachment. The file is handed to the server's file
+    wrapper (or X-Sendfile) rather than read through Python; Range,
+    If-Range, If-None-Match and If-Modified-Since are honoured. Stored
+    bytes never change under a key (the content digest), so the key is
+    the ETag. With an object store the client is redirected to a
+    presigned URL instead.
+    """
+    att = Attachment.query.filter_by(id=attachment_id, application_id=id).first()
+    if att is None or not att.storage_key:
+        return jsonify({"msg": "not found"}), 404
+    storage = get_storage()
+    url = storage.download_url(att.storage_key, att.filename, att.mime_type)
+    if url is not None:
+        response = redirect(url, 302)
+        # the URL expires; never let a cache replay it
+        response.headers["Cache-Control"] = "private, no-store"
+        return response
+    path = storage.local_path(att.storage_key)
+    return send_file(
+        path if path is not None else storage.open(att.storage_key),
+        mimetype=att.mime_type,
+        as_attachment=True,
+        download_name=att.filename,
+        conditional=True,
+        etag=att.storage_key,
+        last_modified=att.created_at,
+    )
+
+
+@app_bp.route("/<id>/attachments/<attachment_id>/processing", methods=["GET"])
+@jwt_required()
+def attachment_processing(id, attachment_id):
+    """
+    Post-upload processing state of an attachment: status, attempts, last
+    error, sniffed content type and whether it contradicts the declared one.
+    """
+    att = Attachment.query.filter_by(id=attachment_id, application_id=id).first()
+    if att is None:
+        return jsonify({"msg": "not found"}), 404
+    return jsonify(processing_status(att)), 200
+
+
+@app_bp.route("/<id>/attachments/<attachment_id>", methods=["DELETE"])
+@jwt_required()
+def delete_attachment(id, attachment_id):
+    """
+    Remove an attachment (admin only). Its blob loses a reference; the
+    bytes are removed by the blob GC once no attachment uses them.
+    """
+    identity = get_jwt_identity()
+    if not _require_admin(identity):
+        return jsonify({"msg": "admin required"}), 403
+    att = Attachment.query.filter_by(id=attachment_id, application_id=id).first()
+    if att is None:
+        return jsonify({"msg": "not found"}), 404
+    digest = att.digest
+    db.session.delete(att)
+    try:
+        if digest:
+            db.session.flush()
+            release_blob(digest)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Failed to delete attachment")
+        return jsonify({"msg": "db error"}), 500
+    return "", 204
+
+
+def _upload_error(e):
+    return jsonify({"msg": str(e), **e.extra}), e.status
+
+
+def _upload_session(id, upload_id):
+    """The caller's own upload session for application `id`, or None."""
+    return UploadSession.query.filter_by(
+        id=upload_id, application_id=id, created_by=get_jwt_identity()
+    ).first()
+
+
+def _offset_response(body, status, offset):
+    response = jsonify(body)
+    response.headers["Upload-Offset"] = str(offset)
+    return response, status
+
+
+@app_bp.route("/<id>/uploads", methods=["POST"])
+@jwt_required()
+def create_upload(id):
+    """
+    Start a resumable upload. JSON body: filename, size (bytes), optional
+    mime_type and sha256 (hex; checked on completion). Then PUT chunks to
+    the returned session, GET it to learn the offset after an interruption,
+    and POST .../complete to create the attachment.
+    """
+    exists = db.session.query(Application.id).filter_by(id=id).first()
+    if not exists:
+        return jsonify({"msg": "not found"}), 404
+    data = request.get_json(silent=True) or {}
+    filename = data.get("filename")
+    size = data.get("size")
+    if not filename or not isinstance(size, int) or isinstance(size, bool) or size < 0:
+        return jsonify({"msg": "filename and a non-negative integer size are required"}), 400
+    max_size = int(current_app.config.get("ATTACHMENT_MAX_BYTES", 25 * 1024 * 1024))
+    if size > max_size:
+        return jsonify({"msg": "attachment too large", "max_bytes": max_size}), 413
+    try:
+        sha256 = parse_sha256(data.get("sha256"))
+    except UploadError as e:
+        return _upload_error(e)
+    mime_type = data.get("mime_type") or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    session = create_session(id, get_jwt_identity(), filename, mime_type, size, sha256)
+    response, status = _offset_response(session.to_dict(offset=0), 201, 0)
+    response.headers["Location"] = url_for(".upload_status", id=id, upload_id=session.id, _external=True)
+    return response, status
+
+
+@app_bp.route("/<id>/uploads/<upload_id>", methods=["GET"])
+@jwt_required()
+def upload_status(id, upload_id):
+    """Session state; `offset` (also the Upload-Offset header) is where to resume."""
+    session = _upload_session(id, upload_id)
+    if session is None:
+        return jsonify({"msg": "not found"}), 404
+    try:
+        offset = current_offset(session)
+    except UploadError as e:
+        return _upload_error(e)
+    return _offset_response(session.to_dict(offset=offset), 200, offset)
+
+
+@app_bp.route("/<id>/uploads/<upload_id>", methods=["PUT", "PATCH"])
+@jwt_required()
+@admission_limited("uploads")
+def upload_chunk(id, upload_id):
+    """
+    Append a chunk (raw body) at `Upload-Offset: n` or
+    `Content-Range: bytes start-end/size`. A chunk that does not start at
+    the current offset gets 409 with the offset to resume from.
+    """
+    session = _upload_session(id, upload_id)
+    if session is None:
+        return jsonify({"msg": "not found"}), 404
+    try:
+        offset, length = parse_chunk_offset(request.headers, session.size)
+        current_offset(session)
+        new_offset = append_chunk(session, request.stream, offset, length)
+    except UploadError as e:
+        return _upload_error(e)
+    except OffsetMismatch as e:
+        return _offset_response({"msg": "wrong offset", "offset": e.current}, 409, e.current)
+    except SessionBusy:
+        return jsonify({"msg": "another chunk is being written to this upload"}), 409
+    except TooLarge:
+        offset = get_storage().session_size(upload_id) or 0
+        return _offset_response({"msg": "chunk runs past the declared size", "offset": offset}, 413, offset)
+    body = {"offset": new_offset, "size": session.size, "complete": new_offset == session.size}
+    return _offset_response(body, 200, new_offset)
+
+
+@app_bp.route("/<id>/uploads/<upload_id>/complete", methods=["POST"])
+@jwt_required()
+def complete_upload(id, upload_id):
+    """
+    Verify the checksum (optional JSON body {"sha256": ...} in addition to
+    the one given at creation) and create the attachment.
+    """
+    session = _upload_session(id, upload_id)
+    if session is None:
+        return jsonify({"msg": "not found"}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        att = complete_session(session, parse_sha256(data.get("sha256")))
+    except UploadError as e:
+        return _upload_error(e)
+    except Exception:
+        current_app.logger.exception("Failed to complete upload")
+        return jsonify({"msg": "failed to store attachment"}), 500
+    return _attachment_created(att)
+
+
+@app_bp.route("/<id>/uploads/<upload_id>", methods=["DELETE"])
+@jwt_required()
+def abort_upload(id, upload_id):
+    session = _upload_session(id, upload_id)
+    if session is None:
+        return jsonify({"msg": "not found"}), 404
+    cancel_session(session)
+    return "", 204
+
+
+def _event_response(application_id=None):
+    """
+    Open an SSE change feed. The resume cursor comes from Last-Event-ID
+    (sent by EventSource on reconnect) or ?cursor=.
+    """
+    cursor = request.headers.get("Last-Event-ID") or request.args.get("cursor") or None
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except InvalidCursor:
+            return jsonify({"msg": "invalid cursor"}), 400
+
+    cfg = current_app.config
+    stream = event_stream(
+        current_app.extensions["change_hub"],
+        db.engine,
+        application_id=application_id,
+        status_only=_bool_arg("status_only", False),
+        cursor=cursor,
+        heartbeat=float(cfg.get("SSE_HEARTBEAT", 15)),
+        max_seconds=float(cfg.get("SSE_MAX_SECONDS", 300)),
+        grace=float(cfg.get("SSE_REPLAY_GRACE", 2)),
+    )
+    return Response(
+        stream_with_context(stream),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app_bp.route("/events", methods=["GET"])
+@jwt_required()
+@admission_limited("events")
+def change_feed():
+    """
+    Server-sent events for every new ActionLog entry across applications
+    (status_only=true: only status changes). Without a cursor the stream
+    starts live.
+    """
+    return _event_response()
+
+
+@app_bp.route("/<id>/events", methods=["GET"])
+@jwt_required()
+@admission_limited("events")
+def application_events(id):
+    """
+    Server-sent events for one application's ActionLog entries: its history
+    (or everything after the cursor) first, then new entries as they are
+    committed. Replaces polling GET /<id>/logs.
+    """
+    exists = db.session.query(Application.id).filter_by(id=id).first()
+    if not exists:
+        return jsonify({"msg": "not found"}), 404
+    db.session.remove()  # don't hold a pooled connection for the stream
+    return _event_response(id)
 
 
 # -------------------------
 # New endpoints added below
 # -------------------------
 
+def _bool_arg(name, default):
+    """
+    Parse a boolean query-string flag ("true"/"false", "1"/"0", "yes"/"no").
+    """
+    raw = request.args.get(name)
+    if raw is None or raw == "":
+        return default
+    return raw.strip().lower() not in ("0", "false", "no", "off")
+
+
+def _fields_marker(fields, default):
+    """
+    ETag parts for a sparse fieldset: none for the default representation
+    (so its tags are unchanged), the field list otherwise.
+    """
+    return () if fields == tuple(default) else (",".join(fields),)
+
+
+def _apply_filters(q):
+    """
+    Apply the list-endpoint filters (status, department) from the query string.
+    Works on both ORM queries and Core selects.
+    """
+    status = request.args.get("status", type=str)
+    department = request.args.get("department", type=str)
+    if status:
+        q = q.filter_by(status=status)
+    if department:
+        q = q.filter_by(department=department)
+    return q
+
+
 @app_bp.route("/", methods=["GET"])
 @jwt_required()
+@admission_limited("listing")
 def list_applications():
     """
     List applications with optional filters:
       - status
       - department
-      - page, per_page (pagination)
+      - page, per_page (offset pagination)
+      - cursor (keyset pagination; pass an empty cursor for the first page
+        and the returned next_cursor for the following ones)
+      - include_total (default true; pass false to skip the COUNT query)
+      - fields (comma-separated columns to return; default all but remarks)
     Returns paginated list of application dicts.
+
+    With include_total the COUNT query also reads max(updated_at) over the
+    filter; both make up the ETag, so a matching If-None-Match gets 304
+    before the page is fetched. Without include_total there is no ETag.
+
+    Responses are cached per filters + page/cursor when LIST_CACHE_BACKEND
+    is set; writes invalidate them through per-department generations.
     """
-    status = request.args.get("status", type=str)
-    department = request.args.get("department", type=str)
     try:
         page = int(request.args.get("page", 1))
     except (TypeError, ValueError):
@@ -205,65 +708,234 @@ def list_applications():
         per_page = int(request.args.get("per_page", 20))
     except (TypeError, ValueError):
         per_page = 20
+    per_page = max(per_page, 1)
+    include_total = _bool_arg("include_total", True)
+    cursor_mode = "cursor" in request.args
+    try:
+        fields = parse_fields(request.args.get("fields"), LIST_DEFAULT_FIELDS)
+    except InvalidFields as e:
+        return jsonify({"msg": str(e)}), 400
+
+    cache = current_app.extensions.get("list_cache")
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.key(
+            {"status": request.args.get("status"), "department": request.args.get("department")},
+            {"cursor": request.args.get("cursor"), "page": None if cursor_mode else page,
+             "per_page": per_page, "total": include_total, "fields": ",".join(fields)},
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            etag = cached["etag"]
+            if etag and client_has(etag):
+                return not_modified(etag)
+            response = jsonify(cached["body"])
+            return (with_etag(response, etag) if etag else response), 200
+
+    # created_at is read for the keyset cursor even when not returned
+    q = _apply_filters(application_select(fields, "created_at"))
+
+    total = etag = None
+    if include_total:
+        total, last_updated = _apply_filters(
+            db.session.query(func.count(Application.id), func.max(Application.updated_at))
+            .select_from(Application)
+        ).one()
+        etag = make_etag("list", total, last_updated, *_fields_marker(fields, LIST_DEFAULT_FIELDS))
+        if client_has(etag):
+            return not_modified(etag)
+
+    if cursor_mode:
+        try:
+            rows, next_cursor = keyset_page(
+                q, Application.__table__, request.args.get("cursor"), per_page, execute=db.session.execute
+            )
+        except InvalidCursor:
+            return jsonify({"msg": "invalid cursor"}), 400
+    else:
+        page = max(page, 1)
+        rows = db.session.execute(
+            q.order_by(Application.created_at.desc(), Application.id.desc())
+            .limit(per_page).offset((page - 1) * per_page)
+        ).all()
+        next_cursor = None
+
+    serialize = application_serializer(fields)
+    items = [serialize(row) for row in rows]
+
+    body = {"items": items, "per_page": per_page}
+    if cursor_mode:
+        body["next_cursor"] = next_cursor
+    else:
+        body["page"] = page
+    if include_total:
+        body["total"] = total
+    if cache is not None:
+        cache.set(cache_key, {"body": body, "etag": etag})
+    if etag:
+        return with_etag((jsonify(body), 200), etag)
+    return jsonify(body), 200
+
+
+EXPORT_COLUMNS = [c.name for c in Application.__table__.columns]
+
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+@app_bp.route("/export", methods=["GET"])
+@jwt_required()
+@admission_limited("export")
+def export_applications():
+    """
+    Stream every application matching the list filters (status, department,
+    plus optional created_from / created_to ISO timestamps) as NDJSON or CSV.
 
-    q = Application.query
-    if status:
-        q = q.filter_by(status=status)
-    if department:
-        q = q.filter_by(department=department)
+    Rows come from a server-side cursor in batches of EXPORT_BATCH_SIZE and
+    are written out as they arrive, so memory stays flat and the client sees
+    the first bytes before the scan finishes.
+    """
+    fmt = (request.args.get("format") or "ndjson").lower()
+    if fmt not in ("ndjson", "csv"):
+        return jsonify({"msg": "format must be ndjson or csv"}), 400
 
-    pag = q.order_by(Application.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
+    stmt = _apply_filters(select(Application.__table__))
+    try:
+        created_from = request.args.get("created_from")
+        created_to = request.args.get("created_to")
+        if created_from:
+            stmt = stmt.where(Application.created_at >= datetime.fromisoformat(created_from))
+        if created_to:
+            stmt = stmt.where(Application.created_at < datetime.fromisoformat(created_to))
+    except ValueError:
+        return jsonify({"msg": "created_from / created_to must be ISO timestamps"}), 400
+
+    batch_size = int(current_app.config.get("EXPORT_BATCH_SIZE", 1000))
+    stmt = stmt.order_by(Application.created_at.asc(), Application.id.asc()).execution_options(
+        stream_results=True, yield_per=batch_size
+    )
 
-    items = []
-    for a in pag.items:
-        # prefer model serializer if present
+    def generate():
+        buf = io.StringIO()
+        writer = csv.writer(buf) if fmt == "csv" else None
+        if writer:
+            writer.writerow(EXPORT_COLUMNS)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+        result = db.session.execute(stmt)
         try:
-            items.append(a.to_dict())
-        except Exception:
-            items.append({
-                "id": a.id,
-                "sr_no": a.sr_no,
-                "purpose": a.purpose,
-                "department": a.department,
-                "emp_no": a.emp_no,
-                "emp_name": a.emp_name,
-                "designation": getattr(a, "designation", None),
-                "remarks": getattr(a, "remarks", None),
-                "status": getattr(a, "status", None),
-                "created_at": getattr(a, "created_at", None).isoformat() if getattr(a, "created_at", None) else None,
-            })
+            for batch in result.partitions():
+                for row in batch:
+                    values = [_export_value(v) for v in row]
+                    if writer:
+                        writer.writerow(values)
+                    else:
+                        buf.write(json.dumps(dict(zip(EXPORT_COLUMNS, values))))
+                        buf.write("\n")
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        finally:
+            result.close()
+
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    filename = f"applications.{fmt}"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@app_bp.route("/stats", methods=["GET"])
+@jwt_required()
+def application_stats():
+    """
+    Dashboard counts per (department, status), read from the incrementally
+    maintained application_stats table instead of scanning applications.
+    Optional filter: department.
+    """
+    rows = get_stats(request.args.get("department", type=str))
+
+    by_status, by_department = {}, {}
+    for r in rows:
+        by_status[r.status] = by_status.get(r.status, 0) + r.total
+        by_department[r.department] = by_department.get(r.department, 0) + r.total
 
     return jsonify({
-        "items": items,
-        "page": pag.page,
-        "per_page": pag.per_page,
-        "total": pag.total
+        "stats": [r.to_dict() for r in rows],
+        "by_status": by_status,
+        "by_department": by_department,
+        "total": sum(by_status.values()),
     }), 200
 
 
+@app_bp.route("/search", methods=["GET"])
+@jwt_required()
+@admission_limited("listing")
+def search_applications():
+    """
+    Full-text search over employee name / number, designation, purpose and
+    remarks, best matches first. Every word of q must match (as a prefix).
+    Optional filters: status, department. Paginate with the returned
+    next_cursor (a position in the ranking materialized by the first page,
+    so writes between pages do not make rows skip or repeat).
+    """
+    try:
+        per_page = min(max(int(request.args.get("per_page", 20)), 1), 100)
+    except (TypeError, ValueError):
+        per_page = 20
+    filters = {"status": request.args.get("status"), "department": request.args.get("department")}
+
+    try:
+        hits, next_cursor = search_page(request.args.get("q", ""), per_page, request.args.get("cursor"), filters)
+    except InvalidQuery as e:
+        return jsonify({"msg": str(e)}), 400
+    except InvalidCursor:
+        return jsonify({"msg": "invalid cursor"}), 400
+
+    rows = {}
+    if hits:
+        stmt = application_select(DETAIL_DEFAULT_FIELDS).where(
+            Application.__table__.c.id.in_([app_id for app_id, _ in hits])
+        )
+        rows = {row.id: row for row in db.session.execute(stmt)}
+    serialize = application_serializer(DETAIL_DEFAULT_FIELDS)
+    items = [dict(serialize(rows[app_id]), score=-rank) for app_id, rank in hits if app_id in rows]
+    return jsonify({"items": items, "per_page": per_page, "next_cursor": next_cursor}), 200
+
+
 @app_bp.route("/<id>", methods=["GET"])
 @jwt_required()
 def get_application(id):
     """
-    Get a single application by id and return its dict representation.
+    Get a single application by id and return its dict representation
+    (?fields= limits it to the listed columns, and only those are read).
+    The ETag follows updated_at; when the client sends If-None-Match only
+    that column is read first, so an unchanged application costs one small
+    query and no serialization.
     """
-    a = Application.query.get(id)
-    if not a:
-        return jsonify({"msg": "not found"}), 404
-
     try:
-        return jsonify(a.to_dict()), 200
-    except Exception:
-        payload = {
-            "id": a.id,
-            "sr_no": a.sr_no,
-            "purpose": a.purpose,
-            "department": a.department,
-            "emp_no": a.emp_no,
-            "emp_name": a.emp_name,
-            "designation": getattr(a, "designation", None),
-            "remarks": getattr(a, "remarks", None),
-            "status": getattr(a, "status", None),
-            "created_at": getattr(a, "created_at", None).isoformat() if getattr(a, "created_at", None) else None,
-        }
-        return jsonify(payload), 200
+        fields = parse_fields(request.args.get("fields"), DETAIL_DEFAULT_FIELDS)
+    except InvalidFields as e:
+        return jsonify({"msg": str(e)}), 400
+    marker = _fields_marker(fields, DETAIL_DEFAULT_FIELDS)
+
+    if request.if_none_match:
+        updated_at = db.session.query(Application.updated_at).filter_by(id=id).scalar()
+        if updated_at is None:
+            return jsonify({"msg": "not found"}), 404
+        etag = make_etag(id, updated_at, *marker)
+        if client_has(etag):
+            return not_modified(etag)
+
+    row = db.session.execute(
+        application_select(fields, "updated_at").where(Application.__table__.c.id == id)
+    ).first()
+    if row is None:
+        return jsonify({"msg": "not found"}), 404
+    etag = make_etag(row.id, row.updated_at, *marker)
+    return with_etag((jsonify(application_serializer(fields)(row)), 200), etag)
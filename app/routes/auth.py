@@ -1,6 +1,5 @@
 # app/routes/auth.py
 from flask import Blueprint, request, jsonify, current_app
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
@@ -11,13 +10,26 @@ from flask_jwt_extended import (
 from app.extensions import db
 from app.models import User
 
-from app.auth.utils import make_tokens, get_role_from_token_or_db
+from app.auth.utils import make_tokens, get_role_from_token_or_db, invalidate_role, lookup_role
+from app.services.admission import admission_limited
+from app.services.blobs import dedup_report
+from app.services.processing import processing_counts
+from app.services.passwords import HashingBusy, get_hasher
 
 auth_bp = Blueprint("auth_bp", __name__)
 admin_bp = Blueprint("admin_bp", __name__)
 
+
+def _busy():
+    """503 for a saturated hashing pool; clients should back off and retry."""
+    response = jsonify({"msg": "server busy, retry later"})
+    response.headers["Retry-After"] = str(current_app.config.get("PASSWORD_HASH_RETRY_AFTER", 1))
+    return response, 503
+
+
 # REGISTER
 @auth_bp.route("/register", methods=["POST"])
+@admission_limited("auth")
 def register():
     payload = request.get_json() or {}
     email = payload.get("email")
@@ -30,7 +42,10 @@ def register():
     if existing:
         return jsonify({"msg": "user exists"}), 409
 
-    hashed = generate_password_hash(password)
+    try:
+        hashed = get_hasher().hash(password)
+    except HashingBusy:
+        return _busy()
     user = User(email=email, password_hash=hashed)
     db.session.add(user)
     try:
@@ -54,6 +69,7 @@ def register():
 
 # LOGIN
 @auth_bp.route("/login", methods=["POST"])
+@admission_limited("auth")
 def login():
     payload = request.get_json() or {}
     email = payload.get("email")
@@ -62,8 +78,29 @@ def login():
         return jsonify({"msg": "email and password required"}), 400
 
     user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password_hash, password):
+    if not user:
         return jsonify({"msg": "invalid credentials"}), 401
+    hasher = get_hasher()
+    try:
+        if not hasher.verify(password, user.password_hash):
+            return jsonify({"msg": "invalid credentials"}), 401
+    except HashingBusy:
+        return _busy()
+
+    # upgrade hashes made with an older scheme / cost while we have the password;
+    # the user is already verified, so a busy pool just postpones the upgrade
+    if hasher.needs_rehash(user.password_hash):
+        try:
+            rehashed = hasher.hash(password)
+        except HashingBusy:
+            rehashed = None
+        if rehashed is not None:
+            user.password_hash = rehashed
+            try:
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception("db error rehashing password")
 
     tokens = make_tokens(user)
     response = {
@@ -83,8 +120,10 @@ def refresh():
     identity = get_jwt_identity()
     # fallback: ensure user exists and fetch role
     role = get_role_from_token_or_db(get_jwt(), identity)
-    # create new access token including role claim
-    access_token = create_access_token(identity=identity, additional_claims={"role": role})
+    current = lookup_role(identity)
+    version = current[1] if current else 0
+    # create new access token including role + token_version claims
+    access_token = create_access_token(identity=identity, additional_claims={"role": role, "tv": version})
     # return both keys for compatibility
     return jsonify({"access_token": access_token, "access": access_token}), 200
 
@@ -127,12 +166,16 @@ def promote():
 
     old_role = user.role
     user.role = new_role
+    # outstanding tokens still carry the old role; bumping the version makes
+    # the resolver stop trusting them
+    user.token_version = (user.token_version or 0) + 1
     try:
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         current_app.logger.exception("db error promoting user")
         return jsonify({"msg": "db error"}), 500
+    invalidate_role(user.id)
 
     return jsonify({"msg": "role updated", "new_role": new_role, "old_role": old_role, "user_id": user.id}), 200
 
@@ -152,11 +195,43 @@ def demote():
 
     old_role = user.role
     user.role = new_role
+    # outstanding tokens still carry the old role; bumping the version makes
+    # the resolver stop trusting them
+    user.token_version = (user.token_version or 0) + 1
     try:
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         current_app.logger.exception("db error demoting user")
         return jsonify({"msg": "db error"}), 500
+    invalidate_role(user.id)
 
     return jsonify({"msg": "role updated", "new_role": new_role, "old_role": old_role, "user_id": user.id}), 200
+
+
+@admin_bp.route("/audit-writer", methods=["GET"])
+@role_required("admin")
+def audit_writer_stats():
+    """
+    Queue depth, flush latency and spool state of the async audit writer.
+    """
+    writer = current_app.extensions.get("audit_writer")
+    if writer is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify({"enabled": True, **writer.stats()}), 200
+
+
+@admin_bp.route("/storage", methods=["GET"])
+@role_required("admin")
+def storage_report():
+    """
+    Attachment deduplication report (logical vs stored bytes), the last
+    background blob GC run and attachments per processing status.
+    """
+    collector = current_app.extensions.get("blob_gc")
+    gc = None
+    if collector is not None:
+        gc = {"runs": collector.runs, "last_result": collector.last_result, "last_error": collector.last_error}
+    pipeline = current_app.extensions.get("processing")
+    processing = {"counts": processing_counts(), "pipeline": pipeline.stats() if pipeline is not None else None}
+    return jsonify({**dedup_report(), "gc": gc, "processing": processing}), 200
@@ -0,0 +1,178 @@
+# app/services/admission.py
+"""
+Admission control for expensive endpoints.
+
+Views tagged with @admission_limited("<class>") share a concurrency limit
+per class (ADMISSION_LIMITS). A request over the limit is answered right
+away with 503 + Retry-After instead of queueing behind the DB pool, so
+cheap endpoints (/health, get_application, ...) stay responsive while the
+expensive ones shed load.
+
+Limits adapt to the pool's recent checkout wait (see PoolTelemetry): when
+the smoothed wait rises above ADMISSION_TARGET_WAIT every class limit is
+cut by a quarter, and it grows back one slot at a time once the wait is
+below half the target, never above the configured value.
+"""
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, jsonify
+
+
+def parse_limits(value):
+    """'listing=16,auth=8' -> {'listing': 16, 'auth': 8}; dicts pass through."""
+    if isinstance(value, dict):
+        return {k: int(v) for k, v in value.items()}
+    limits = {}
+    for part in (value or "").split(","):
+        if "=" in part:
+            name, limit = part.split("=", 1)
+            limits[name.strip()] = int(limit)
+    return limits
+
+
+class ConcurrencyLimiter:
+    def __init__(self, name, limit, min_limit=1):
+        self.name = name
+        self.max_limit = limit
+        self.min_limit = min(min_limit, limit)
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def decrease(self):
+        with self._lock:
+            self.limit = max(self.min_limit, int(self.limit * 0.75))
+
+    def increase(self):
+        with self._lock:
+            self.limit = min(self.max_limit, self.limit + 1)
+
+
+class AdmissionController:
+    def __init__(self, limits, wait_source=None, target_wait=0.05,
+                 adjust_interval=1.0, retry_after=1, min_limit=1):
+        self.limiters = {name: ConcurrencyLimiter(name, n, min_limit) for name, n in limits.items()}
+        self.wait_source = wait_source
+        self.target_wait = target_wait
+        self.adjust_interval = adjust_interval
+        self.retry_after = retry_after
+        self.on_reject = None  # callable(name), e.g. a metrics counter
+        self._next_adjust = 0.0
+
+    def adjust(self):
+        """Move every class limit with the observed pool wait (at most once per interval)."""
+        now = time.monotonic()
+        if self.wait_source is None or now < self._next_adjust:
+            return
+        self._next_adjust = now + self.adjust_interval
+        wait = self.wait_source()
+        for limiter in self.limiters.values():
+            if wait > self.target_wait:
+                limiter.decrease()
+            elif wait < self.target_wait / 2:
+                limiter.increase()
+
+    def try_acquire(self, name):
+        """
+        True if the request may run (release() it afterwards); True without
+        a slot for classes that have no configured limit.
+        """
+        limiter = self.limiters.get(name)
+        if limiter is None:
+            return True
+        self.adjust()
+        if limiter.try_acquire():
+            return True
+        if self.on_reject is not None:
+            self.on_reject(name)
+        return False
+
+    def release(self, name):
+        limiter = self.limiters.get(name)
+        if limiter is not None:
+            limiter.release()
+
+    def stats(self):
+        return {
+            name: {"limit": l.limit, "max_limit": l.max_limit, "in_flight": l.in_flight,
+                   "rejected": l.rejected}
+            for name, l in self.limiters.items()
+        }
+
+
+def admission_limited(name):
+    """
+    Decorator: run the view only if the `name` class has a free slot,
+    otherwise answer 503 with Retry-After. The slot is released when the
+    request context is torn down, which for stream_with_context responses
+    is after the last chunk is sent. Apply it below @jwt_required() so
+    unauthenticated requests never take a slot.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            controller = current_app.extensions.get("admission")
+            if controller is None or name not in controller.limiters:
+                return fn(*args, **kwargs)
+            if not controller.try_acquire(name):
+                response = jsonify({"msg": "server busy, retry later"})
+                response.headers["Retry-After"] = str(controller.retry_after)
+                return response, 503
+            g.setdefault("_admission_slots", []).append(name)
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def init_admission(app):
+    """Set up per-class concurrency limits unless ADMISSION_ENABLED is off."""
+    if not app.config.get("ADMISSION_ENABLED", True):
+        return None
+    telemetry = app.extensions.get("pool_telemetry")
+    controller = AdmissionController(
+        parse_limits(app.config.get("ADMISSION_LIMITS", "")),
+        wait_source=(lambda: telemetry.recent_wait) if telemetry is not None else None,
+        target_wait=float(app.config.get("ADMISSION_TARGET_WAIT", 0.05)),
+        adjust_interval=float(app.config.get("ADMISSION_ADJUST_INTERVAL", 1.0)),
+        retry_after=int(app.config.get("ADMISSION_RETRY_AFTER", 1)),
+        min_limit=int(app.config.get("ADMISSION_MIN_LIMIT", 1)),
+    )
+    app.extensions["admission"] = controller
+
+    @app.teardown_request
+    def release_admission_slots(exc):
+        for name in g.pop("_admission_slots", ()):
+            controller.release(name)
+
+    metrics = app.extensions.get("metrics")
+    if metrics is not None:
+        limit = metrics.registry.gauge(
+            "admission_limit", "Current concurrency limit per endpoint class.", ("class",))
+        in_flight = metrics.registry.gauge(
+            "admission_in_flight", "Admitted requests running per endpoint class.", ("class",))
+        rejected = metrics.registry.counter(
+            "admission_rejected_total", "Requests shed with 503 per endpoint class.", ("class",))
+        controller.on_reject = lambda name: rejected.inc((name,))
+
+        def collect(_registry):
+            for name, s in controller.stats().items():
+                limit.set((name,), s["limit"])
+                in_flight.set((name,), s["in_flight"])
+
+        metrics.registry.add_collector(collect)
+    return controller
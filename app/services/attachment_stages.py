@@ -0,0 +1,128 @@
+# app/services/attachment_stages.py
+"""
+The file stages of attachment processing (app/services/processing.py).
+
+Limited to the standard library: with PROCESSING_EXECUTOR=process,
+spawned pool workers import this module to unpickle run_stages, and it
+must not load Flask, SQLAlchemy or the models in every one of them (the
+app package itself imports those lazily).
+"""
+import hashlib
+
+SNIFF_BYTES = 2048
+
+# (prefix, mime type); first match wins
+_MAGIC = (
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"BM", "image/bmp"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\x1f\x8b", "application/gzip"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+)
+
+# declared types a detected container type legitimately stands for
+_CONTAINERS = {
+    "application/zip": (
+        "application/x-zip-compressed", "application/vnd.openxmlformats-officedocument.",
+        "application/vnd.oasis.opendocument.", "application/epub+zip", "application/java-archive",
+    ),
+    "application/x-ole-storage": ("application/msword", "application/vnd.ms-", "application/x-msi"),
+    "text/plain": ("text/", "application/json", "application/xml", "application/csv", "image/svg+xml"),
+    "application/gzip": ("application/x-gzip", "application/x-tar"),
+}
+
+
+class ProcessingError(Exception):
+    """A permanent failure: retrying will not help."""
+
+
+def sniff_mime(head):
+    """Content type from the first bytes of a file; None when unknown."""
+    if not head:
+        return None
+    for prefix, mime in _MAGIC:
+        if head.startswith(prefix):
+            return mime
+    if head[8:12] == b"WEBP" and head.startswith(b"RIFF"):
+        return "image/webp"
+    if b"\x00" not in head:
+        try:
+            head.decode("utf-8")
+            return "text/plain"
+        except UnicodeDecodeError as e:
+            # the sample may end in the middle of a multi-byte character
+            if e.start >= len(head) - 3 and e.reason == "unexpected end of data":
+                return "text/plain"
+    return None
+
+
+def mime_mismatch(declared, detected):
+    """True when the sniffed type contradicts the declared one."""
+    if not detected or not declared:
+        return False
+    declared = declared.split(";")[0].strip().lower()
+    if declared == detected or declared == "application/octet-stream":
+        return False
+    return not declared.startswith(_CONTAINERS.get(detected, ()))
+
+
+class ChecksumStage:
+    name = "checksum"
+
+    def __init__(self, job):
+        self.expected = job.get("digest")
+        self.sha = hashlib.sha256()
+
+    def feed(self, chunk):
+        self.sha.update(chunk)
+
+    def finish(self):
+        # attachments stored before content addressing have no digest
+        if self.expected and self.sha.hexdigest() != self.expected:
+            raise ProcessingError(f"checksum mismatch: stored bytes hash to {self.sha.hexdigest()}")
+        return {}
+
+
+class SniffStage:
+    name = "sniff"
+
+    def __init__(self, job):
+        self.head = b""
+
+    def feed(self, chunk):
+        if len(self.head) < SNIFF_BYTES:
+            self.head += chunk[:SNIFF_BYTES - len(self.head)]
+
+    def finish(self):
+        return {"detected_mime_type": sniff_mime(self.head)}
+
+
+STAGES = {stage.name: stage for stage in (ChecksumStage, SniffStage)}
+DEFAULT_STAGES = ("checksum", "sniff")
+
+
+def feed_stages(stream, job, names, chunk_size=1024 * 1024):
+    """
+    Read `stream` once, feeding every stage in `names`; returns the merged
+    column values. Raises ProcessingError from a stage.
+    """
+    stages = [STAGES[name](job) for name in names]
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        for stage in stages:
+            stage.feed(chunk)
+    results = {}
+    for stage in stages:
+        results.update(stage.finish())
+    return results
+
+
+def run_stages(path, job, names, chunk_size=1024 * 1024):
+    """feed_stages over a local file; what the process pool runs."""
+    with open(path, "rb") as f:
+        return feed_stages(f, job, names, chunk_size)
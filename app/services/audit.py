@@ -1,23 +1,440 @@
 # app/services/audit.py
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
 from app.extensions import db
-from app.models import ActionLog
+from app.models import ActionLog, gen_uuid
+from app.services.events import log_event, queue_log_events
+
+try:  # advisory locks keep workers from replaying each other's live spools
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev boxes
+    fcntl = None
 
+logger = logging.getLogger(__name__)
 
-def create_action_log(application_id, action, actor_id=None, comment=None):
+
+def create_action_log(application_id, action, actor_id=None, comment=None, commit=True):
     """
     Create an ActionLog entry and commit it.
+    Pass commit=False to only add it to the current session so it is
+    written in the caller's transaction.
+    When the async audit writer is enabled (AUDIT_ASYNC), committed entries
+    are handed to it instead and written in batches off the request path.
+    Either way the entry is published to the change feed once it is
+    committed (see app/services/events.py).
     Returns the created ActionLog instance.
     """
     log = ActionLog(
+        id=gen_uuid(),
         application_id=application_id,
         action=action,
         actor_id=actor_id,
         comment=comment,
+        created_at=datetime.utcnow(),
     )
+    writer = current_app.extensions.get("audit_writer") if commit and has_app_context() else None
+    if writer is not None:
+        writer.enqueue(log)
+        return log
+
     db.session.add(log)
+    queue_log_events([log])
+    if not commit:
+        return log
     try:
         db.session.commit()
     except Exception:
         db.session.rollback()
         raise
     return log
+
+
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Background writer for ActionLog rows.
+
+    Entries are appended to a local spool segment (fsync'd when
+    AUDIT_SPOOL_FSYNC) before they are queued, so an accepted entry survives
+    a DB outage or a worker restart. A single thread drains the bounded
+    queue and writes multi-row INSERTs once AUDIT_BATCH_SIZE entries are
+    waiting or AUDIT_FLUSH_INTERVAL seconds have passed. A segment file is
+    deleted once every entry in it is in the database.
+
+    When the queue is full, entries only go to an overflow spool file,
+    which the writer replays after its next successful flush. Spool files
+    left behind by dead workers are replayed on start-up; inserts are
+    idempotent on the pre-generated ActionLog id. Entries the database
+    rejects for good (e.g. an application deleted in the meantime) are moved
+    to a dead-letter file so they cannot hold up the rest of the spool.
+    """
+
+    def __init__(self, app, spool_dir, batch_size=200, flush_interval=1.0,
+                 maxsize=10000, fsync=True, segment_bytes=1 << 20):
+        self.app = app
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.segment_bytes = segment_bytes
+
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        # pid alone is not unique across container restarts
+        self._prefix = f"spool-{os.getpid()}-{gen_uuid()[:8]}-"
+        self._seq = 0
+        self._segment = None          # (seq, file handle) currently appended to
+        self._handles = {}            # seq -> open file handle (holds the lock)
+        self._pending = {}            # seq -> entries not yet in the database
+        self._overflow = None
+        self._overflow_seq = 0
+
+        self.counters = {
+            "enqueued": 0,
+            "written": 0,
+            "overflowed": 0,
+            "replayed": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "dead_lettered": 0,
+        }
+        self.last_flush_seconds = None
+        self.flush_seconds_total = 0.0
+        self.last_error = None
+        self._consecutive_failures = 0
+        self._wake = threading.Event()
+
+    # -- request side -------------------------------------------------------
+
+    def enqueue(self, log):
+        entry = {
+            "id": log.id,
+            "application_id": log.application_id,
+            "action": log.action,
+            "actor_id": log.actor_id,
+            "comment": log.comment,
+            "created_at": log.created_at.isoformat(),
+        }
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            if not self._queue.full():
+                seq, fh = self._current_segment()
+                self._append(fh, line)
+                try:
+                    self._queue.put_nowait((seq, entry))
+                except queue.Full:
+                    # flush() and shutdown() queue their markers without the
+                    # lock and can take the last slot. The line stays in the
+                    # segment uncounted (replays are idempotent on the id).
+                    pass
+                else:
+                    self._pending[seq] = self._pending.get(seq, 0) + 1
+                    self.counters["enqueued"] += 1
+                    return
+            self._append(self._overflow_file(), line)
+            self.counters["overflowed"] += 1
+
+    def _append(self, fh, line):
+        fh.write(line)
+        fh.flush()
+        if self.fsync:
+            os.fsync(fh.fileno())
+
+    def _open_locked(self, path):
+        fh = open(path, "a", encoding="utf-8")
+        if fcntl:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return fh
+
+    def _current_segment(self):
+        if self._segment is None:
+            self._seq += 1
+            path = os.path.join(self.spool_dir, f"{self._prefix}{self._seq}.ndjson")
+            fh = self._open_locked(path)
+            self._segment = (self._seq, fh)
+            self._handles[self._seq] = fh
+            self._pending.setdefault(self._seq, 0)
+        return self._segment
+
+    def _overflow_file(self):
+        if self._overflow is None:
+            path = os.path.join(self.spool_dir, f"{self._prefix}overflow.ndjson")
+            self._overflow = self._open_locked(path)
+        return self._overflow
+
+    # -- lifecycle ----------------------------------------------------------
+
+    def start(self):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def flush(self, timeout=10.0):
+        """
+        Block until every entry enqueued before this call has been written
+        (or the writer gave up on it for now). Returns False on timeout.
+        """
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def shutdown(self, timeout=10.0):
+        """
+        Drain the queue and stop the thread. Anything that could not be
+        written stays in the spool for the next start.
+        """
+        if not self._thread or not self._thread.is_alive():
+            return
+        self._wake.set()
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("audit writer queue still full at shutdown; entries remain in the spool")
+        self._thread.join(timeout)
+        with self._lock:
+            for fh in list(self._handles.values()):
+                fh.close()
+            if self._overflow is not None:
+                self._overflow.close()
+                self._overflow = None
+            self._handles.clear()
+            self._segment = None
+
+    def stats(self):
+        count = self.counters["flushes"]
+        return {
+            **self.counters,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "last_flush_seconds": self.last_flush_seconds,
+            "avg_flush_seconds": (self.flush_seconds_total / count) if count else None,
+            "spool_files": len(glob.glob(os.path.join(self.spool_dir, "spool-*"))),
+            "last_error": self.last_error,
+        }
+
+    # -- writer thread ------------------------------------------------------
+
+    def _run(self):
+        with self.app.app_context():
+            self._replay_orphans()
+            batch, waiters, stopping = [], [], False
+            deadline = None
+            while True:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item is not None:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+                due = deadline is not None and time.monotonic() >= deadline
+                if batch and (len(batch) >= self.batch_size or due or waiters or stopping):
+                    if self._write_batch(batch):
+                        batch, deadline = [], None
+                        self._replay_overflow()
+                    elif stopping:
+                        batch = []  # still in the spool; replayed on the next start
+                    else:
+                        # stop draining the queue while the database is down so
+                        # it fills up and new entries go to the overflow spool
+                        backoff = min(self.flush_interval * 2 ** self._consecutive_failures, 30)
+                        self._wake.wait(backoff)
+                        deadline = time.monotonic()
+
+                for event in waiters:
+                    event.set()
+                waiters = []
+                if stopping and self._queue.empty():
+                    return
+
+    def _write_batch(self, batch):
+        started = time.monotonic()
+        try:
+            rejected = self._insert([entry for _, entry in batch])
+        except Exception as e:
+            self.counters["failed_flushes"] += 1
+            self._consecutive_failures += 1
+            self.last_error = str(e)
+            logger.warning("audit flush of %d entries failed: %s", len(batch), e)
+            return False
+
+        hub = self.app.extensions.get("change_hub")
+        if hub is not None:
+            hub.publish([log_event(entry) for _, entry in batch if entry["id"] not in rejected])
+
+        elapsed = time.monotonic() - started
+        self.counters["flushes"] += 1
+        self.counters["written"] += len(batch) - len(rejected)
+        self._consecutive_failures = 0
+        self.last_flush_seconds = elapsed
+        self.flush_seconds_total += elapsed
+
+        with self._lock:
+            for seq, _ in batch:
+                self._pending[seq] -= 1
+            # start a fresh segment once the current one is drained or large,
+            # so flushed segments can be removed
+            if self._segment is not None:
+                seq, fh = self._segment
+                if self._pending[seq] == 0 or fh.tell() >= self.segment_bytes:
+                    self._segment = None
+            current = self._segment[0] if self._segment else None
+            for seq in [s for s, n in self._pending.items() if n == 0 and s != current]:
+                fh = self._handles.pop(seq)
+                os.remove(fh.name)
+                fh.close()
+                del self._pending[seq]
+        return True
+
+    def _insert(self, entries):
+        """
+        Write `entries`, skipping ids that are already in the table. Rows
+        the database still refuses are dead-lettered; their ids are returned.
+        """
+        rows = [dict(e, created_at=datetime.fromisoformat(e["created_at"])) for e in entries]
+        table = ActionLog.__table__
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(insert(table), rows)
+            return set()
+        except IntegrityError:
+            pass
+        # a retry of a batch that did commit, or a row that violates a
+        # constraint: insert only what is missing, one row at a time if needed
+        with db.engine.connect() as conn:
+            existing = set(conn.execute(
+                select(table.c.id).where(table.c.id.in_([r["id"] for r in rows]))
+            ).scalars())
+        missing = [r for r in rows if r["id"] not in existing]
+        if not missing:
+            return set()
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(insert(table), missing)
+            return set()
+        except IntegrityError:
+            pass
+        rejected = []
+        for row in missing:
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(insert(table), [row])
+            except IntegrityError as e:
+                logger.warning("audit entry %s rejected by the database: %s", row["id"], e.orig)
+                rejected.append(row)
+        self._dead_letter(rejected)
+        return {r["id"] for r in rejected}
+
+    def _dead_letter(self, rows):
+        if not rows:
+            return
+        lines = "".join(
+            json.dumps(dict(r, created_at=r["created_at"].isoformat()), separators=(",", ":")) + "\n"
+            for r in rows
+        )
+        # not named spool-*, so start-up replay leaves it alone
+        with self._lock, open(os.path.join(self.spool_dir, "dead-letter.ndjson"), "a", encoding="utf-8") as fh:
+            self._append(fh, lines)
+        self.counters["dead_lettered"] += len(rows)
+
+    def _replay_file(self, path, publish=False):
+        with open(path, encoding="utf-8") as fh:
+            entries = [json.loads(line) for line in fh if line.strip()]
+        hub = self.app.extensions.get("change_hub") if publish else None
+        for i in range(0, len(entries), self.batch_size):
+            chunk = entries[i:i + self.batch_size]
+            rejected = self._insert(chunk)
+            if hub is not None:
+                hub.publish([log_event(entry) for entry in chunk if entry["id"] not in rejected])
+        os.remove(path)
+        self.counters["replayed"] += len(entries)
+
+    def _replay_overflow(self):
+        if self._overflow is None:
+            return
+        with self._lock:
+            self._overflow_seq += 1
+            src = self._overflow.name
+            path = f"{src}.{self._overflow_seq}.replay"
+            os.replace(src, path)
+            self._overflow.close()
+            self._overflow = None
+        try:
+            # overflowed entries never went through a batch, so announce them here
+            self._replay_file(path, publish=True)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning("audit overflow replay failed, kept in %s: %s", path, e)
+
+    def _replay_orphans(self):
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "spool-*"))):
+            if os.path.basename(path).startswith(self._prefix):
+                continue
+            try:
+                with open(path, "a", encoding="utf-8") as guard:
+                    if fcntl:
+                        fcntl.flock(guard.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    self._replay_file(path)
+            except BlockingIOError:
+                continue  # a live worker still owns it
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning("audit spool replay of %s failed: %s", path, e)
+
+
+def init_audit_writer(app):
+    """
+    Start the background audit writer when AUDIT_ASYNC is enabled.
+    """
+    if not app.config.get("AUDIT_ASYNC"):
+        return None
+    writer = AuditWriter(
+        app,
+        spool_dir=app.config.get("AUDIT_SPOOL_DIR") or os.path.join(app.instance_path, "audit_spool"),
+        batch_size=int(app.config.get("AUDIT_BATCH_SIZE", 200)),
+        flush_interval=float(app.config.get("AUDIT_FLUSH_INTERVAL", 1.0)),
+        maxsize=int(app.config.get("AUDIT_QUEUE_MAXSIZE", 10000)),
+        fsync=bool(app.config.get("AUDIT_SPOOL_FSYNC", True)),
+    ).start()
+    app.extensions["audit_writer"] = writer
+    atexit.register(writer.shutdown)
+
+    metrics = app.extensions.get("metrics")
+    if metrics is not None:
+        depth = metrics.registry.gauge("audit_queue_depth", "Audit entries waiting to be written.")
+        flush = metrics.registry.gauge("audit_last_flush_seconds", "Duration of the last audit batch write.")
+
+        def collect(_registry):
+            stats = writer.stats()
+            depth.set(value=stats["queue_depth"])
+            flush.set(value=stats["last_flush_seconds"] or 0.0)
+
+        metrics.registry.add_collector(collect)
+    return writer
@@ -0,0 +1,277 @@
+# app/services/blobs.py
+"""
+Reference counts for content-addressed attachment blobs, and their GC.
+
+Every Attachment points at an AttachmentBlob by SHA-256 digest. Attaching
+content that is already stored only bumps the blob's refcount (in the
+same transaction as the Attachment insert), and the staged upload is
+discarded: a repeated scan costs a metadata insert, not a second file.
+
+Blobs whose refcount dropped to zero are not deleted on the spot. The GC
+pass removes them once they stayed unreferenced for BLOB_GC_GRACE seconds,
+in batches, with a conditional DELETE, so a concurrent upload that
+revives a blob wins. Files are only removed when older than the grace
+period, so a blob placed again by such an upload is never lost. The same
+pass sweeps files that have no blob row (an upload whose transaction
+failed) and staged files abandoned by crashed workers.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import Attachment, AttachmentBlob
+from app.services.processing import enqueue_processing
+
+logger = logging.getLogger(__name__)
+
+
+def acquire_blob(digest, size):
+    """
+    Add a reference to the blob `digest`, creating its row if needed.
+    Returns True when the row was created (the caller must store the
+    bytes). Runs in the current transaction.
+    """
+    blobs = AttachmentBlob.__table__
+    bump = (
+        update(blobs)
+        .where(blobs.c.digest == digest)
+        .values(refcount=blobs.c.refcount + 1, unreferenced_at=None)
+    )
+    if db.session.execute(bump).rowcount:
+        return False
+    try:
+        with db.session.begin_nested():
+            db.session.execute(blobs.insert().values(
+                digest=digest, size=size, refcount=1, created_at=datetime.utcnow(),
+            ))
+        return True
+    except IntegrityError:
+        # another upload of the same content created it first
+        db.session.execute(bump)
+        return False
+
+
+def store_attachment(storage, application_id, staged, filename, mime_type):
+    """
+    Create and commit the Attachment for a staged upload. Content that is
+    already stored is referenced and the staged copy dropped. On failure
+    the transaction is rolled back, the staged file discarded and the
+    error re-raised; a file already placed is left to the orphan sweep.
+    The committed attachment is queued for post-upload processing.
+    """
+    try:
+        created = acquire_blob(staged.digest, staged.size)
+        if created or not storage.exists(staged.digest):
+            storage.place(staged, staged.digest)
+        else:
+            storage.discard(staged)
+        att = Attachment(application_id=application_id, filename=filename[:255], mime_type=mime_type[:100],
+                         size=staged.size, storage_key=staged.digest, digest=staged.digest)
+        db.session.add(att)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        storage.discard(staged)
+        raise
+    enqueue_processing(att.id)
+    return att
+
+
+def release_blob(digest):
+    """Drop a reference to `digest`; runs in the current transaction."""
+    blobs = AttachmentBlob.__table__
+    db.session.execute(
+        update(blobs)
+        .where(blobs.c.digest == digest)
+        .values(
+            refcount=blobs.c.refcount - 1,
+            unreferenced_at=case(
+                (blobs.c.refcount <= 1, func.coalesce(blobs.c.unreferenced_at, datetime.utcnow())),
+                else_=blobs.c.unreferenced_at,
+            ),
+        )
+    )
+
+
+def collect_garbage(storage, batch_size=100, grace=3600.0):
+    """
+    Remove blobs unreferenced for more than `grace` seconds, their files,
+    orphaned files and abandoned staged uploads. Each batch commits on its
+    own. Returns counters of what was removed.
+    """
+    blobs = AttachmentBlob.__table__
+    cutoff = datetime.utcnow() - timedelta(seconds=grace)
+    file_cutoff = time.time() - grace
+    result = {"blobs_removed": 0, "bytes_freed": 0, "orphans_removed": 0, "staged_removed": 0}
+
+    while True:
+        rows = db.session.execute(
+            select(blobs.c.digest, blobs.c.size)
+            .where(blobs.c.refcount <= 0, blobs.c.unreferenced_at < cutoff)
+            .order_by(blobs.c.unreferenced_at)
+            .limit(batch_size)
+        ).all()
+        removed = []
+        for digest, size in rows:
+            gone = db.session.execute(
+                delete(blobs).where(blobs.c.digest == digest, blobs.c.refcount <= 0)
+            ).rowcount
+            if gone:
+                removed.append((digest, size))
+        db.session.commit()
+        for digest, size in removed:
+            storage.delete(digest, older_than=file_cutoff)
+            result["blobs_removed"] += 1
+            result["bytes_freed"] += size
+        if len(rows) < batch_size:
+            break
+
+    result["orphans_removed"] = _sweep_orphans(storage, batch_size, file_cutoff)
+    result["staged_removed"] = storage.purge_staged(file_cutoff)
+    if any(result.values()):
+        logger.info("attachment blob GC", extra=result)
+    return result
+
+
+def _sweep_orphans(storage, batch_size, file_cutoff):
+    blobs = AttachmentBlob.__table__
+    attachments = Attachment.__table__
+    removed = 0
+    batch = []
+
+    def flush():
+        nonlocal removed
+        keys = [k for k, _ in batch]
+        live = set(db.session.execute(select(blobs.c.digest).where(blobs.c.digest.in_(keys))).scalars())
+        # attachments stored before content addressing keep their own keys
+        live.update(db.session.execute(
+            select(attachments.c.storage_key).where(attachments.c.storage_key.in_(keys))
+        ).scalars())
+        db.session.commit()
+        for key, _ in batch:
+            if key not in live and storage.delete(key, older_than=file_cutoff):
+                removed += 1
+        batch.clear()
+
+    for key, mtime in storage.iter_keys():
+        if mtime < file_cutoff:
+            batch.append((key, mtime))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return removed
+
+
+def dedup_report():
+    """
+    Space used by attachments as uploaded (logical) versus stored once
+    per distinct content.
+    """
+    blobs = AttachmentBlob.__table__
+    attachments = Attachment.__table__
+    count, logical = db.session.execute(
+        select(func.count(attachments.c.id), func.coalesce(func.sum(attachments.c.size), 0))
+    ).one()
+    stored_blobs, stored, shared = db.session.execute(
+        select(
+            func.count(blobs.c.digest),
+            func.coalesce(func.sum(blobs.c.size), 0),
+            func.coalesce(func.sum(case((blobs.c.refcount > 1, 1), else_=0)), 0),
+        )
+    ).one()
+    unreferenced, unreferenced_bytes = db.session.execute(
+        select(func.count(blobs.c.digest), func.coalesce(func.sum(blobs.c.size), 0))
+        .where(blobs.c.refcount <= 0)
+    ).one()
+    # legacy attachments (no digest) are stored once each and count as-is
+    legacy = db.session.execute(
+        select(func.coalesce(func.sum(attachments.c.size), 0)).where(attachments.c.digest.is_(None))
+    ).scalar()
+    stored_total = int(stored) + int(legacy)
+    return {
+        "attachments": count,
+        "blobs": stored_blobs,
+        "shared_blobs": shared,
+        "logical_bytes": int(logical),
+        "stored_bytes": stored_total,
+        "saved_bytes": max(int(logical) - stored_total + int(unreferenced_bytes), 0),
+        "unreferenced_blobs": unreferenced,
+        "unreferenced_bytes": int(unreferenced_bytes),
+    }
+
+
+class BlobCollector:
+    """
+    Runs expire_sessions (app/services/uploads.py) and collect_garbage
+    every `interval` seconds on a daemon thread.
+    """
+
+    def __init__(self, app, interval, batch_size, grace):
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self.grace = grace
+        self.runs = 0
+        self.last_result = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        with self.app.app_context():
+            from app.services.uploads import expire_sessions
+
+            storage = self.app.extensions["storage"]
+            try:
+                expired = expire_sessions(storage, self.batch_size)
+                self.last_result = {**collect_garbage(storage, self.batch_size, self.grace),
+                                    "uploads_expired": expired}
+                self.last_error = None
+            except Exception as e:  # keep the thread alive; retried next interval
+                db.session.rollback()
+                self.last_error = str(e)
+                logger.exception("attachment blob GC failed")
+            finally:
+                self.runs += 1
+                db.session.remove()
+        return self.last_result
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="blob-gc", daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def init_blob_gc(app):
+    """
+    Start the background GC when BLOB_GC_INTERVAL > 0. Every worker may
+    run it; the conditional deletes make concurrent passes harmless.
+    """
+    interval = float(app.config.get("BLOB_GC_INTERVAL", 0))
+    if interval <= 0:
+        return None
+    collector = BlobCollector(
+        app,
+        interval=interval,
+        batch_size=int(app.config.get("BLOB_GC_BATCH_SIZE", 100)),
+        grace=float(app.config.get("BLOB_GC_GRACE", 3600)),
+    ).start()
+    app.extensions["blob_gc"] = collector
+    atexit.register(collector.shutdown)
+    return collector
@@ -0,0 +1,40 @@
+# app/services/etags.py
+"""
+Strong ETags for polled read endpoints.
+
+Tags are a hash of a few cheap-to-query version markers (updated_at,
+latest log timestamp, row counts) rather than of the response body, so a
+view can answer 304 Not Modified before loading or serializing anything.
+"""
+import hashlib
+from datetime import datetime
+
+from flask import Response, request
+
+
+def make_etag(*parts):
+    """Opaque strong ETag value (unquoted) for the given version markers."""
+    raw = "|".join(p.isoformat() if isinstance(p, datetime) else str(p) for p in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def client_has(etag):
+    """
+    True if the request's If-None-Match covers `etag` (or is `*`).
+    If-None-Match uses weak comparison, so a tag a proxy weakened (e.g.
+    nginx after gzipping the body) still matches.
+    """
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def with_etag(result, etag):
+    """Set the ETag on a view's (response, status) tuple or response."""
+    response = result[0] if isinstance(result, tuple) else result
+    response.set_etag(etag)
+    return result
@@ -0,0 +1,231 @@
+# app/services/events.py
+"""
+Change feed for ActionLog entries, served as server-sent events.
+
+Committed ActionLog entries are published to an in-process ChangeHub:
+create_action_log, bulk_transition and submit_many queue their entries on
+the session and an after_commit listener publishes them; the async audit
+writer publishes each batch once it is in the database. Every open stream
+subscribes to the hub and receives entries as they are published.
+
+Each event carries a cursor (created_at, id) as its SSE id. A client that
+reconnects with Last-Event-ID (or ?cursor=) is first caught up from the
+database, then switched to live events. created_at is stamped before the
+write commits, so the catch-up re-reads SSE_REPLAY_GRACE seconds before
+the cursor to pick up entries that committed late; delivery is therefore
+at-least-once and clients should de-duplicate on the entry id.
+
+The hub is per process: a stream sees entries written by its own worker
+live, and entries from other workers on its next catch-up (after a queue
+overflow or a reconnect, at the latest after SSE_MAX_SECONDS).
+"""
+import json
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, event, or_, select
+from sqlalchemy.orm import Session
+
+from app.services.pagination import decode_cursor, encode_cursor
+
+# ActionLog actions that change an application's status
+STATUS_ACTIONS = ("created", "verified", "approved")
+
+
+def log_event(entry):
+    """Normalize an ActionLog instance or row mapping to the event payload."""
+    get = entry.get if isinstance(entry, dict) else lambda k: getattr(entry, k)
+    created_at = get("created_at")
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    return {
+        "id": get("id"),
+        "application_id": get("application_id"),
+        "action": get("action"),
+        "actor_id": get("actor_id"),
+        "comment": get("comment"),
+        "created_at": created_at.isoformat(),
+    }
+
+
+class Subscription:
+    def __init__(self, application_id=None, status_only=False, maxsize=1000):
+        self.application_id = application_id
+        self.status_only = status_only
+        self.queue = queue.Queue(maxsize=maxsize)
+        # set when an event was dropped; the stream re-syncs from the database
+        self.overflowed = False
+
+    def matches(self, ev):
+        if self.application_id is not None and ev["application_id"] != self.application_id:
+            return False
+        return not self.status_only or ev["action"] in STATUS_ACTIONS
+
+
+class ChangeHub:
+    def __init__(self, queue_size=1000):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, application_id=None, status_only=False):
+        sub = Subscription(application_id, status_only, self.queue_size)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, events):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += len(events)
+        for sub in subscribers:
+            for ev in events:
+                if not sub.matches(ev):
+                    continue
+                try:
+                    sub.queue.put_nowait(ev)
+                except queue.Full:
+                    sub.overflowed = True
+                    break
+
+    def stats(self):
+        with self._lock:
+            return {"subscribers": len(self._subscribers), "published": self.published}
+
+
+def get_hub():
+    return current_app.extensions.get("change_hub") if has_app_context() else None
+
+
+def queue_log_events(entries):
+    """Publish `entries` to the change feed once the current session commits."""
+    from app.extensions import db
+
+    db.session.info.setdefault("log_events", []).extend(log_event(e) for e in entries)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session):
+    if session.in_nested_transaction():
+        return
+    events = session.info.pop("log_events", None)
+    hub = get_hub()
+    if events and hub is not None:
+        hub.publish(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_rollback(session):
+    if not session.in_nested_transaction():
+        session.info.pop("log_events", None)
+
+
+def catch_up(engine, application_id=None, status_only=False, after=None, grace=0.0, limit=500):
+    """
+    Committed entries after the `after` position (created_at, id), oldest
+    first, starting `grace` seconds early. Uses its own short-lived
+    connection so a long stream never holds a pooled one.
+    """
+    from app.models import ActionLog
+
+    table = ActionLog.__table__
+    stmt = select(table).order_by(table.c.created_at.asc(), table.c.id.asc()).limit(limit)
+    if application_id is not None:
+        stmt = stmt.where(table.c.application_id == application_id)
+    if status_only:
+        stmt = stmt.where(table.c.action.in_(STATUS_ACTIONS))
+    if after is not None:
+        created_at, row_id = after
+        if grace:
+            stmt = stmt.where(table.c.created_at >= created_at - timedelta(seconds=grace),
+                              table.c.id != row_id)
+        else:
+            stmt = stmt.where(or_(
+                table.c.created_at > created_at,
+                and_(table.c.created_at == created_at, table.c.id > row_id),
+            ))
+    with engine.connect() as conn:
+        return [log_event(row) for row in conn.execute(stmt).mappings()]
+
+
+def _format(ev, cursor):
+    return f"id: {cursor}\nevent: log\ndata: {json.dumps(ev, separators=(',', ':'))}\n\n"
+
+
+def event_stream(hub, engine, application_id=None, status_only=False, cursor=None,
+                 heartbeat=15.0, max_seconds=300.0, grace=2.0, batch=500, retry_ms=3000):
+    """
+    Generator of SSE frames: catch-up from `cursor` (None = live only, or the
+    full history for a single application), then live events, with comment
+    heartbeats. Ends after max_seconds; the client reconnects with
+    Last-Event-ID.
+    """
+    sub = hub.subscribe(application_id, status_only)
+    seen = set()
+    position = decode_cursor(cursor) if cursor else None
+    deadline = time.monotonic() + max_seconds
+
+    def emit(events):
+        nonlocal position
+        for ev in events:
+            if ev["id"] in seen:
+                continue
+            seen.add(ev["id"])
+            created_at = datetime.fromisoformat(ev["created_at"])
+            if position is None or (created_at, ev["id"]) > position:
+                position = (created_at, ev["id"])
+            yield _format(ev, encode_cursor(*position))
+
+    def resync():
+        nonlocal position
+        replay = grace if position is not None else 0.0
+        while True:
+            rows = catch_up(engine, application_id, status_only, position, replay, batch)
+            yield from emit(rows)
+            if len(rows) < batch:
+                return
+            last = (datetime.fromisoformat(rows[-1]["created_at"]), rows[-1]["id"])
+            position = max(position, last) if position is not None else last
+            replay = 0.0
+
+    try:
+        yield f"retry: {retry_ms}\n\n"
+        if cursor or application_id is not None:
+            yield from resync()
+        while time.monotonic() < deadline:
+            if sub.overflowed:
+                sub.overflowed = False
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                yield from resync()
+                continue
+            try:
+                ev = sub.queue.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0.01)))
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield from emit([ev])
+            if len(seen) > 10 * batch:
+                # only recent ids can come back through a grace replay
+                seen.clear()
+    finally:
+        hub.unsubscribe(sub)
+
+
+def init_change_feed(app):
+    hub = ChangeHub(queue_size=int(app.config.get("SSE_QUEUE_SIZE", 1000)))
+    app.extensions["change_hub"] = hub
+
+    metrics = app.extensions.get("metrics")
+    if metrics is not None:
+        subscribers = metrics.registry.gauge("sse_subscribers", "Open change-feed streams.")
+        metrics.registry.add_collector(lambda _r: subscribers.set(value=hub.stats()["subscribers"]))
+    return hub
@@ -0,0 +1,36 @@
+# app/services/fields.py
+"""
+Sparse fieldsets (`?fields=a,b,c`) for the application read endpoints.
+
+Only the requested columns are selected (see app.services.serializers),
+so the others are never fetched. That matters for `remarks`, a Text column
+(a CLOB on Oracle) that listings leave out unless asked for.
+"""
+from app.models import Application
+
+APPLICATION_FIELDS = tuple(c.name for c in Application.__table__.columns)
+
+# listings skip the LOB column by default; the detail view returns everything
+LIST_DEFAULT_FIELDS = tuple(f for f in APPLICATION_FIELDS if f != "remarks")
+DETAIL_DEFAULT_FIELDS = APPLICATION_FIELDS
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(raw, default):
+    """
+    Parse a comma-separated `fields` value into a tuple of column names in
+    model order. `id` is always included; None / empty gives `default`.
+    Unknown names raise InvalidFields.
+    """
+    if raw is None or not raw.strip():
+        return tuple(default)
+    requested = {f.strip() for f in raw.split(",") if f.strip()}
+    unknown = sorted(requested - set(APPLICATION_FIELDS))
+    if unknown:
+        raise InvalidFields("unknown fields: " + ", ".join(unknown))
+    requested.add("id")
+    return tuple(f for f in APPLICATION_FIELDS if f in requested)
+
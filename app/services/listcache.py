@@ -0,0 +1,217 @@
+# app/services/listcache.py
+"""
+Result cache for GET /api/applications/.
+
+Entries are keyed by the normalized filters, the page or cursor, and the
+generation counter of the scope the listing reads: the department when the
+list is filtered by one, the global scope otherwise. Writes never delete
+entries; they bump counters, so older entries become unreachable and age
+out through LRU eviction and LIST_CACHE_TTL.
+
+The counters live in the listing_generations table. Any write that goes
+through stats.record_transition (single and batch submit, verify,
+approve, bulk transitions) bumps its department's row in the same
+transaction, so every worker sees the new generation as soon as the write
+commits, and a rolled-back write bumps nothing. The global generation is
+the sum over all departments.
+
+Backends (LIST_CACHE_BACKEND) only hold entries:
+  memory  per-process LRU
+  sqlite  one SQLite file (LIST_CACHE_PATH) shared by every worker on the
+          host
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import ListingGeneration
+
+GLOBAL_SCOPE = "*"
+
+
+class MemoryBackend:
+    def __init__(self, maxsize=1024, ttl=30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteBackend:
+    """
+    Cache shared by the workers of one host through a WAL-mode SQLite file.
+    Each thread (and forked process) opens its own connection.
+    """
+
+    # evict on every Nth set rather than every write
+    EVICT_EVERY = 32
+
+    def __init__(self, path, maxsize=1024, ttl=30.0):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        self._sets = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS entries ("
+                     "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, used REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_used ON entries (used)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute("SELECT value FROM entries WHERE key = ? AND expires >= ?", (key, now)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE entries SET used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO entries (key, value, expires, used) VALUES (?, ?, ?, ?)",
+                     (key, json.dumps(value, separators=(",", ":")), now + self.ttl, now))
+        self._sets += 1
+        if self._sets % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+        conn.execute("DELETE FROM entries WHERE key IN ("
+                     "SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?)", (self.maxsize,))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM entries")
+
+
+class ListingCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.lookups = None  # optional metrics counter labelled by result
+
+    def key(self, filters, page_args):
+        """
+        Cache key for a listing: filters and paging args, normalized, plus
+        the generation of the scope the listing depends on.
+        """
+        department = filters.get("department")
+        scope = department or GLOBAL_SCOPE
+        generation = current_generation(department)
+        parts = {
+            "f": sorted((k, v) for k, v in filters.items() if v),
+            "p": sorted(page_args.items()),
+            "g": [scope, generation],
+        }
+        return json.dumps(parts, separators=(",", ":"), default=str)
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        if self.lookups is not None:
+            self.lookups.inc(("miss" if value is None else "hit",))
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+
+def current_generation(department=None):
+    """
+    Committed write count of `department`, or of every department when
+    None. One indexed read in the request's session.
+    """
+    if department:
+        stmt = select(ListingGeneration.generation).where(ListingGeneration.department == department)
+    else:
+        stmt = select(func.coalesce(func.sum(ListingGeneration.generation), 0))
+    return db.session.execute(stmt).scalar() or 0
+
+
+def mark_stale(department):
+    """
+    Bump the listing generation of `department` inside the current session
+    transaction. Called from stats.record_transition; takes effect, for
+    every worker, when that transaction commits.
+    """
+    stmt = (
+        update(ListingGeneration)
+        .where(ListingGeneration.department == department)
+        .values(generation=ListingGeneration.generation + 1)
+    )
+    if db.session.execute(stmt).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(ListingGeneration).values(department=department, generation=1))
+    except IntegrityError:
+        db.session.execute(stmt)
+
+
+def init_list_cache(app):
+    """Create the listing cache for LIST_CACHE_BACKEND ('memory', 'sqlite'; '' disables)."""
+    kind = (app.config.get("LIST_CACHE_BACKEND") or "").lower()
+    if not kind or kind == "none":
+        return None
+    maxsize = int(app.config.get("LIST_CACHE_SIZE", 1024))
+    ttl = float(app.config.get("LIST_CACHE_TTL", 30))
+    if kind == "sqlite":
+        path = app.config.get("LIST_CACHE_PATH") or os.path.join(app.instance_path, "list_cache.sqlite")
+        backend = SQLiteBackend(path, maxsize=maxsize, ttl=ttl)
+    elif kind == "memory":
+        backend = MemoryBackend(maxsize=maxsize, ttl=ttl)
+    else:
+        raise ValueError(f"unknown LIST_CACHE_BACKEND {kind!r}")
+    cache = ListingCache(backend)
+    app.extensions["list_cache"] = cache
+
+    metrics = app.extensions.get("metrics")
+    if metrics is not None:
+        cache.lookups = metrics.registry.counter(
+            "list_cache_lookups_total", "Listing cache lookups, by result.", ("result",))
+    return cache
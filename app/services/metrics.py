@@ -0,0 +1,434 @@
+# app/services/metrics.py
+"""
+Minimal Prometheus-style metrics for the app.
+
+Counters, gauges and histograms keyed by label tuples, rendered in the text
+exposition format at /metrics. Every observation is a dict update under one
+lock, so instrumentation stays cheap on the request path.
+
+Multi-process mode (METRICS_MULTIPROC_DIR): each worker periodically writes
+a JSON snapshot of its registry to that directory and /metrics merges every
+snapshot. Files are keyed by pid and process start time, so a recycled pid
+is not mistaken for the worker that used it before. Counters and histograms
+are summed over all files, including those of exited workers so totals
+never go backwards; gauges are summed over live workers only.
+
+Snapshots of exited workers are folded into metrics-archive.json (counters
+and histograms only) and removed, so the directory does not grow with
+every worker restart. /metrics does this for whatever it finds dead; wire
+mark_process_dead into gunicorn to do it as soon as a worker exits:
+
+    # gunicorn.conf.py
+    def child_exit(server, worker):
+        from app.services.metrics import mark_process_dead
+        mark_process_dead(worker.pid)
+"""
+import atexit
+import bisect
+import contextlib
+import glob
+import json
+import os
+import threading
+import time
+
+from flask import g, request
+
+try:  # serializes archive updates between workers
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _fmt(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Family:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = registry._lock
+        self._values = {}
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Family):
+    kind = "gauge"
+
+    def set(self, labels=(), value=0):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, labels=(), value=0.0):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # per-bucket (non-cumulative) counts + overflow, sum, count
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+
+def _copy_value(value):
+    if isinstance(value, list):  # histogram state
+        return [list(value[0]), value[1], value[2]]
+    return value
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}
+        self._collectors = []
+
+    def _add(self, family):
+        return self._families.setdefault(family.name, family)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(self, name, documentation, labelnames, buckets))
+
+    def add_collector(self, fn):
+        """
+        Register fn(registry), called before every snapshot to refresh
+        gauges that are read from elsewhere (pool sizes, queue depths...).
+        """
+        self._collectors.append(fn)
+
+    def collect(self):
+        for fn in self._collectors:
+            try:
+                fn(self)
+            except Exception:
+                pass
+
+    def snapshot(self):
+        self.collect()
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "families": {
+                    f.name: {
+                        "kind": f.kind,
+                        "help": f.documentation,
+                        "labelnames": list(f.labelnames),
+                        "buckets": list(getattr(f, "buckets", ())),
+                        "values": [[list(k), _copy_value(v)] for k, v in f._values.items()],
+                    }
+                    for f in self._families.values()
+                },
+            }
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def _start_time(pid):
+    """Start time of `pid` in clock ticks since boot (Linux), else None."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as fh:
+            stat = fh.read()
+    except OSError:
+        return None
+    # the command name may contain spaces; field 22 counts from after it
+    return int(stat.rsplit(b")", 1)[1].split()[19])
+
+
+def _alive(snap):
+    """True if the process that wrote `snap` is still running."""
+    pid = snap.get("pid")
+    if pid is None:
+        return False
+    if pid == os.getpid():
+        return True
+    if not _pid_alive(pid):
+        return False
+    started = snap.get("started")
+    return started is None or _start_time(pid) in (None, started)
+
+
+def merge_snapshots(snapshots):
+    """Combine per-process snapshots into one family map."""
+    merged = {}
+    for snap in snapshots:
+        alive = _alive(snap)
+        for name, fam in snap["families"].items():
+            if fam["kind"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, dict(fam, values={}))
+            for key, value in fam["values"]:
+                key = tuple(key)
+                if fam["kind"] == "histogram":
+                    cur = target["values"].get(key)
+                    if cur is None:
+                        target["values"][key] = [list(value[0]), value[1], value[2]]
+                    else:
+                        cur[0] = [a + b for a, b in zip(cur[0], value[0])]
+                        cur[1] += value[1]
+                        cur[2] += value[2]
+                else:
+                    target["values"][key] = target["values"].get(key, 0) + value
+    return merged
+
+
+def render(families):
+    lines = []
+    for name in sorted(families):
+        fam = families[name]
+        lines.append(f"# HELP {name} {fam['help']}")
+        lines.append(f"# TYPE {name} {fam['kind']}")
+        names = fam["labelnames"]
+        for key in sorted(fam["values"], key=lambda k: tuple(str(x) for x in k)):
+            value = fam["values"][key]
+            if fam["kind"] == "histogram":
+                counts, total, count = value
+                running = 0
+                for bound, n in zip(list(fam["buckets"]) + [float("inf")], counts):
+                    running += n
+                    lines.append(f"{name}_bucket{_labels(names, key, [('le', _fmt(float(bound)))])} {running}")
+                lines.append(f"{name}_sum{_labels(names, key)} {_fmt(float(total))}")
+                lines.append(f"{name}_count{_labels(names, key)} {count}")
+            else:
+                lines.append(f"{name}{_labels(names, key)} {_fmt(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _read_snapshot(path):
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None  # a worker is mid-write or the file vanished
+
+
+@contextlib.contextmanager
+def _dir_lock(multiproc_dir, exclusive):
+    """
+    flock on metrics.lock: exclusive while the archive is rewritten, shared
+    while /metrics reads, so a scrape never sees a dead worker both in the
+    archive and in its own file, or in neither.
+    """
+    with open(os.path.join(multiproc_dir, "metrics.lock"), "a") as lock:
+        if fcntl:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def _archive(multiproc_dir, paths):
+    """Fold the snapshots at `paths` into metrics-archive.json and remove them."""
+    if not paths:
+        return
+    with _dir_lock(multiproc_dir, exclusive=True):
+        archive_path = os.path.join(multiproc_dir, "metrics-archive.json")
+        snapshots = [_read_snapshot(archive_path) or {"pid": None, "families": {}}]
+        dead = []
+        for path in paths:
+            snap = _read_snapshot(path)  # re-read: another worker may have archived it
+            if snap is not None:
+                snapshots.append(snap)
+                dead.append(path)
+        if not dead:
+            return
+        families = merge_snapshots(snapshots)
+        archive = {
+            "pid": None,
+            "families": {
+                name: dict(fam, values=[[list(k), v] for k, v in fam["values"].items()])
+                for name, fam in families.items() if fam["kind"] != "gauge"
+            },
+        }
+        tmp = f"{archive_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(archive, fh)
+        os.replace(tmp, archive_path)
+        for path in dead:
+            os.remove(path)
+
+
+def mark_process_dead(pid, multiproc_dir=None):
+    """
+    Archive the snapshot files of exited worker `pid` (see the module
+    docstring). `multiproc_dir` defaults to $METRICS_MULTIPROC_DIR.
+    """
+    multiproc_dir = multiproc_dir or os.getenv("METRICS_MULTIPROC_DIR")
+    if not multiproc_dir:
+        return
+    _archive(multiproc_dir, glob.glob(os.path.join(multiproc_dir, f"metrics-{pid}-*.json")))
+
+
+class Metrics:
+    """
+    Per-app metrics: the registry, the request instrumentation families and
+    the optional multi-process snapshot files.
+    """
+
+    def __init__(self, multiproc_dir=None, flush_interval=1.0, buckets=DEFAULT_BUCKETS):
+        self.registry = Registry()
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval
+        self._last_flush = 0.0
+        self._identity = None  # (pid, /proc start time or None, file name key)
+
+        self.requests = self.registry.counter(
+            "http_requests_total", "Requests handled, by endpoint, method and status.",
+            ("endpoint", "method", "status"))
+        self.latency = self.registry.histogram(
+            "http_request_duration_seconds", "Request latency by endpoint.",
+            ("endpoint", "method"), buckets)
+        self.in_flight = self.registry.gauge(
+            "http_requests_in_flight", "Requests currently being handled.")
+        self.exceptions = self.registry.counter(
+            "http_request_exceptions_total", "Unhandled exceptions, by endpoint.", ("endpoint",))
+
+        if multiproc_dir:
+            os.makedirs(multiproc_dir, exist_ok=True)
+            atexit.register(self.flush, True)
+
+    def _process(self):
+        # recomputed after a fork (gunicorn --preload)
+        pid = os.getpid()
+        if self._identity is None or self._identity[0] != pid:
+            started = _start_time(pid)
+            # without /proc, the first flush time keeps file names unique per process
+            self._identity = (pid, started, started if started is not None else time.time_ns())
+        return self._identity
+
+    def _path(self):
+        pid, _, key = self._process()
+        return os.path.join(self.multiproc_dir, f"metrics-{pid}-{key}.json")
+
+    def flush(self, force=False):
+        """Write this process' snapshot for the multi-process merge."""
+        if not self.multiproc_dir:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        path = self._path()
+        snap = self.registry.snapshot()
+        snap["started"] = self._identity[1]
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(snap, fh)
+        os.replace(tmp, path)
+
+    def exposition(self):
+        if not self.multiproc_dir:
+            return render(merge_snapshots([self.registry.snapshot()]))
+        self.flush(force=True)
+        pattern = os.path.join(self.multiproc_dir, "metrics-*.json")
+        dead = []
+        for path in glob.glob(pattern):
+            snap = _read_snapshot(path)
+            if snap is not None and snap.get("pid") is not None and not _alive(snap):
+                dead.append(path)
+        _archive(self.multiproc_dir, dead)
+        with _dir_lock(self.multiproc_dir, exclusive=False):
+            snapshots = [snap for snap in map(_read_snapshot, glob.glob(pattern)) if snap is not None]
+        return render(merge_snapshots(snapshots))
+
+    # -- request hooks ------------------------------------------------------
+
+    def before_request(self):
+        g._metrics_started = time.perf_counter()
+        self.in_flight.inc()
+
+    def after_request(self, response):
+        g._metrics_status = response.status_code
+        return response
+
+    def teardown_request(self, exc):
+        started = g.pop("_metrics_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        self.in_flight.dec()
+        endpoint = request.endpoint or "unmatched"
+        status = g.pop("_metrics_status", 500)
+        if exc is not None:
+            status = 500
+            self.exceptions.inc((endpoint,))
+        self.requests.inc((endpoint, request.method, str(status)))
+        self.latency.observe((endpoint, request.method), elapsed)
+        self.flush()
+
+
+def init_metrics(app):
+    """
+    Hook request instrumentation into `app` and expose GET /metrics.
+    Disabled with METRICS_ENABLED = False.
+    """
+    if not app.config.get("METRICS_ENABLED", True):
+        return None
+    metrics = Metrics(
+        multiproc_dir=app.config.get("METRICS_MULTIPROC_DIR"),
+        flush_interval=float(app.config.get("METRICS_FLUSH_INTERVAL", 1.0)),
+    )
+    app.extensions["metrics"] = metrics
+    app.before_request(metrics.before_request)
+    app.after_request(metrics.after_request)
+    app.teardown_request(metrics.teardown_request)
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        return metrics.exposition(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+    return metrics
@@ -0,0 +1,73 @@
+# app/services/pagination.py
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client supplies a cursor we did not issue."""
+
+
+def encode_cursor(created_at, row_id):
+    """
+    Build an opaque cursor from the (created_at, id) of the last row on a page.
+    """
+    payload = {
+        "c": created_at.isoformat() if created_at else None,
+        "i": row_id,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Reverse of encode_cursor. Returns (created_at, id) or raises InvalidCursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        created_at = datetime.fromisoformat(payload["c"])
+        row_id = payload["i"]
+    except Exception as e:
+        raise InvalidCursor(str(e)) from e
+    if not isinstance(row_id, str):
+        raise InvalidCursor("cursor id must be a string")
+    return created_at, row_id
+
+
+def keyset_page(query, model, cursor, per_page, execute=None):
+    """
+    Apply a (created_at DESC, id DESC) keyset window to `query`.
+
+    Fetches one extra row to decide whether another page exists, so the cost
+    of a page is an index range scan of per_page + 1 rows no matter how deep
+    the client has scrolled.
+
+    `query` is an ORM query, or a Core select together with `execute`
+    (e.g. db.session.execute); `model` may then be the Table and the page
+    is a list of plain rows.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    cols = getattr(model, "c", model)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                cols.created_at < created_at,
+                and_(cols.created_at == created_at, cols.id < row_id),
+            )
+        )
+
+    query = query.order_by(cols.created_at.desc(), cols.id.desc()).limit(per_page + 1)
+    rows = execute(query).all() if execute is not None else query.all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
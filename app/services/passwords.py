@@ -0,0 +1,194 @@
+# app/services/passwords.py
+"""
+Password hashing off the request thread.
+
+Hash and verify run on a bounded worker pool (process pool by default) so a
+burst of logins cannot pin every gunicorn thread on PBKDF2/bcrypt. When the
+pool and its queue are full, callers get HashingBusy and the routes answer
+503 with Retry-After instead of queueing without bound.
+
+The process pool uses the spawn start method, and a spawned child starts
+by re-importing the parent's __main__ module (as __mp_main__). Entry
+points must skip the app under that name (as run.py does), or every
+hashing worker would run create_app() again. Jobs are submitted as bcrypt
+or werkzeug functions, so children import nothing from the app package.
+
+New hashes use PASSWORD_HASH_SCHEME ("bcrypt" or "pbkdf2") at the configured
+cost; verify accepts both, and needs_rehash tells login when a stored hash
+should be upgraded.
+"""
+import atexit
+import base64
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool has no free slot."""
+
+
+def _bcrypt_input(password):
+    # bcrypt only looks at 72 bytes (and bcrypt>=5 rejects longer input), so
+    # feed it a fixed-length digest of the password instead
+    return base64.b64encode(hashlib.sha256(password.encode("utf-8")).digest())
+
+
+def _hash_job(password, scheme, bcrypt_rounds, pbkdf2_iterations):
+    # (library function, args): a spawned pool worker only has to import
+    # bcrypt / werkzeug to unpickle it, not the whole app package
+    if scheme == "bcrypt":
+        import bcrypt
+
+        return bcrypt.hashpw, (_bcrypt_input(password), bcrypt.gensalt(rounds=bcrypt_rounds))
+    return generate_password_hash, (password, f"pbkdf2:sha256:{pbkdf2_iterations}")
+
+
+def _verify_job(password, hashed):
+    if hashed.startswith("$2"):
+        import bcrypt
+
+        return bcrypt.checkpw, (_bcrypt_input(password), hashed.encode("ascii"))
+    return check_password_hash, (hashed, password)
+
+
+def _text(hashed):
+    return hashed.decode("ascii") if isinstance(hashed, bytes) else hashed
+
+
+def hash_password_sync(password, scheme="bcrypt", bcrypt_rounds=12, pbkdf2_iterations=600000):
+    """Hash on the calling thread."""
+    fn, args = _hash_job(password, scheme, bcrypt_rounds, pbkdf2_iterations)
+    return _text(fn(*args))
+
+
+def verify_password_sync(password, hashed):
+    """Check a password against a bcrypt or werkzeug hash on the calling thread."""
+    if not hashed:
+        return False
+    fn, args = _verify_job(password, hashed)
+    return fn(*args)
+
+
+def needs_rehash(hashed, scheme="bcrypt", bcrypt_rounds=12, pbkdf2_iterations=600000):
+    """True if `hashed` was made with another scheme or cost than configured."""
+    if not hashed:
+        return True
+    if scheme == "bcrypt":
+        # $2b$12$...
+        return not hashed.startswith("$2") or hashed.split("$")[2] != f"{bcrypt_rounds:02d}"
+    return not hashed.startswith(f"pbkdf2:sha256:{pbkdf2_iterations}$")
+
+
+def configured_params():
+    """Scheme and cost from the app config (defaults outside an app context)."""
+    if not has_app_context():
+        return {}
+    cfg = current_app.config
+    return {
+        "scheme": cfg.get("PASSWORD_HASH_SCHEME", "bcrypt"),
+        "bcrypt_rounds": int(cfg.get("PASSWORD_BCRYPT_ROUNDS", 12)),
+        "pbkdf2_iterations": int(cfg.get("PASSWORD_PBKDF2_ITERATIONS", 600000)),
+    }
+
+
+class PasswordHasher:
+    def __init__(self, workers=2, queue_size=8, timeout=10.0, kind="process",
+                 scheme="bcrypt", bcrypt_rounds=12, pbkdf2_iterations=600000):
+        self.scheme = scheme
+        self.bcrypt_rounds = bcrypt_rounds
+        self.pbkdf2_iterations = pbkdf2_iterations
+        self.timeout = timeout
+        self.kind = kind
+        self.workers = workers
+        self._pool_lock = threading.Lock()
+        self._pool = self._new_pool()
+        # running + waiting jobs; anything beyond is rejected right away
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def _new_pool(self):
+        if self.kind == "process":
+            # spawn, not fork: forking a threaded gunicorn worker can copy a
+            # lock held by another thread into the child
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+    def _replace_pool(self, broken):
+        # a worker died (OOM kill, segfault): the executor is unusable for good,
+        # so swap in a fresh one; the first caller to notice does the swap
+        with self._pool_lock:
+            if self._pool is broken:
+                self._pool = self._new_pool()
+                broken.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        pool = self._pool
+        try:
+            future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._replace_pool(pool)
+            raise HashingBusy()
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HashingBusy()
+        except BrokenProcessPool:
+            self._replace_pool(pool)
+            raise HashingBusy()
+
+    def hash(self, password):
+        fn, args = _hash_job(password, self.scheme, self.bcrypt_rounds, self.pbkdf2_iterations)
+        return _text(self._run(fn, *args))
+
+    def verify(self, password, hashed):
+        if not hashed:
+            return False
+        fn, args = _verify_job(password, hashed)
+        return self._run(fn, *args)
+
+    def needs_rehash(self, hashed):
+        return needs_rehash(hashed, self.scheme, self.bcrypt_rounds, self.pbkdf2_iterations)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_hasher_lock = threading.Lock()
+
+
+def get_hasher():
+    """
+    The app's PasswordHasher, created on first use so pool workers are not
+    started before gunicorn forks the app workers.
+    """
+    hasher = current_app.extensions.get("password_hasher")
+    if hasher is not None:
+        return hasher
+    with _hasher_lock:
+        # another request thread may have built it while we waited
+        hasher = current_app.extensions.get("password_hasher")
+        if hasher is not None:
+            return hasher
+        cfg = current_app.config
+        hasher = PasswordHasher(
+            workers=int(cfg.get("PASSWORD_HASH_WORKERS", 2)),
+            queue_size=int(cfg.get("PASSWORD_HASH_QUEUE", 8)),
+            timeout=float(cfg.get("PASSWORD_HASH_TIMEOUT", 10)),
+            kind=cfg.get("PASSWORD_HASH_POOL", "process"),
+            **configured_params(),
+        )
+        current_app.extensions["password_hasher"] = hasher
+        atexit.register(hasher.shutdown)
+    return hasher
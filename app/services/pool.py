@@ -0,0 +1,236 @@
+# app/services/pool.py
+"""
+Connection pool telemetry and the /ready probe.
+
+Exports gauges for connections checked out and overflow in use, a histogram
+of checkout wait time (time spent getting a connection from the pool,
+including opening a new one), and counters for new connections, pre-ping
+failures and invalidated connections. They show up on /metrics when
+metrics are on.
+
+Only SQLAlchemy and Flask events are used. A checkout is timed from the
+ORM statement or flush that needs it (Session do_orm_execute/before_flush)
+to the pool's checkout event, so the histogram covers Session checkouts,
+which is what requests wait on; direct engine.connect() callers (the audit
+writer, the /ready ping) are not timed. A checkout that gives up raises
+PoolTimeout without firing any pool event; it is counted when it fails a
+request (Flask's got_request_exception) and recorded as a wait of the
+pool's timeout.
+
+GET /ready answers 503 while the pool is saturated (checked-out connections
+at or above READY_POOL_SATURATION of pool_size + max_overflow) or the
+database does not answer a ping, so the load balancer drains the worker
+instead of queueing more requests behind the pool. The ping result is
+cached for READY_PING_TTL seconds to keep the probe cheap.
+"""
+import threading
+import time
+
+from flask import got_request_exception
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.orm import Session
+
+from app.services.metrics import Registry
+
+# weight of the newest checkout in recent_wait
+WAIT_EWMA_ALPHA = 0.2
+
+CHECKOUT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# when this thread's pending Session statement started waiting for a
+# connection; shared by every engine's telemetry, read at checkout
+_pending = threading.local()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _stamp_statement(orm_execute_state):
+    _pending.started = time.perf_counter()
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_flush(session, flush_context, instances):
+    _pending.started = time.perf_counter()
+
+
+@event.listens_for(Session, "after_begin")
+def _clear_stamp(session, transaction, connection):
+    # the connection is in hand; a checkout, if any, has been timed
+    _pending.started = None
+
+
+def _take_stamp():
+    started = getattr(_pending, "started", None)
+    _pending.started = None
+    return started
+
+
+class PoolTelemetry:
+    def __init__(self, engine, registry=None, saturation=1.0, ping_ttl=2.0, max_overflow=None):
+        self.engine = engine
+        self.registry = registry or Registry()
+        self.saturation = saturation
+        self.ping_ttl = ping_ttl
+        # the configured max_overflow; pools don't expose it
+        self.max_overflow = max_overflow
+        self._ping_lock = threading.Lock()
+        self._ping = None  # (ok, error, monotonic time)
+        # smoothed checkout wait in seconds; drives admission control
+        self.recent_wait = 0.0
+
+        r = self.registry
+        self.checked_out = r.gauge("db_pool_checked_out", "Connections currently checked out.")
+        self.overflow = r.gauge("db_pool_overflow", "Overflow connections in use beyond pool_size.")
+        self.capacity = r.gauge("db_pool_capacity", "pool_size + max_overflow.")
+        self.checkout_wait = r.histogram(
+            "db_pool_checkout_seconds", "Time spent waiting for a pooled connection.",
+            buckets=CHECKOUT_BUCKETS)
+        self.pre_ping_failures = r.counter(
+            "db_pool_pre_ping_failures_total", "Connections found dead by pool_pre_ping.")
+        self.invalidations = r.counter(
+            "db_pool_invalidations_total", "Connections invalidated, by kind.", ("kind",))
+        self.checkout_timeouts = r.counter(
+            "db_pool_checkout_timeouts_total", "Checkouts that gave up waiting for a connection.")
+        self.connections_opened = r.counter(
+            "db_pool_connections_opened_total", "New DBAPI connections opened by the pool.")
+        r.add_collector(self._collect)
+
+        event.listen(engine, "handle_error", self._on_error)
+        # pool events registered on the engine follow it across dispose()
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "soft_invalidate", self._on_soft_invalidate)
+        event.listen(engine, "before_execute", self._on_execute)
+
+    # -- hooks --------------------------------------------------------------
+
+    def _observe_wait(self, waited):
+        self.checkout_wait.observe(value=waited)
+        self.recent_wait += WAIT_EWMA_ALPHA * (waited - self.recent_wait)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connections_opened.inc()
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        started = _take_stamp()
+        if started is not None:
+            self._observe_wait(time.perf_counter() - started)
+
+    def _on_execute(self, conn, clauseelement, multiparams, params, execution_options):
+        # the statement ran on a connection the session already held
+        _pending.started = None
+
+    def on_request_exception(self, sender, exception, **extra):
+        """got_request_exception receiver: count checkouts that timed out."""
+        if isinstance(exception, PoolTimeout):
+            _take_stamp()
+            self.checkout_timeouts.inc()
+            pool = self.engine.pool
+            if hasattr(pool, "timeout"):
+                self._observe_wait(pool.timeout())
+
+    def _on_error(self, context):
+        if getattr(context, "is_pre_ping", False):
+            self.pre_ping_failures.inc()
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations.inc(("hard",))
+
+    def _on_soft_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations.inc(("soft",))
+
+    def _collect(self, _registry):
+        stats = self.pool_stats()
+        self.checked_out.set(value=stats["checked_out"])
+        self.overflow.set(value=stats["overflow"])
+        self.capacity.set(value=stats["capacity"] or 0)
+
+    # -- state --------------------------------------------------------------
+
+    def pool_stats(self):
+        """
+        Current pool usage. capacity is None for pools without a fixed
+        limit (sqlite's SingletonThreadPool/StaticPool, NullPool).
+        """
+        pool = self.engine.pool
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+        size = pool.size() if hasattr(pool, "size") else None
+        bounded = size is not None and hasattr(pool, "overflow")
+        if not bounded or self.max_overflow is None or self.max_overflow < 0:
+            capacity = None
+        else:
+            capacity = size + self.max_overflow
+        overflow = max(pool.overflow(), 0) if bounded and size else 0
+        return {
+            "pool": type(pool).__name__,
+            "size": size,
+            "checked_out": checked_out,
+            "overflow": overflow,
+            "capacity": capacity,
+        }
+
+    def saturated(self, stats=None):
+        stats = stats or self.pool_stats()
+        capacity = stats["capacity"]
+        return bool(capacity) and stats["checked_out"] >= capacity * self.saturation
+
+    def ping(self):
+        """(ok, error) for SELECT 1, cached for ping_ttl seconds."""
+        now = time.monotonic()
+        cached = self._ping
+        if cached is not None and now - cached[2] < self.ping_ttl:
+            return cached[0], cached[1]
+        with self._ping_lock:
+            cached = self._ping
+            if cached is not None and time.monotonic() - cached[2] < self.ping_ttl:
+                return cached[0], cached[1]
+            try:
+                with self.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                ok, error = True, None
+            except Exception as e:
+                ok, error = False, str(e)
+            self._ping = (ok, error, time.monotonic())
+            return ok, error
+
+    def readiness(self):
+        """(ready, body) for the /ready endpoint."""
+        stats = self.pool_stats()
+        if self.saturated(stats):
+            # don't ping: it would queue behind the same exhausted pool
+            return False, {"status": "not ready", "reason": "pool saturated", "pool": stats}
+        ok, error = self.ping()
+        if not ok:
+            return False, {"status": "not ready", "reason": "database unavailable",
+                           "error": error, "pool": stats}
+        return True, {"status": "ready", "pool": stats}
+
+
+def init_pool_telemetry(app):
+    """
+    Instrument the app's engine pool and register GET /ready.
+    Pool metrics go to the /metrics registry when metrics are enabled.
+    """
+    from app.extensions import db
+
+    with app.app_context():
+        engine = db.engine
+    metrics = app.extensions.get("metrics")
+    options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+    telemetry = PoolTelemetry(
+        engine,
+        registry=metrics.registry if metrics is not None else None,
+        saturation=float(app.config.get("READY_POOL_SATURATION", 1.0)),
+        ping_ttl=float(app.config.get("READY_PING_TTL", 2.0)),
+        max_overflow=options.get("max_overflow", 10),  # QueuePool's default
+    )
+    app.extensions["pool_telemetry"] = telemetry
+    got_request_exception.connect(telemetry.on_request_exception, app)
+
+    @app.route("/ready")
+    def ready():
+        ok, body = telemetry.readiness()
+        return body, 200 if ok else 503
+
+    return telemetry
@@ -0,0 +1,358 @@
+# app/services/processing.py
+"""
+Post-upload processing of attachments, off the request path.
+
+An upload returns as soon as its bytes are stored and the Attachment row
+is committed (processing_status "pending"); the id is then queued for a
+small pool of worker threads. Each worker claims the row, reads the
+stored bytes once and feeds every configured stage (PROCESSING_STAGES):
+
+- checksum: the bytes still hash to the attachment's digest
+- sniff: content type from the leading bytes (detected_mime_type), so a
+  file that does not match its declared mime_type can be flagged
+
+With PROCESSING_EXECUTOR=process the stages run in a process pool instead
+(local files only), for CPU-heavy stages that would hold the GIL. The
+stages live in app/services/attachment_stages.py, which imports only the
+standard library: a spawned pool worker unpickling run_stages then does
+not load Flask, SQLAlchemy or the models.
+
+The queue is only a shortcut: the database is the source of truth. A
+poller picks up pending rows whose retry is due (rows queued before a
+restart, rows dropped from a full queue, migrated attachments) and rows
+whose worker lease ran out. Failures are retried with exponential backoff
+up to PROCESSING_MAX_ATTEMPTS; a checksum mismatch fails at once.
+"""
+import atexit
+import logging
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, func, or_, select, update
+
+from app.extensions import db
+from app.models import Attachment
+from app.services.attachment_stages import (
+    DEFAULT_STAGES, STAGES, ProcessingError, feed_stages, mime_mismatch, run_stages,
+)
+
+logger = logging.getLogger(__name__)
+
+def _due(table, now):
+    return or_(
+        and_(table.c.processing_status == "pending",
+             or_(table.c.processing_due_at.is_(None), table.c.processing_due_at <= now)),
+        and_(table.c.processing_status == "processing", table.c.processing_due_at < now),
+    )
+
+
+def due_attachments(limit=100, now=None):
+    """Ids of attachments waiting for processing (or whose worker died), oldest first."""
+    table = Attachment.__table__
+    return db.session.execute(
+        select(table.c.id)
+        .where(_due(table, now or datetime.utcnow()))
+        .order_by(table.c.created_at)
+        .limit(limit)
+    ).scalars().all()
+
+
+def process_attachment(attachment_id, storage, stages=DEFAULT_STAGES, max_attempts=5, backoff=30.0,
+                       lease=300.0, chunk_size=1024 * 1024, runner=None):
+    """
+    Claim one attachment, run the stages over its bytes and record the
+    outcome. `runner(fn, *args)` runs the stages elsewhere (a process
+    pool); by default they run in the calling thread. Returns the new
+    processing_status, or None when the attachment was not due (already
+    done, or claimed by another worker).
+    """
+    table = Attachment.__table__
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        update(table)
+        .where(table.c.id == attachment_id, _due(table, now))
+        .values(
+            processing_status="processing",
+            processing_attempts=table.c.processing_attempts + 1,
+            processing_due_at=now + timedelta(seconds=lease),
+        )
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return None
+    row = db.session.execute(
+        select(table.c.digest, table.c.storage_key, table.c.processing_attempts).where(table.c.id == attachment_id)
+    ).one()
+    db.session.commit()
+
+    job = {"digest": row.digest}
+    values = {"processing_due_at": None}
+    try:
+        if not row.storage_key:
+            raise ProcessingError("attachment has no stored bytes")
+        path = storage.local_path(row.storage_key)
+        if path is None:
+            with closing(storage.open(row.storage_key)) as stream:
+                results = feed_stages(stream, job, stages, chunk_size)
+        elif runner is not None:
+            results = runner(run_stages, path, job, tuple(stages), chunk_size)
+        else:
+            results = run_stages(path, job, stages, chunk_size)
+        values.update(results, processing_status="ready", processing_error=None, processed_at=datetime.utcnow())
+    except ProcessingError as e:
+        values.update(processing_status="failed", processing_error=str(e)[:500])
+    except Exception as e:
+        logger.warning("attachment processing failed", extra={"attachment_id": attachment_id, "error": str(e)})
+        values["processing_error"] = f"{type(e).__name__}: {e}"[:500]
+        if row.processing_attempts >= max_attempts:
+            values["processing_status"] = "failed"
+        else:
+            values["processing_status"] = "pending"
+            values["processing_due_at"] = datetime.utcnow() + timedelta(
+                seconds=backoff * 2 ** (row.processing_attempts - 1)
+            )
+
+    # a worker whose lease ran out and was re-claimed must not overwrite
+    db.session.execute(
+        update(table)
+        .where(
+            table.c.id == attachment_id,
+            table.c.processing_status == "processing",
+            table.c.processing_attempts == row.processing_attempts,
+        )
+        .values(**values)
+    )
+    db.session.commit()
+    return values["processing_status"]
+
+
+def process_pending(storage, batch_size=100, **options):
+    """Process every due attachment in the calling thread; returns counts by outcome."""
+    counts = {"ready": 0, "failed": 0, "pending": 0}
+    while True:
+        ids = due_attachments(batch_size)
+        for attachment_id in ids:
+            status = process_attachment(attachment_id, storage, **options)
+            if status is not None:
+                counts[status] += 1
+        if len(ids) < batch_size:
+            return counts
+
+
+def processing_status(att):
+    """Body of GET .../attachments/<id>/processing."""
+    return {
+        "attachment_id": att.id,
+        "status": att.processing_status,
+        "attempts": att.processing_attempts,
+        "error": att.processing_error,
+        "mime_type": att.mime_type,
+        "detected_mime_type": att.detected_mime_type,
+        "mime_mismatch": mime_mismatch(att.mime_type, att.detected_mime_type),
+        "processed_at": att.processed_at.isoformat() if att.processed_at else None,
+        "next_attempt_at": (
+            att.processing_due_at.isoformat()
+            if att.processing_status == "pending" and att.processing_due_at else None
+        ),
+    }
+
+
+def processing_counts():
+    """Attachments per processing_status."""
+    table = Attachment.__table__
+    rows = db.session.execute(
+        select(table.c.processing_status, func.count()).group_by(table.c.processing_status)
+    ).all()
+    return {status: count for status, count in rows}
+
+
+def enqueue_processing(attachment_id):
+    """Hand a committed attachment to this worker's pipeline, if it runs one."""
+    pipeline = current_app.extensions.get("processing")
+    if pipeline is not None:
+        pipeline.submit(attachment_id)
+
+
+def processing_options(config):
+    """process_attachment() keyword arguments from the app config."""
+    names = [n.strip() for n in str(config.get("PROCESSING_STAGES", ",".join(DEFAULT_STAGES))).split(",")]
+    names = tuple(n for n in names if n)
+    unknown = [n for n in names if n not in STAGES]
+    if unknown:
+        raise ValueError(f"unknown PROCESSING_STAGES {unknown!r}")
+    return {
+        "stages": names,
+        "max_attempts": int(config.get("PROCESSING_MAX_ATTEMPTS", 5)),
+        "backoff": float(config.get("PROCESSING_RETRY_BACKOFF", 30)),
+        "lease": float(config.get("PROCESSING_LEASE", 300)),
+        "chunk_size": int(config.get("STORAGE_CHUNK_SIZE", 1024 * 1024)),
+    }
+
+
+_STOP = object()
+
+
+class ProcessingPipeline:
+    """
+    `workers` threads draining a bounded queue of attachment ids, plus a
+    poller that re-queues due rows every `poll_interval` seconds (and once
+    at start-up). With executor="process" each thread hands the stages to
+    a process pool of the same size.
+    """
+
+    def __init__(self, app, workers=2, executor="thread", poll_interval=30.0, batch_size=100,
+                 maxsize=1000, **options):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"unknown PROCESSING_EXECUTOR {executor!r}")
+        self.app = app
+        self.workers = workers
+        self.executor = executor
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.options = options
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._threads = []
+        self._pool = None
+        if executor == "process":
+            # spawn: forking a process that runs threads is not safe
+            self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self._lock = threading.Lock()
+        self.counters = {"submitted": 0, "dropped": 0, "ready": 0, "failed": 0, "retried": 0, "errors": 0}
+        self.last_error = None
+
+    def _count(self, key):
+        with self._lock:
+            self.counters[key] += 1
+
+    def submit(self, attachment_id):
+        try:
+            self._queue.put_nowait(attachment_id)
+            self._count("submitted")
+        except queue.Full:
+            # still pending in the database; the poller will find it
+            self._count("dropped")
+
+    def _run_in_pool(self, fn, *args):
+        return self._pool.submit(fn, *args).result()
+
+    def run_one(self, attachment_id):
+        with self.app.app_context():
+            try:
+                status = process_attachment(
+                    attachment_id,
+                    self.app.extensions["storage"],
+                    runner=self._run_in_pool if self._pool is not None else None,
+                    **self.options,
+                )
+                if status is not None:
+                    self._count("retried" if status == "pending" else status)
+                return status
+            except Exception as e:  # keep the worker alive; the lease expires and the poller retries
+                db.session.rollback()
+                self.last_error = str(e)
+                self._count("errors")
+                logger.exception("attachment processing crashed")
+                return None
+            finally:
+                db.session.remove()
+
+    def poll_once(self):
+        with self.app.app_context():
+            try:
+                ids = due_attachments(self.batch_size)
+            except Exception as e:
+                db.session.rollback()
+                self.last_error = str(e)
+                logger.exception("attachment processing poll failed")
+                return 0
+            finally:
+                db.session.remove()
+        for attachment_id in ids:
+            self.submit(attachment_id)
+        return len(ids)
+
+    def _work(self):
+        while True:
+            attachment_id = self._queue.get()
+            try:
+                if attachment_id is _STOP:
+                    return
+                self.run_one(attachment_id)
+            finally:
+                self._queue.task_done()
+
+    def _poll(self):
+        while True:
+            self.poll_once()
+            if self._stop.wait(self.poll_interval):
+                return
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"attachment-processing-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._poll, name="attachment-processing-poll", daemon=True)
+        t.start()
+        self._threads.append(t)
+        return self
+
+    def join(self, timeout=None):
+        """Wait until every queued id was processed; False on timeout."""
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+
+    def stats(self):
+        with self._lock:
+            return {"queue_depth": self._queue.qsize(), "workers": self.workers,
+                    "executor": self.executor, **self.counters, "last_error": self.last_error}
+
+    def shutdown(self, timeout=5.0):
+        self._stop.set()
+        for _ in range(self.workers):
+            try:
+                self._queue.put_nowait(_STOP)
+            except queue.Full:
+                break
+        for t in self._threads:
+            t.join(timeout)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def init_processing(app):
+    """
+    Start the processing pipeline when PROCESSING_WORKERS > 0. It is off
+    by default (flask db upgrade, scripts, tests); attachments then stay
+    pending for process_pending() / scripts/process_attachments.py.
+    """
+    workers = int(app.config.get("PROCESSING_WORKERS", 0))
+    if workers <= 0:
+        return None
+    pipeline = ProcessingPipeline(
+        app,
+        workers=workers,
+        executor=app.config.get("PROCESSING_EXECUTOR", "thread"),
+        poll_interval=float(app.config.get("PROCESSING_POLL_INTERVAL", 30)),
+        batch_size=int(app.config.get("PROCESSING_BATCH_SIZE", 100)),
+        maxsize=int(app.config.get("PROCESSING_QUEUE_MAXSIZE", 1000)),
+        **processing_options(app.config),
+    ).start()
+    app.extensions["processing"] = pipeline
+    atexit.register(pipeline.shutdown)
+
+    metrics = app.extensions.get("metrics")
+    if metrics is not None:
+        depth = metrics.registry.gauge("attachment_processing_queue_depth", "Attachments queued for processing.")
+
+        def collect(_registry):
+            depth.set(value=pipeline.stats()["queue_depth"])
+
+        metrics.registry.add_collector(collect)
+    return pipeline
@@ -0,0 +1,524 @@
+# app/services/search.py
+"""
+Full-text search over applications (emp_name, emp_no, designation, purpose,
+remarks) for GET /api/applications/search.
+
+Backends (SEARCH_BACKEND, "auto" picks by database dialect):
+  fts5    SQLite FTS5 table applications_fts, written in the same
+          transaction as the application rows, ranked with bm25()
+  oracle  Oracle Text CONTEXT index ix_applications_text (created by the
+          migration, SYNC ON COMMIT), ranked with SCORE()
+  memory  pure-Python inverted index with BM25 ranking; per process, built
+          in a background thread at startup (SEARCH_MEMORY_WARM) or on
+          first use, and refreshed in the background every
+          SEARCH_MEMORY_REFRESH seconds, so other workers' writes show up
+          after at most that long
+
+"auto" decides without touching the database: Oracle gets oracle, SQLite
+gets fts5 if the driver's SQLite library has the module (probed once per
+process on a private in-memory database), anything else gets memory.
+
+Every backend returns (application_id, rank) pairs ordered by rank, then
+id, where a lower rank is a better match. Query words are ANDed and each
+matches as a prefix.
+
+Ranks are not stable: a write between two pages changes the BM25
+statistics and so every score, so a (rank, id) keyset would skip or repeat
+rows. The first page therefore materializes the top SEARCH_SNAPSHOT_SIZE
+hits as a per-process snapshot and the cursor is a position in it. A
+cursor whose snapshot is gone (expired, or served by another worker)
+falls back to offset paging over a fresh ranking.
+"""
+import base64
+import hashlib
+import json
+import math
+import re
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+
+from flask import current_app, has_app_context
+from sqlalchemy import DDL, event, select, text
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Application
+from app.services.pagination import InvalidCursor
+
+SEARCH_FIELDS = ("emp_name", "emp_no", "designation", "purpose", "remarks")
+# relative weight of a hit in each field (same order as SEARCH_FIELDS)
+FIELD_WEIGHTS = (3.0, 3.0, 1.5, 1.0, 0.5)
+MAX_TERMS = 10
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class InvalidQuery(ValueError):
+    """Raised when a search string has no searchable words."""
+
+
+def parse_query(q):
+    """Lower-cased search words of `q` (at most MAX_TERMS)."""
+    terms = _WORD.findall((q or "").lower())
+    if not terms:
+        raise InvalidQuery("q must contain at least one word")
+    return list(dict.fromkeys(terms))[:MAX_TERMS]
+
+
+def encode_search_cursor(snapshot, offset, fingerprint):
+    raw = json.dumps({"s": snapshot, "o": offset, "f": fingerprint}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor):
+    """(snapshot key or None, offset, query fingerprint) of a search cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        snapshot, offset, fingerprint = payload["s"], int(payload["o"]), payload["f"]
+    except Exception as e:
+        raise InvalidCursor(str(e)) from e
+    if offset < 0 or not isinstance(fingerprint, str) or not (snapshot is None or isinstance(snapshot, str)):
+        raise InvalidCursor("malformed search cursor")
+    return snapshot, offset, fingerprint
+
+
+def _fingerprint(terms, filters):
+    key = json.dumps([terms, {k: v for k, v in (filters or {}).items() if v}], sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+class SnapshotCache:
+    """Materialized rankings of recent searches (bounded LRU with a TTL)."""
+
+    def __init__(self, maxsize=256, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            hits, expires = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return hits
+
+    def put(self, hits):
+        key = secrets.token_urlsafe(9)
+        with self._lock:
+            self._items[key] = (hits, time.monotonic() + self.ttl)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return key
+
+
+def search_doc(app):
+    """The indexed fields of an Application instance or row dict."""
+    get = app.get if isinstance(app, dict) else lambda k: getattr(app, k, None)
+    doc = {"id": get("id")}
+    for field in SEARCH_FIELDS:
+        doc[field] = get(field) or ""
+    return doc
+
+
+class SearchBackend:
+    """
+    Interface for search backends.
+
+    index(docs) runs inside the caller's transaction and must only become
+    visible with it; rebuild() re-creates the index from the applications
+    table and returns the number of documents; search() returns up to
+    `limit` (application_id, rank) pairs after skipping the first `offset`,
+    restricted to the status / department in `filters`.
+    """
+
+    name = None
+
+    def index(self, docs):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, terms, limit, offset=0, filters=None):
+        raise NotImplementedError
+
+
+def _filter_sql(filters, alias="a"):
+    clauses, params = [], {}
+    for key in ("status", "department"):
+        if filters and filters.get(key):
+            clauses.append(f"{alias}.{key} = :f_{key}")
+            params[f"f_{key}"] = filters[key]
+    return "".join(f" AND {c}" for c in clauses), params
+
+
+# -- SQLite FTS5 --------------------------------------------------------------
+
+FTS_TABLE = "applications_fts"
+FTS_CREATE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"app_id UNINDEXED, {', '.join(SEARCH_FIELDS)}, tokenize = 'unicode61 remove_diacritics 2')"
+)
+FTS_POPULATE = (
+    f"INSERT INTO {FTS_TABLE} (app_id, {', '.join(SEARCH_FIELDS)}) "
+    "SELECT id, " + ", ".join(f"COALESCE({f}, '')" for f in SEARCH_FIELDS) + " FROM applications"
+)
+
+# db.create_all() (tests, scripts/create_tables_dev.py) creates the FTS table
+# along with applications on SQLite; migrations create it explicitly
+event.listen(Application.__table__, "after_create", DDL(FTS_CREATE).execute_if(dialect="sqlite"))
+event.listen(Application.__table__, "before_drop",
+             DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"))
+
+
+@lru_cache(maxsize=None)
+def fts5_available(dbapi):
+    """True if the SQLite library behind DBAPI module `dbapi` has FTS5."""
+    try:
+        conn = dbapi.connect(":memory:")
+    except Exception:
+        return False
+    try:
+        conn.execute("CREATE VIRTUAL TABLE fts5_probe USING fts5(x)")
+    except Exception:
+        return False
+    finally:
+        conn.close()
+    return True
+
+
+class FTS5Backend(SearchBackend):
+    name = "fts5"
+
+    def index(self, docs):
+        if docs:
+            cols = ", ".join(SEARCH_FIELDS)
+            binds = ", ".join(f":{f}" for f in SEARCH_FIELDS)
+            db.session.execute(text(f"INSERT INTO {FTS_TABLE} (app_id, {cols}) VALUES (:id, {binds})"), docs)
+
+    def rebuild(self):
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql(FTS_CREATE)
+            conn.exec_driver_sql(f"DELETE FROM {FTS_TABLE}")
+            conn.exec_driver_sql(FTS_POPULATE)
+            return conn.exec_driver_sql(f"SELECT COUNT(*) FROM {FTS_TABLE}").scalar()
+
+    def search(self, terms, limit, offset=0, filters=None):
+        weights = ", ".join(str(w) for w in FIELD_WEIGHTS)
+        where, params = _filter_sql(filters)
+        sql = (
+            f"SELECT {FTS_TABLE}.app_id AS app_id, bm25({FTS_TABLE}, 0, {weights}) AS rank"
+            f" FROM {FTS_TABLE} JOIN applications a ON a.id = {FTS_TABLE}.app_id"
+            f" WHERE {FTS_TABLE} MATCH :match{where}"
+            f" ORDER BY rank, app_id LIMIT :limit OFFSET :offset"
+        )
+        params.update(match=" ".join(f'"{t}"*' for t in terms), limit=limit, offset=offset)
+        return [(r.app_id, r.rank) for r in db.session.execute(text(sql), params)]
+
+
+# -- Oracle Text --------------------------------------------------------------
+
+class OracleTextBackend(SearchBackend):
+    """
+    Uses the CONTEXT index from the 20261018_applications_search migration:
+    a MULTI_COLUMN_DATASTORE over SEARCH_FIELDS on applications.purpose,
+    synced on commit, so index() has nothing to do.
+    """
+
+    name = "oracle"
+    INDEX = "ix_applications_text"
+
+    def index(self, docs):
+        pass
+
+    def rebuild(self):
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql(f"ALTER INDEX {self.INDEX} REBUILD")
+            return conn.exec_driver_sql("SELECT COUNT(*) FROM applications").scalar()
+
+    def search(self, terms, limit, offset=0, filters=None):
+        where, params = _filter_sql(filters)
+        sql = (
+            "SELECT a.id AS app_id, -SCORE(1) AS rank FROM applications a"
+            f" WHERE CONTAINS(a.purpose, :match, 1) > 0{where}"
+            " ORDER BY rank, app_id OFFSET :offset ROWS FETCH NEXT :limit ROWS ONLY"
+        )
+        params.update(match=" AND ".join(f"{t}%" for t in terms), limit=limit, offset=offset)
+        return [(r.app_id, float(r.rank)) for r in db.session.execute(text(sql), params)]
+
+
+# -- pure Python ----------------------------------------------------------------
+
+class MemoryBackend(SearchBackend):
+    """BM25 over an in-process inverted index of field-weighted term counts."""
+
+    name = "memory"
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, refresh=300.0):
+        self.refresh = refresh
+        self._lock = threading.Lock()        # guards the index structures
+        self._build_lock = threading.Lock()  # one rebuild at a time
+        self._refreshed = None               # Event of the running background build
+        self._postings = defaultdict(dict)  # term -> {app_id: weighted tf}
+        self._lengths = {}                   # app_id -> weighted length
+        self._vocab = []                     # sorted terms, for prefix lookups
+        self._built_at = None
+        self._backlog = None                 # docs committed while a rebuild scans
+        self._refreshing = False
+
+    @staticmethod
+    def _add(postings, lengths, doc):
+        length = 0.0
+        for field, weight in zip(SEARCH_FIELDS, FIELD_WEIGHTS):
+            for term in _WORD.findall(str(doc[field]).lower()):
+                entry = postings[term]
+                entry[doc["id"]] = entry.get(doc["id"], 0.0) + weight
+                length += weight
+        lengths[doc["id"]] = length
+
+    def index(self, docs):
+        # applied after the transaction commits (see _apply_after_commit)
+        db.session.info.setdefault("search_docs", []).extend(docs)
+
+    def apply(self, docs):
+        with self._lock:
+            if self._backlog is not None:
+                self._backlog.extend(docs)
+            if self._built_at is None:
+                return  # picked up by the first build
+            for doc in docs:
+                if doc["id"] not in self._lengths:
+                    self._add(self._postings, self._lengths, doc)
+            self._vocab = sorted(self._postings)
+
+    def rebuild(self):
+        """
+        Build a new index off to the side and swap it in; searches keep
+        using the old one meanwhile. Concurrent calls wait for the running
+        rebuild instead of starting their own.
+        """
+        with self._build_lock:
+            with self._lock:
+                self._backlog = []
+            try:
+                postings, lengths = defaultdict(dict), {}
+                stmt = select(Application.id, *(getattr(Application, f) for f in SEARCH_FIELDS))
+                # own connection: never touches (or commits) the caller's session
+                with db.engine.connect() as conn:
+                    for row in conn.execute(stmt.execution_options(yield_per=1000)).mappings():
+                        self._add(postings, lengths, search_doc(dict(row)))
+                with self._lock:
+                    # commits that landed after the scan started
+                    for doc in self._backlog:
+                        if doc["id"] not in lengths:
+                            self._add(postings, lengths, doc)
+                    self._postings, self._lengths = postings, lengths
+                    self._vocab = sorted(postings)
+                    self._built_at = time.monotonic()
+                    return len(lengths)
+            finally:
+                with self._lock:
+                    self._backlog = None
+
+    def warm(self, app):
+        """Start building the index in the background (at startup)."""
+        self._start_refresh(app)
+
+    def _ensure(self):
+        if self._built_at is None:
+            # requests never build the index themselves: wait for the
+            # startup build, or start one if there was none or it failed
+            self._start_refresh(current_app._get_current_object()).wait()
+            if self._built_at is None:
+                raise RuntimeError("search index build failed")
+        elif time.monotonic() - self._built_at > self.refresh:
+            # stale: serve the current index, refresh it in the background
+            self._start_refresh(current_app._get_current_object())
+
+    def _start_refresh(self, app):
+        """Event set when the running (or a newly started) background build ends."""
+        with self._lock:
+            if self._refreshed is not None:
+                return self._refreshed
+            done = self._refreshed = threading.Event()
+        threading.Thread(target=self._refresh, args=(app, done), name="search-refresh", daemon=True).start()
+        return done
+
+    def _refresh(self, app, done):
+        with app.app_context():
+            try:
+                self.rebuild()
+            except Exception:
+                current_app.logger.exception("search index build failed")
+            finally:
+                with self._lock:
+                    self._refreshed = None
+                done.set()
+
+    def _expand(self, prefix):
+        i = bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+            yield self._vocab[i]
+            i += 1
+
+    def search(self, terms, limit, offset=0, filters=None):
+        self._ensure()
+        with self._lock:
+            n = len(self._lengths) or 1
+            avg = (sum(self._lengths.values()) / n) or 1.0
+            scores = None
+            for prefix in terms:
+                term_scores = defaultdict(float)
+                for term in self._expand(prefix):
+                    postings = self._postings[term]
+                    idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for app_id, tf in postings.items():
+                        norm = tf + self.K1 * (1 - self.B + self.B * self._lengths[app_id] / avg)
+                        term_scores[app_id] += idf * tf * (self.K1 + 1) / norm
+                if scores is None:
+                    scores = term_scores
+                else:  # AND: keep documents that match every word
+                    scores = {k: v + term_scores[k] for k, v in scores.items() if k in term_scores}
+                if not scores:
+                    return []
+
+        ranked = sorted((-score, app_id) for app_id, score in scores.items())
+        if filters and (filters.get("status") or filters.get("department")):
+            ranked = self._filter(ranked, filters, offset + limit)
+        return [(app_id, rank) for rank, app_id in ranked[offset:offset + limit]]
+
+    def _filter(self, ranked, filters, limit, chunk=500):
+        """Keep ranked hits whose current status / department match (read from the DB)."""
+        kept = []
+        for i in range(0, len(ranked), chunk):
+            part = ranked[i:i + chunk]
+            q = select(Application.id).where(Application.id.in_([app_id for _, app_id in part]))
+            for key in ("status", "department"):
+                if filters.get(key):
+                    q = q.where(getattr(Application, key) == filters[key])
+            ok = set(db.session.execute(q).scalars())
+            kept.extend(r for r in part if r[1] in ok)
+            if len(kept) >= limit:
+                break
+        return kept
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session):
+    if session.in_nested_transaction():
+        return
+    docs = session.info.pop("search_docs", None)
+    backend = current_app.extensions.get("search") if docs and has_app_context() else None
+    if backend is not None:
+        backend.apply(docs)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_rollback(session):
+    if not session.in_nested_transaction():
+        session.info.pop("search_docs", None)
+
+
+# -- service API ----------------------------------------------------------------
+
+def get_backend():
+    return current_app.extensions.get("search")
+
+
+def index_applications(apps):
+    """Add new applications to the search index within the current transaction."""
+    backend = get_backend()
+    if backend is not None:
+        backend.index([search_doc(a) for a in apps])
+
+
+def search(q, limit, offset=0, filters=None):
+    """Ranked [(application_id, rank)] for the query string `q`."""
+    return get_backend().search(parse_query(q), limit, offset, filters)
+
+
+def search_page(q, per_page, cursor=None, filters=None):
+    """
+    One page of ranked hits and the cursor of the next page (None on the
+    last one). Raises InvalidQuery, or InvalidCursor for a malformed cursor
+    or one issued for a different query.
+    """
+    terms = parse_query(q)
+    fingerprint = _fingerprint(terms, filters)
+    snapshots = current_app.extensions["search_snapshots"]
+    backend = get_backend()
+    snapshot, offset, ranked, complete = None, 0, None, False
+    if cursor:
+        snapshot, offset, cursor_fingerprint = decode_search_cursor(cursor)
+        if cursor_fingerprint != fingerprint:
+            raise InvalidCursor("cursor belongs to a different search")
+        cached = snapshots.get(snapshot) if snapshot else None
+        if cached is None:
+            snapshot = None
+        else:
+            ranked, complete = cached
+    else:
+        size = max(int(current_app.config.get("SEARCH_SNAPSHOT_SIZE", 1000)), per_page + 1)
+        ranked = backend.search(terms, size + 1, 0, filters)
+        ranked, complete = ranked[:size], len(ranked) <= size
+        if len(ranked) > per_page:
+            snapshot = snapshots.put((ranked, complete))
+
+    if ranked is None:
+        hits = backend.search(terms, per_page + 1, offset, filters)
+    else:
+        hits = ranked[offset:offset + per_page + 1]
+        if not complete and len(hits) <= per_page:
+            # past the end of a truncated snapshot: continue on a live ranking
+            start = max(offset, len(ranked))
+            hits += backend.search(terms, offset + per_page + 1 - start, start, filters)
+
+    next_cursor = None
+    if len(hits) > per_page:
+        hits = hits[:per_page]
+        next_offset = offset + per_page
+        if ranked is None or next_offset >= len(ranked):
+            snapshot = None
+        next_cursor = encode_search_cursor(snapshot, next_offset, fingerprint)
+    return hits, next_cursor
+
+
+def init_search(app):
+    """Pick the search backend for SEARCH_BACKEND ('auto', 'fts5', 'oracle', 'memory')."""
+    kind = (app.config.get("SEARCH_BACKEND") or "auto").lower()
+    if kind == "auto":
+        with app.app_context():
+            dialect = db.engine.dialect  # creating the engine does not connect
+        if dialect.name == "sqlite":
+            kind = "fts5" if fts5_available(dialect.loaded_dbapi) else "memory"
+        else:
+            kind = "oracle" if dialect.name == "oracle" else "memory"
+    if kind == "fts5":
+        backend = FTS5Backend()
+    elif kind == "oracle":
+        backend = OracleTextBackend()
+    elif kind == "memory":
+        backend = MemoryBackend(refresh=float(app.config.get("SEARCH_MEMORY_REFRESH", 300)))
+        if app.config.get("SEARCH_MEMORY_WARM", True):
+            backend.warm(app)
+    else:
+        raise ValueError(f"unknown SEARCH_BACKEND {kind!r}")
+    app.extensions["search"] = backend
+    app.extensions["search_snapshots"] = SnapshotCache(
+        maxsize=int(app.config.get("SEARCH_SNAPSHOT_CACHE_SIZE", 256)),
+        ttl=float(app.config.get("SEARCH_SNAPSHOT_TTL", 300)),
+    )
+    return backend
@@ -0,0 +1,79 @@
+# app/services/serializers.py
+"""
+Core-level read path for the application endpoints.
+
+Instead of building ORM instances (identity map, attribute instrumentation,
+loader options) and calling to_dict() on each, the read views select plain
+rows and encode them with a serializer compiled once per (table, fieldset).
+The output is the same as the models' to_dict(); tests pin that.
+
+A serializer maps the first len(names) columns of a row to the names and
+runs isoformat() on the datetime ones; any further columns in the select
+(a cursor marker the view needs but does not return) are ignored.
+"""
+from functools import lru_cache
+
+from sqlalchemy import DateTime, select
+
+from app.models import ActionLog, Application, User
+
+# ActionLog.to_dict() order; actor_role comes from the joined user
+LOG_FIELDS = ("id", "application_id", "action", "actor_id", "actor_role", "comment", "created_at")
+
+
+class RowSerializer:
+    def __init__(self, names, datetime_names=()):
+        self.names = tuple(names)
+        datetime_names = set(datetime_names)
+        self._datetimes = tuple(n for n in self.names if n in datetime_names)
+
+    def __call__(self, row):
+        out = dict(zip(self.names, row))
+        for name in self._datetimes:
+            value = out[name]
+            if value is not None:
+                out[name] = value.isoformat()
+        return out
+
+    def many(self, rows):
+        return [self(row) for row in rows]
+
+
+def _datetime_columns(table):
+    return {c.name for c in table.columns if isinstance(c.type, DateTime)}
+
+
+@lru_cache(maxsize=64)
+def application_serializer(fields):
+    return RowSerializer(fields, _datetime_columns(Application.__table__))
+
+
+def application_select(fields, *extra):
+    """
+    SELECT of the `fields` columns (in that order) followed by any `extra`
+    columns not already among them.
+    """
+    table = Application.__table__
+    names = list(fields) + [e for e in extra if e not in fields]
+    return select(*(table.c[n] for n in names))
+
+
+_log_serializer = RowSerializer(LOG_FIELDS, datetime_names=("created_at",))
+
+
+def logs_select(application_id):
+    """ActionLog rows of one application with the actor's role, oldest first."""
+    logs = ActionLog.__table__
+    users = User.__table__
+    cols = [users.c.role.label("actor_role") if n == "actor_role" else logs.c[n] for n in LOG_FIELDS]
+    return (
+        select(*cols)
+        .select_from(logs.outerjoin(users, users.c.id == logs.c.actor_id))
+        .where(logs.c.application_id == application_id)
+        .order_by(logs.c.created_at.asc())
+    )
+
+
+def serialize_logs(rows):
+    return _log_serializer.many(rows)
+
@@ -0,0 +1,174 @@
+# app/services/sqlprofile.py
+"""
+Per-request SQL profiling.
+
+When SQL_PROFILE_ENABLED is on, engine events record every statement the
+request runs: how many, total DB time and the slowest few. Statements whose
+text repeats SQL_PROFILE_N1_THRESHOLD times or more in one request are
+flagged as likely N+1 patterns (same SQL, different parameters, issued in a
+loop). Results go to X-SQL-* response headers (SQL_PROFILE_HEADERS) and to
+one log line per request (SQL_PROFILE_LOG).
+
+QueryProfile can also be used on its own as a context manager, which is how
+tests pin query budgets (see the query_budget fixture in tests/conftest.py).
+"""
+import heapq
+import logging
+import time
+from collections import Counter
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+class QueryProfile:
+    def __init__(self, engine=None, n_plus_one_threshold=3, keep_slowest=3):
+        self.engine = engine
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.keep_slowest = keep_slowest
+        self.count = 0
+        self.total_seconds = 0.0
+        self.statements = []
+        self._slowest = []
+        self._seen = Counter()
+        self._key = f"_qp_{id(self)}"
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.total_seconds += seconds
+        self.statements.append(statement)
+        self._seen[statement] += 1
+        item = (seconds, self.count, statement)
+        if len(self._slowest) < self.keep_slowest:
+            heapq.heappush(self._slowest, item)
+        else:
+            heapq.heappushpop(self._slowest, item)
+
+    @property
+    def slowest(self):
+        """[(seconds, statement)], slowest first."""
+        return [(s, stmt) for s, _, stmt in sorted(self._slowest, reverse=True)]
+
+    def repeated(self):
+        """[(statement, times)] for statements at or over the N+1 threshold."""
+        return [(stmt, n) for stmt, n in self._seen.most_common() if n >= self.n_plus_one_threshold]
+
+    def summary(self):
+        return {
+            "sql_count": self.count,
+            "sql_ms": round(self.total_seconds * 1000, 2),
+            "sql_slowest": [{"ms": round(s * 1000, 2), "sql": stmt} for s, stmt in self.slowest],
+            "sql_n_plus_one": [{"times": n, "sql": stmt} for stmt, n in self.repeated()],
+        }
+
+    # -- standalone use -----------------------------------------------------
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(self._key, []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get(self._key)
+        if stack:
+            self.record(statement, time.perf_counter() - stack.pop())
+
+    def _error(self, context):
+        # a failed statement never reaches after_cursor_execute
+        if context.connection is not None and context.execution_context is not None:
+            self._after(context.connection, None, context.statement, context.parameters,
+                        context.execution_context, False)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._before)
+        event.listen(self.engine, "after_cursor_execute", self._after)
+        event.listen(self.engine, "handle_error", self._error)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._before)
+        event.remove(self.engine, "after_cursor_execute", self._after)
+        event.remove(self.engine, "handle_error", self._error)
+        return False
+
+
+class SQLProfiler:
+    """
+    Request middleware: one QueryProfile per request, fed by engine events.
+    """
+
+    def __init__(self, app, engine, headers=True, log=True, n_plus_one_threshold=3, keep_slowest=3):
+        self.headers = headers
+        self.log = log
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.keep_slowest = keep_slowest
+
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        event.listen(engine, "handle_error", self._error)
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+
+    @staticmethod
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_sqlprofile_start", []).append(time.perf_counter())
+
+    @staticmethod
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("_sqlprofile_start")
+        if not stack:
+            return
+        elapsed = time.perf_counter() - stack.pop()
+        profile = g.get("_sql_profile") if has_app_context() else None
+        if profile is not None:
+            profile.record(statement, elapsed)
+
+    @classmethod
+    def _error(cls, context):
+        # a failed statement never reaches after_cursor_execute; without this
+        # its start time would stay on the stack and skew the next timing
+        if context.connection is not None and context.execution_context is not None:
+            cls._after(context.connection, None, context.statement, context.parameters,
+                       context.execution_context, False)
+
+    def before_request(self):
+        g._sql_profile = QueryProfile(
+            n_plus_one_threshold=self.n_plus_one_threshold, keep_slowest=self.keep_slowest
+        )
+
+    def after_request(self, response):
+        profile = g.pop("_sql_profile", None)
+        if profile is None:
+            return response
+        repeated = profile.repeated()
+        if self.headers:
+            response.headers["X-SQL-Count"] = str(profile.count)
+            response.headers["X-SQL-Time-ms"] = f"{profile.total_seconds * 1000:.2f}"
+            if repeated:
+                response.headers["X-SQL-N-Plus-One"] = str(len(repeated))
+        if self.log:
+            summary = profile.summary()
+            level = logging.WARNING if repeated else logging.INFO
+            logger.log(level, "sql profile %s %s", request.method, request.path,
+                       extra={"endpoint": request.endpoint, **summary})
+        return response
+
+
+def init_sql_profiler(app):
+    """Attach the per-request profiler when SQL_PROFILE_ENABLED is on."""
+    if not app.config.get("SQL_PROFILE_ENABLED"):
+        return None
+    from app.extensions import db
+
+    with app.app_context():
+        engine = db.engine
+    profiler = SQLProfiler(
+        app,
+        engine,
+        headers=bool(app.config.get("SQL_PROFILE_HEADERS", True)),
+        log=bool(app.config.get("SQL_PROFILE_LOG", True)),
+        n_plus_one_threshold=int(app.config.get("SQL_PROFILE_N1_THRESHOLD", 3)),
+        keep_slowest=int(app.config.get("SQL_PROFILE_SLOWEST", 3)),
+    )
+    app.extensions["sql_profiler"] = profiler
+    return profiler
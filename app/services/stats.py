@@ -0,0 +1,75 @@
+# app/services/stats.py
+from sqlalchemy import func, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import Application, ApplicationStat
+from app.services.listcache import mark_stale
+
+
+def _bump(department, status, delta):
+    """
+    Add `delta` to the (department, status) counter inside the current
+    session transaction. Creates the row on first use; a concurrent insert
+    of the same key is resolved by retrying the UPDATE.
+    """
+    stmt = (
+        update(ApplicationStat)
+        .where(ApplicationStat.department == department, ApplicationStat.status == status)
+        .values(total=ApplicationStat.total + delta)
+    )
+    if db.session.execute(stmt).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(
+                insert(ApplicationStat).values(department=department, status=status, total=delta)
+            )
+    except IntegrityError:
+        db.session.execute(stmt)
+
+
+def record_transition(department, from_status, to_status, count=1):
+    """
+    Move `count` applications of `department` from one status bucket to
+    another. Pass from_status=None for newly created applications.
+    Does not commit: callers commit together with the write it describes.
+    Also marks the department's cached listings stale once that commits.
+    """
+    mark_stale(department)
+    if from_status:
+        _bump(department, from_status, -count)
+    if to_status:
+        _bump(department, to_status, count)
+
+
+def get_stats(department=None):
+    """
+    Return the summary rows, optionally for a single department.
+    """
+    q = ApplicationStat.query
+    if department:
+        q = q.filter_by(department=department)
+    return q.order_by(ApplicationStat.department, ApplicationStat.status).all()
+
+
+def rebuild_stats():
+    """
+    Recompute every counter from the applications table and commit.
+    Returns the number of (department, status) rows written.
+    """
+    rows = (
+        db.session.query(Application.department, Application.status, func.count())
+        .group_by(Application.department, Application.status)
+        .all()
+    )
+    try:
+        db.session.query(ApplicationStat).delete()
+        db.session.add_all(
+            ApplicationStat(department=d, status=s, total=n) for d, s, n in rows
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(rows)
@@ -0,0 +1,528 @@
+# app/services/storage.py
+"""
+Attachment byte storage.
+
+Uploads are copied from the request stream to the backend in
+STORAGE_CHUNK_SIZE pieces, so a worker holds one chunk of a file in memory
+no matter how large the file is. Each chunk also feeds a SHA-256 digest:
+blobs are stored under their digest, so identical uploads share one file
+(see app/services/blobs.py for the reference counts and GC).
+
+An upload is first staged to a temporary file, then either placed under
+its digest (renamed into place, so readers never see a partial file) or
+discarded when that blob is already stored. Resumable uploads
+(app/services/uploads.py) append their chunks to a session file instead,
+which becomes the staged file once it is complete.
+
+Downloads of local files go through send_file(), which hands the open file
+to the server's wsgi.file_wrapper (sendfile() under gunicorn) or, with
+USE_X_SENDFILE, to the front-end proxy; Range and conditional requests are
+answered by Werkzeug from the file's size, ETag and Last-Modified.
+
+With STORAGE_BACKEND=s3 the blobs live in an S3-compatible bucket. Uploads
+are still staged (and resumable sessions kept) under UPLOAD_FOLDER, since
+the digest, and so the object key, is only known once the last byte is
+in; placing a blob sends it as a multipart upload whose parts go out in
+parallel on a per-worker thread pool over pooled connections. Downloads
+are redirected to short-lived presigned URLs, so workers never proxy the
+bytes and the bucket answers Range requests itself.
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from urllib.parse import quote
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+try:  # only needed for STORAGE_BACKEND=s3
+    import boto3
+    from boto3.s3.transfer import S3Transfer, TransferConfig
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+    from s3transfer.manager import TransferManager
+except ImportError:  # pragma: no cover
+    boto3 = None
+
+from flask import current_app
+
+
+class StorageError(Exception):
+    pass
+
+
+class TooLarge(StorageError):
+    """The upload exceeded the configured maximum size."""
+
+    def __init__(self, limit):
+        super().__init__(f"upload exceeds {limit} bytes")
+        self.limit = limit
+
+
+def copy_stream(src, dst, chunk_size, max_size=None, digest=None):
+    """
+    Copy `src` to `dst` chunk by chunk, feeding `digest` (a hashlib object)
+    if given; returns the number of bytes copied. Raises TooLarge as soon
+    as more than `max_size` bytes were read.
+    """
+    total = 0
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            return total
+        total += len(chunk)
+        if max_size is not None and total > max_size:
+            raise TooLarge(max_size)
+        if digest is not None:
+            digest.update(chunk)
+        dst.write(chunk)
+
+
+class OffsetMismatch(StorageError):
+    """A chunk did not start at the session file's current size."""
+
+    def __init__(self, current):
+        super().__init__(f"upload is at offset {current}")
+        self.current = current
+
+
+class SessionBusy(StorageError):
+    """Another request is appending to the same upload session."""
+
+
+@dataclass
+class StagedUpload:
+    """An upload written to temporary storage, not yet placed under a key."""
+    path: str
+    size: int
+    digest: str  # hex SHA-256
+
+
+class StorageBackend:
+    """
+    Interface: stage(stream) -> StagedUpload, place(staged, key),
+    discard(staged), open(key), exists(key), local_path(key) (None when the
+    bytes are not on this filesystem), download_url(key, filename,
+    mime_type) (None when downloads go through the app), iter_keys() ->
+    (key, mtime), delete(key, older_than=None), purge_staged(older_than).
+
+    Upload sessions: create_session(id), session_size(id) (None if gone),
+    append_session(id, stream, offset, max_size, digest) -> new size,
+    hash_session(id), stage_session(id, digest) -> StagedUpload,
+    delete_session(id), iter_sessions() -> (id, mtime).
+    """
+
+    def stage(self, stream, max_size=None):
+        raise NotImplementedError
+
+    def place(self, staged, key):
+        raise NotImplementedError
+
+    def discard(self, staged):
+        raise NotImplementedError
+
+    def save(self, stream, max_size=None):
+        """Stage and place under the digest; returns (key, size)."""
+        staged = self.stage(stream, max_size)
+        self.place(staged, staged.digest)
+        return staged.digest, staged.size
+
+    def open(self, key):
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def local_path(self, key):
+        return None
+
+    def download_url(self, key, filename, mime_type):
+        return None
+
+    def iter_keys(self):
+        raise NotImplementedError
+
+    def delete(self, key, older_than=None):
+        raise NotImplementedError
+
+    def purge_staged(self, older_than):
+        return 0
+
+    def create_session(self, upload_id):
+        raise NotImplementedError
+
+    def session_size(self, upload_id):
+        raise NotImplementedError
+
+    def append_session(self, upload_id, stream, offset, max_size=None, digest=None):
+        raise NotImplementedError
+
+    def hash_session(self, upload_id):
+        raise NotImplementedError
+
+    def stage_session(self, upload_id, digest):
+        raise NotImplementedError
+
+    def delete_session(self, upload_id):
+        raise NotImplementedError
+
+    def iter_sessions(self):
+        raise NotImplementedError
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root, chunk_size=1024 * 1024):
+        self.root = os.path.abspath(root)
+        self.chunk_size = chunk_size
+        self._tmp = os.path.join(self.root, ".tmp")
+        # kept apart from .tmp: purge_staged must not touch idle sessions
+        self._sessions = os.path.join(self.root, ".uploads")
+
+    def _path(self, key):
+        # two-level fan-out keeps directories small
+        if not key or os.sep in key or "/" in key or key.startswith("."):
+            raise StorageError(f"invalid storage key {key!r}")
+        return os.path.join(self.root, key[:2], key)
+
+    def stage(self, stream, max_size=None):
+        os.makedirs(self._tmp, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as out:
+                size = copy_stream(stream, out, self.chunk_size, max_size, digest)
+                out.flush()
+                os.fsync(out.fileno())
+        except BaseException:
+            self._unlink(tmp_path)
+            raise
+        return StagedUpload(tmp_path, size, digest.hexdigest())
+
+    def place(self, staged, key):
+        final = self._path(key)
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        # the staged file is fresh, so a placed blob always has a recent
+        # mtime; GC relies on that (delete(older_than=...))
+        os.replace(staged.path, final)
+
+    def discard(self, staged):
+        self._unlink(staged.path)
+
+    def open(self, key):
+        return open(self._path(key), "rb")
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def local_path(self, key):
+        return self._path(key)
+
+    def iter_keys(self):
+        for entry in os.scandir(self.root) if os.path.isdir(self.root) else ():
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            for f in os.scandir(entry.path):
+                if f.is_file():
+                    yield f.name, f.stat().st_mtime
+
+    def delete(self, key, older_than=None):
+        """
+        Remove the bytes under `key`; with `older_than` (epoch seconds) only
+        if the file was last written before then. Returns True if removed.
+        """
+        path = self._path(key)
+        try:
+            if older_than is not None and os.path.getmtime(path) >= older_than:
+                return False
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def purge_staged(self, older_than):
+        """Remove staged files left behind by crashed uploads; returns the count."""
+        removed = 0
+        if not os.path.isdir(self._tmp):
+            return removed
+        for f in os.scandir(self._tmp):
+            if f.is_file() and f.stat().st_mtime < older_than:
+                self._unlink(f.path)
+                removed += 1
+        return removed
+
+    # -- resumable upload sessions --------------------------------------------
+
+    def _session_path(self, upload_id):
+        if not upload_id or os.sep in upload_id or "/" in upload_id or upload_id.startswith("."):
+            raise StorageError(f"invalid upload id {upload_id!r}")
+        return os.path.join(self._sessions, upload_id)
+
+    def create_session(self, upload_id):
+        os.makedirs(self._sessions, exist_ok=True)
+        open(self._session_path(upload_id), "xb").close()
+
+    def session_size(self, upload_id):
+        try:
+            return os.path.getsize(self._session_path(upload_id))
+        except FileNotFoundError:
+            return None
+
+    def append_session(self, upload_id, stream, offset, max_size=None, digest=None):
+        """
+        Append `stream` to the session file, which must currently hold
+        exactly `offset` bytes (OffsetMismatch otherwise). Bytes received
+        before the stream broke off or passed `max_size` (the total) stay
+        appended. Returns the new size.
+        """
+        with open(self._session_path(upload_id), "r+b") as f:
+            if fcntl:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise SessionBusy(upload_id)
+            current = f.seek(0, os.SEEK_END)
+            if current != offset:
+                raise OffsetMismatch(current)
+            try:
+                copy_stream(stream, f, self.chunk_size,
+                            None if max_size is None else max_size - offset, digest)
+            finally:
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+        return size
+
+    def hash_session(self, upload_id):
+        """SHA-256 of the session file; only needed when no running digest survived."""
+        digest = hashlib.sha256()
+        with open(self._session_path(upload_id), "rb") as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def stage_session(self, upload_id, digest):
+        """
+        Stage a hard link to the session file (a copy where links are not
+        supported): placing or discarding it leaves the session itself
+        alone until delete_session, so a failed commit loses no bytes.
+        """
+        src = self._session_path(upload_id)
+        os.makedirs(self._tmp, exist_ok=True)
+        path = os.path.join(self._tmp, f"session-{upload_id}-{os.urandom(6).hex()}")
+        try:
+            os.link(src, path)
+        except OSError:
+            try:
+                with open(src, "rb") as f, open(path, "xb") as out:
+                    copy_stream(f, out, self.chunk_size)
+                    out.flush()
+                    os.fsync(out.fileno())
+            except BaseException:
+                self._unlink(path)
+                raise
+        # a link shares the session's mtime; GC expects staged files to be fresh
+        os.utime(path)
+        return StagedUpload(path, os.path.getsize(path), digest)
+
+    def delete_session(self, upload_id):
+        self._unlink(self._session_path(upload_id))
+
+    def iter_sessions(self):
+        if not os.path.isdir(self._sessions):
+            return
+        for f in os.scandir(self._sessions):
+            if f.is_file():
+                yield f.name, f.stat().st_mtime
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _content_disposition(filename):
+    fallback = filename.encode("ascii", "ignore").decode().replace('"', "").replace("\\", "") or "download"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+class S3Storage(StorageBackend):
+    """
+    Blobs as objects `prefix + key` in `bucket`. Staged uploads and upload
+    sessions are kept in a LocalStorage spool: with several hosts, point
+    UPLOAD_FOLDER at a shared volume (or pin upload sessions to a host).
+    """
+
+    def __init__(self, client, bucket, spool, prefix="attachments/", chunk_size=1024 * 1024,
+                 multipart_threshold=8 * 1024 * 1024, multipart_chunksize=8 * 1024 * 1024,
+                 max_concurrency=8, url_expires=300):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_expires = url_expires
+        self.spool = LocalStorage(spool, chunk_size)
+        # one transfer manager per worker: its thread pool (max_concurrency
+        # part uploads at a time) is shared by all concurrent placements
+        self._manager = TransferManager(client, TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_concurrency,
+        ))
+        self._transfer = S3Transfer(manager=self._manager)
+
+    def _key(self, key):
+        if not key or "/" in key or key.startswith("."):
+            raise StorageError(f"invalid storage key {key!r}")
+        return self.prefix + key
+
+    def _head(self, key):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def stage(self, stream, max_size=None):
+        return self.spool.stage(stream, max_size)
+
+    def place(self, staged, key):
+        # parts above multipart_threshold are sent in parallel; the object
+        # only becomes visible once the upload completes
+        self._transfer.upload_file(staged.path, self.bucket, self._key(key))
+        self.spool.discard(staged)
+
+    def discard(self, staged):
+        self.spool.discard(staged)
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+
+    def exists(self, key):
+        return self._head(key) is not None
+
+    def download_url(self, key, filename, mime_type):
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(key),
+                "ResponseContentType": mime_type,
+                "ResponseContentDisposition": _content_disposition(filename),
+            },
+            ExpiresIn=self.url_expires,
+        )
+
+    def iter_keys(self):
+        pages = self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=self.prefix)
+        for page in pages:
+            for obj in page.get("Contents", ()):
+                key = obj["Key"][len(self.prefix):]
+                if key and "/" not in key:
+                    yield key, obj["LastModified"].timestamp()
+
+    def delete(self, key, older_than=None):
+        if older_than is not None:
+            head = self._head(key)
+            if head is None or head["LastModified"].timestamp() >= older_than:
+                return False
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        return True
+
+    def purge_staged(self, older_than):
+        """
+        Remove abandoned spool files and abort multipart uploads a crashed
+        worker left behind (their parts are stored, and billed, until
+        aborted). Returns the count.
+        """
+        removed = self.spool.purge_staged(older_than)
+        pages = self.client.get_paginator("list_multipart_uploads").paginate(Bucket=self.bucket, Prefix=self.prefix)
+        for page in pages:
+            for upload in page.get("Uploads", ()):
+                if upload["Initiated"].timestamp() < older_than:
+                    self.client.abort_multipart_upload(
+                        Bucket=self.bucket, Key=upload["Key"], UploadId=upload["UploadId"],
+                    )
+                    removed += 1
+        return removed
+
+    def create_session(self, upload_id):
+        self.spool.create_session(upload_id)
+
+    def session_size(self, upload_id):
+        return self.spool.session_size(upload_id)
+
+    def append_session(self, upload_id, stream, offset, max_size=None, digest=None):
+        return self.spool.append_session(upload_id, stream, offset, max_size, digest)
+
+    def hash_session(self, upload_id):
+        return self.spool.hash_session(upload_id)
+
+    def stage_session(self, upload_id, digest):
+        return self.spool.stage_session(upload_id, digest)
+
+    def delete_session(self, upload_id):
+        self.spool.delete_session(upload_id)
+
+    def iter_sessions(self):
+        return self.spool.iter_sessions()
+
+    def close(self):
+        self._manager.shutdown()
+
+
+def get_storage():
+    return current_app.extensions["storage"]
+
+
+def _s3_client(app):
+    if boto3 is None:
+        raise RuntimeError("STORAGE_BACKEND=s3 requires boto3")
+    config = BotoConfig(
+        max_pool_connections=int(app.config.get("S3_MAX_POOL_CONNECTIONS", 32)),
+        retries={"mode": "standard", "max_attempts": 5},
+        signature_version="s3v4",
+        s3={"addressing_style": app.config.get("S3_ADDRESSING_STYLE") or "auto"},
+    )
+    # a session of our own: the default one is not safe to share between threads
+    return boto3.session.Session().client(
+        "s3",
+        region_name=app.config.get("S3_REGION") or None,
+        endpoint_url=app.config.get("S3_ENDPOINT_URL") or None,
+        aws_access_key_id=app.config.get("S3_ACCESS_KEY") or None,
+        aws_secret_access_key=app.config.get("S3_SECRET_KEY") or None,
+        config=config,
+    )
+
+
+def init_storage(app):
+    kind = app.config.get("STORAGE_BACKEND", "local")
+    root = app.config.get("UPLOAD_FOLDER") or "uploads"
+    if not os.path.isabs(root):
+        root = os.path.join(app.instance_path, root)
+    chunk_size = int(app.config.get("STORAGE_CHUNK_SIZE", 1024 * 1024))
+    if kind == "local":
+        storage = LocalStorage(root, chunk_size=chunk_size)
+    elif kind == "s3":
+        bucket = app.config.get("S3_BUCKET")
+        if not bucket:
+            raise ValueError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        storage = S3Storage(
+            _s3_client(app),
+            bucket,
+            spool=root,
+            prefix=app.config.get("S3_PREFIX", "attachments/"),
+            chunk_size=chunk_size,
+            multipart_threshold=int(app.config.get("S3_MULTIPART_THRESHOLD", 8 * 1024 * 1024)),
+            multipart_chunksize=int(app.config.get("S3_MULTIPART_CHUNKSIZE", 8 * 1024 * 1024)),
+            max_concurrency=int(app.config.get("S3_MAX_CONCURRENCY", 8)),
+            url_expires=int(app.config.get("S3_URL_EXPIRES", 300)),
+        )
+    else:
+        raise ValueError(f"unknown STORAGE_BACKEND {kind!r}")
+    app.extensions["storage"] = storage
+    return storage
@@ -0,0 +1,298 @@
+# app/services/uploads.py
+"""
+Resumable attachment uploads.
+
+A client creates an upload session (file name, total size, optionally the
+SHA-256 it expects), sends the file as chunks that each start at the
+current offset, asks for the offset after a broken connection and resumes
+from there, then completes the session into an Attachment.
+
+Chunks are appended straight to the session file in storage; its size is
+the offset, so every worker agrees on it without a database write per
+chunk. The SHA-256 is computed while the chunks are written: each worker
+keeps the running digest of the sessions it served last, and a session
+that moved between workers (or outlived a restart) is hashed once at
+completion instead. The digest is checked against the announced one before
+the Attachment is committed.
+
+Sessions expire UPLOAD_SESSION_TTL seconds after their last chunk (give or
+take half the TTL: expires_at is only pushed out once less than half of it
+is left, not on every chunk); expire_sessions() removes them with their
+bytes.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, select, update
+
+from app.extensions import db
+from app.models import UploadSession
+from app.services.blobs import store_attachment
+from app.services.storage import get_storage
+
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadError(Exception):
+    status = 400
+
+    def __init__(self, msg, **extra):
+        super().__init__(msg)
+        self.extra = extra
+
+
+class InvalidChunk(UploadError):
+    pass
+
+
+class Incomplete(UploadError):
+    status = 409
+
+
+class ChecksumMismatch(UploadError):
+    status = 422
+
+
+class SessionLost(UploadError):
+    """The session row exists but its bytes are gone; start again."""
+    status = 410
+
+
+class RunningDigest:
+    """SHA-256 plus the number of bytes it has seen."""
+
+    def __init__(self):
+        self.sha = hashlib.sha256()
+        self.length = 0
+
+    def update(self, chunk):
+        self.sha.update(chunk)
+        self.length += len(chunk)
+
+    def hexdigest(self):
+        return self.sha.hexdigest()
+
+
+class DigestCache:
+    """Running digests of this worker's recent sessions (bounded LRU)."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, upload_id, offset):
+        """
+        Remove and return the digest covering exactly `offset` bytes; a
+        fresh one at offset 0; None when this worker cannot continue it.
+        """
+        with self._lock:
+            digest = self._items.get(upload_id)
+            if digest is not None and digest.length == offset:
+                return self._items.pop(upload_id)
+        return RunningDigest() if offset == 0 and digest is None else None
+
+    def put(self, upload_id, digest):
+        with self._lock:
+            self._items[upload_id] = digest
+            self._items.move_to_end(upload_id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def discard(self, upload_id):
+        with self._lock:
+            self._items.pop(upload_id, None)
+
+
+def _digests():
+    return current_app.extensions["upload_digests"]
+
+
+def _ttl_seconds():
+    return float(current_app.config.get("UPLOAD_SESSION_TTL", 86400))
+
+
+def _ttl():
+    return timedelta(seconds=_ttl_seconds())
+
+
+def parse_sha256(value):
+    if value is None or value == "":
+        return None
+    value = str(value).strip().lower()
+    if not _SHA256.match(value):
+        raise UploadError("sha256 must be 64 hex characters")
+    return value
+
+
+def parse_chunk_offset(headers, total):
+    """
+    Start offset of a chunk from `Upload-Offset: n` or
+    `Content-Range: bytes start-end/total`; returns (offset, length or
+    None). Raises InvalidChunk on malformed or inconsistent headers.
+    """
+    raw_range = headers.get("Content-Range")
+    if raw_range:
+        m = _CONTENT_RANGE.match(raw_range.strip())
+        if not m:
+            raise InvalidChunk("malformed Content-Range")
+        start, end, declared_total = int(m.group(1)), int(m.group(2)), m.group(3)
+        if end < start or (declared_total != "*" and int(declared_total) != total):
+            raise InvalidChunk("Content-Range does not match the upload")
+        return start, end - start + 1
+    raw = headers.get("Upload-Offset")
+    if raw is None or not raw.isdigit():
+        raise InvalidChunk("Upload-Offset or Content-Range header required")
+    return int(raw), None
+
+
+def create_session(application_id, created_by, filename, mime_type, size, sha256=None):
+    session = UploadSession(
+        application_id=application_id,
+        created_by=created_by,
+        filename=filename[:255],
+        mime_type=mime_type[:100],
+        size=size,
+        sha256=sha256,
+        created_at=datetime.utcnow(),
+        expires_at=datetime.utcnow() + _ttl(),
+    )
+    db.session.add(session)
+    db.session.flush()
+    get_storage().create_session(session.id)
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        get_storage().delete_session(session.id)
+        raise
+    return session
+
+
+def current_offset(session):
+    offset = get_storage().session_size(session.id)
+    if offset is None:
+        raise SessionLost("upload data is gone; create a new session")
+    return offset
+
+
+def append_chunk(session, stream, offset, length=None):
+    """
+    Append one chunk starting at `offset`; returns the new offset. Raises
+    storage.OffsetMismatch / SessionBusy / TooLarge from the storage layer.
+    A chunk cut short by the client still advances the offset by what
+    arrived.
+    """
+    storage = get_storage()
+    digests = _digests()
+    running = digests.take(session.id, offset)
+    limit = session.size if length is None else min(session.size, offset + length)
+    try:
+        new_offset = storage.append_session(session.id, stream, offset, limit, running)
+    finally:
+        # keep the digest only if it saw exactly the bytes now in the file
+        if running is not None and running.length == storage.session_size(session.id):
+            digests.put(session.id, running)
+    _touch(session)
+    return new_offset
+
+
+def _touch(session):
+    """Push expires_at out, but only once less than half the TTL is left."""
+    now = datetime.utcnow()
+    ttl = _ttl()
+    if session.expires_at is not None and session.expires_at - now > ttl / 2:
+        return
+    db.session.execute(
+        update(UploadSession.__table__)
+        .where(UploadSession.__table__.c.id == session.id)
+        .values(expires_at=now + ttl)
+    )
+    db.session.commit()
+
+
+def complete_session(session, sha256=None):
+    """
+    Turn a fully received session into an Attachment (committed) and
+    delete the session. The content digest is checked against `sha256`
+    and the one announced at creation. The session row goes in the same
+    transaction as the Attachment and its bytes only after that commit, so
+    a failed commit leaves the session intact for another try.
+    """
+    storage = get_storage()
+    size = current_offset(session)
+    if size != session.size:
+        raise Incomplete("upload is not complete", offset=size, size=session.size)
+
+    running = _digests().take(session.id, size)
+    digest = running.hexdigest() if running is not None else storage.hash_session(session.id)
+    for expected in (session.sha256, sha256):
+        if expected and expected != digest:
+            cancel_session(session)
+            raise ChecksumMismatch("checksum mismatch; the upload was discarded", sha256=digest)
+
+    upload_id = session.id
+    staged = storage.stage_session(upload_id, digest)
+    db.session.delete(session)
+    att = store_attachment(storage, session.application_id, staged, session.filename, session.mime_type)
+    storage.delete_session(upload_id)
+    return att
+
+
+def cancel_session(session):
+    _digests().discard(session.id)
+    upload_id = session.id
+    db.session.delete(session)
+    db.session.commit()
+    get_storage().delete_session(upload_id)
+
+
+def expire_sessions(storage, batch_size=100, now=None):
+    """
+    Delete sessions past expires_at with their bytes, plus session files
+    without a row that are older than the TTL. Returns the count removed.
+    """
+    table = UploadSession.__table__
+    now = now or datetime.utcnow()
+    removed = 0
+    while True:
+        ids = db.session.execute(
+            select(table.c.id).where(table.c.expires_at < now).limit(batch_size)
+        ).scalars().all()
+        gone = []
+        for upload_id in ids:
+            # a chunk arriving meanwhile pushes expires_at and keeps it
+            if db.session.execute(
+                delete(table).where(table.c.id == upload_id, table.c.expires_at < now)
+            ).rowcount:
+                gone.append(upload_id)
+        db.session.commit()
+        for upload_id in gone:
+            storage.delete_session(upload_id)
+        removed += len(gone)
+        if len(ids) < batch_size:
+            break
+
+    cutoff = time.time() - _ttl_seconds()
+    stray = [(upload_id, mtime) for upload_id, mtime in storage.iter_sessions() if mtime < cutoff]
+    for start in range(0, len(stray), batch_size):
+        batch = [upload_id for upload_id, _ in stray[start:start + batch_size]]
+        live = set(db.session.execute(select(table.c.id).where(table.c.id.in_(batch))).scalars())
+        db.session.commit()
+        for upload_id in batch:
+            if upload_id not in live:
+                storage.delete_session(upload_id)
+                removed += 1
+    return removed
+
+
+def init_uploads(app):
+    digests = DigestCache(maxsize=int(app.config.get("UPLOAD_DIGEST_CACHE_SIZE", 1024)))
+    app.extensions["upload_digests"] = digests
+    return digests
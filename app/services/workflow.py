@@ -0,0 +1,181 @@
+# app/services/workflow.py
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+
+from app.extensions import db
+from app.models import ActionLog, Application, gen_uuid
+from app.services.audit import create_action_log
+from app.services.events import queue_log_events
+from app.services.search import index_applications
+from app.services.stats import record_transition
+
+
+# target status -> the only status it may be entered from
+TRANSITIONS = {
+    "verified": "submitted",
+    "approved": "verified",
+}
+
+# Oracle caps IN-lists at 1000 expressions
+IN_CHUNK = 500
+
+
+def chunked(seq, size):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def transition(application_id, to_status, actor_id, comment=None):
+    """
+    Move one application to `to_status` with a single guarded
+    UPDATE ... WHERE id = :id AND status = :from, then write the ActionLog
+    and the stats adjustment in the same transaction and commit once.
+
+    Returns (True, to_status) on success. On a failed guard nothing is
+    written and (False, current_status) is returned, where current_status
+    is None if the application does not exist.
+    """
+    from_status = TRANSITIONS[to_status]
+    stmt = (
+        update(Application)
+        .where(Application.id == application_id, Application.status == from_status)
+        .values(status=to_status, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+    try:
+        if db.engine.dialect.update_returning:
+            row = db.session.execute(stmt.returning(Application.department)).first()
+            department = row.department if row else None
+        else:
+            updated = db.session.execute(stmt).rowcount
+            department = None
+            if updated:
+                department = db.session.execute(
+                    select(Application.department).where(Application.id == application_id)
+                ).scalar()
+
+        if department is None:
+            db.session.rollback()
+            current = db.session.execute(
+                select(Application.status).where(Application.id == application_id)
+            ).scalar()
+            return False, current
+
+        record_transition(department, from_status, to_status)
+        create_action_log(
+            application_id=application_id,
+            action=to_status,
+            actor_id=actor_id,
+            comment=comment,
+            commit=False,
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return True, to_status
+
+
+def bulk_transition(application_ids, to_status, actor_id, comment=None):
+    """
+    Set-based form of transition() for many applications at once: one
+    guarded UPDATE per IN-chunk, one multi-row INSERT into action_logs and a
+    single commit for the whole batch.
+
+    Returns (transitioned_ids, skipped) where skipped is a list of
+    {"id", "reason", "from"} dicts for ids that were not moved.
+    """
+    from_status = TRANSITIONS[to_status]
+    ids = list(dict.fromkeys(application_ids))
+    now = datetime.utcnow()
+    moved = {}  # id -> department
+
+    try:
+        for chunk in chunked(ids, IN_CHUNK):
+            guard = (Application.id.in_(chunk), Application.status == from_status)
+            if not db.engine.dialect.update_returning:
+                # lock the eligible rows first so the UPDATE below touches
+                # exactly the set we report
+                rows = db.session.execute(
+                    select(Application.id, Application.department).where(*guard).with_for_update()
+                ).all()
+                chunk = [r.id for r in rows]
+                if not chunk:
+                    continue
+                guard = (Application.id.in_(chunk), Application.status == from_status)
+
+            stmt = (
+                update(Application)
+                .where(*guard)
+                .values(status=to_status, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if db.engine.dialect.update_returning:
+                rows = db.session.execute(stmt.returning(Application.id, Application.department)).all()
+            else:
+                db.session.execute(stmt)
+            moved.update((r.id, r.department) for r in rows)
+
+        if moved:
+            for department, n in Counter(moved.values()).items():
+                record_transition(department, from_status, to_status, count=n)
+            logs = [
+                {"id": gen_uuid(), "application_id": app_id, "action": to_status,
+                 "actor_id": actor_id, "comment": comment, "created_at": now}
+                for app_id in moved
+            ]
+            db.session.execute(insert(ActionLog), logs)
+            queue_log_events(logs)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    leftover = [i for i in ids if i not in moved]
+    current = {}
+    for chunk in chunked(leftover, IN_CHUNK):
+        current.update(
+            db.session.execute(
+                select(Application.id, Application.status).where(Application.id.in_(chunk))
+            ).all()
+        )
+
+    skipped = []
+    for app_id in leftover:
+        if app_id not in current:
+            skipped.append({"id": app_id, "reason": "not found", "from": None})
+        else:
+            skipped.append({"id": app_id, "reason": "invalid transition", "from": current[app_id]})
+    return [i for i in ids if i in moved], skipped
+
+
+def submit_many(rows, actor_id):
+    """
+    Insert already-validated application dicts together with their
+    'created' ActionLogs: two executemany INSERTs, the search index and
+    stats adjustments and one commit. Ids are generated here so no RETURNING round trip is needed.
+
+    Returns the new application ids in input order.
+    """
+    now = datetime.utcnow()
+    apps = [dict(row, id=gen_uuid(), created_at=now, updated_at=now) for row in rows]
+    try:
+        db.session.execute(insert(Application), apps)
+        index_applications(apps)
+        logs = [
+            {"id": gen_uuid(), "application_id": a["id"], "action": "created",
+             "actor_id": actor_id, "comment": None, "created_at": now}
+            for a in apps
+        ]
+        db.session.execute(insert(ActionLog), logs)
+        queue_log_events(logs)
+        for (department, status), n in Counter((a["department"], a["status"]) for a in apps).items():
+            record_transition(department, None, status, count=n)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return [a["id"] for a in apps]
@@ -2,14 +2,13 @@
 from functools import wraps
 from flask import jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
-from app.models import User
-from app.extensions import db as _db
+from app.auth.utils import resolve_role
 
 def role_required(*allowed_roles):
     """
     Decorator to ensure the JWT contains a role in allowed_roles.
-    If role is missing in token claims, fallback to querying the DB
-    for the user's current role using the identity (user id).
+    The role is resolved via app.auth.utils.resolve_role, which trusts the
+    claim for current tokens and otherwise uses the cached/DB role.
     Usage: @role_required("admin", "verifier")
     """
     def decorator(fn):
@@ -20,17 +19,15 @@ def role_required(*allowed_roles):
             claims = get_jwt() or {}
             role = claims.get("role")
 
-            # fallback: if role missing, look up user in DB by identity
-            if role is None:
-                try:
-                    user_id = get_jwt_identity()
-                    if user_id:
-                        user = User.query.get(user_id)
-                        if user:
-                            role = getattr(user, "role", None)
-                except Exception:
-                    # if anything goes wrong, role remains None
-                    role = None
+            # resolve through the cached role resolver: trusts the claim while
+            # the token version is current, otherwise uses the user's role
+            try:
+                user_id = get_jwt_identity()
+                if user_id:
+                    role = resolve_role(claims, user_id)
+            except Exception:
+                # fail closed: an unverifiable role is no role
+                role = None
 
             if role not in allowed_roles:
                 return jsonify({"msg": "forbidden - insufficient role"}), 403
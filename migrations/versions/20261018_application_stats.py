@@ -0,0 +1,35 @@
+"""add application_stats summary table
+
+Revision ID: 20261018_application_stats
+Revises: 20261018_keyset_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_application_stats'
+down_revision = '20261018_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'application_stats',
+        sa.Column('department', sa.String(length=100), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('department', 'status'),
+    )
+    # seed from existing rows; scripts/rebuild_stats.py does the same later on
+    op.execute(
+        "INSERT INTO application_stats (department, status, total) "
+        "SELECT department, status, COUNT(*) FROM applications GROUP BY department, status"
+    )
+
+
+def downgrade():
+    op.drop_table('application_stats')
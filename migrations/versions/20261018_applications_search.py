@@ -0,0 +1,56 @@
+"""full-text search index for applications
+
+SQLite: FTS5 table applications_fts, seeded from applications.
+Oracle: Oracle Text CONTEXT index over the searchable columns, synced on commit.
+Other dialects use the in-process search backend and need nothing here.
+
+Revision ID: 20261018_applications_search
+Revises: 20261018_user_token_version
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_applications_search'
+down_revision = '20261018_user_token_version'
+branch_labels = None
+depends_on = None
+
+# keep in sync with SEARCH_FIELDS in app/services/search.py
+FIELDS = ('emp_name', 'emp_no', 'designation', 'purpose', 'remarks')
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS applications_fts USING fts5("
+            f"app_id UNINDEXED, {', '.join(FIELDS)}, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            f"INSERT INTO applications_fts (app_id, {', '.join(FIELDS)}) "
+            "SELECT id, " + ", ".join(f"COALESCE({f}, '')" for f in FIELDS) + " FROM applications"
+        )
+    elif dialect == 'oracle':
+        op.execute(
+            "BEGIN "
+            "ctx_ddl.create_preference('applications_text_ds', 'MULTI_COLUMN_DATASTORE'); "
+            f"ctx_ddl.set_attribute('applications_text_ds', 'COLUMNS', '{', '.join(FIELDS)}'); "
+            "END;"
+        )
+        op.execute(
+            "CREATE INDEX ix_applications_text ON applications (purpose) "
+            "INDEXTYPE IS CTXSYS.CONTEXT "
+            "PARAMETERS ('DATASTORE applications_text_ds SYNC (ON COMMIT)')"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS applications_fts")
+    elif dialect == 'oracle':
+        op.execute("DROP INDEX ix_applications_text")
+        op.execute("BEGIN ctx_ddl.drop_preference('applications_text_ds'); END;")
@@ -0,0 +1,46 @@
+"""content-addressed attachment blobs
+
+attachment_blobs holds one row per stored content (SHA-256 digest) with
+its reference count; attachments.digest points at it. Attachments stored
+before this revision keep digest NULL and their own storage_key.
+
+Revision ID: 20261018_attachment_blobs
+Revises: 20261018_attachment_storage
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_attachment_blobs'
+down_revision = '20261018_attachment_storage'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'attachment_blobs',
+        sa.Column('digest', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('refcount', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('unreferenced_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('digest'),
+    )
+    op.create_index('ix_attachment_blobs_unreferenced_at', 'attachment_blobs', ['unreferenced_at'])
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.add_column(sa.Column('digest', sa.String(length=64), nullable=True))
+        batch_op.create_index('ix_attachments_digest', ['digest'])
+        batch_op.create_foreign_key('fk_attachments_digest', 'attachment_blobs', ['digest'], ['digest'])
+
+
+def downgrade():
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.drop_constraint('fk_attachments_digest', type_='foreignkey')
+        batch_op.drop_index('ix_attachments_digest')
+        batch_op.drop_column('digest')
+    op.drop_index('ix_attachment_blobs_unreferenced_at', table_name='attachment_blobs')
+    op.drop_table('attachment_blobs')
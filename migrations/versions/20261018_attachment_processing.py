@@ -0,0 +1,42 @@
+"""attachment processing status
+
+Existing attachments start out pending, so the processing pipeline
+verifies and sniffs them in the background like new uploads.
+
+Revision ID: 20261018_attachment_processing
+Revises: 20261018_upload_sessions
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_attachment_processing'
+down_revision = '20261018_upload_sessions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.add_column(sa.Column('processing_status', sa.String(length=20), nullable=False,
+                                      server_default='pending'))
+        batch_op.add_column(sa.Column('processing_attempts', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('processing_due_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('processing_error', sa.String(length=500), nullable=True))
+        batch_op.add_column(sa.Column('processed_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('detected_mime_type', sa.String(length=100), nullable=True))
+        batch_op.create_index('ix_attachments_processing_status', ['processing_status'])
+
+
+def downgrade():
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.drop_index('ix_attachments_processing_status')
+        batch_op.drop_column('detected_mime_type')
+        batch_op.drop_column('processed_at')
+        batch_op.drop_column('processing_error')
+        batch_op.drop_column('processing_due_at')
+        batch_op.drop_column('processing_attempts')
+        batch_op.drop_column('processing_status')
@@ -0,0 +1,24 @@
+"""add storage_key to attachments
+
+Revision ID: 20261018_attachment_storage
+Revises: 20261018_applications_search
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_attachment_storage'
+down_revision = '20261018_applications_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('attachments', sa.Column('storage_key', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    op.drop_column('attachments', 'storage_key')
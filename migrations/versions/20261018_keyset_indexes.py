@@ -0,0 +1,28 @@
+"""add keyset pagination indexes on applications
+
+Revision ID: 20261018_keyset_indexes
+Revises: 20251206_add_role_to_users
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa  # noqa: F401
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_keyset_indexes'
+down_revision = '20251206_add_role_to_users'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_applications_created_at_id', 'applications', ['created_at', 'id'], unique=False)
+    op.create_index('ix_applications_status_created_at', 'applications', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_applications_department_created_at', 'applications', ['department', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_applications_department_created_at', table_name='applications')
+    op.drop_index('ix_applications_status_created_at', table_name='applications')
+    op.drop_index('ix_applications_created_at_id', table_name='applications')
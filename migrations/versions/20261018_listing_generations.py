@@ -0,0 +1,29 @@
+"""add listing_generations table for listing cache invalidation
+
+Revision ID: 20261018_listing_generations
+Revises: 20261018_attachment_processing
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20261018_listing_generations'
+down_revision = '20261018_attachment_processing'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'listing_generations',
+        sa.Column('department', sa.String(length=100), nullable=False),
+        sa.Column('generation', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('department'),
+    )
+
+
+def downgrade():
+    op.drop_table('listing_generations')
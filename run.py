@@ -1,6 +1,11 @@
-from app import create_app
+# Spawned worker processes (password hashing, attachment processing) re-import
+# the parent's main module as __mp_main__; they must neither build an app nor
+# import the app package. Everywhere else (python run.py, flask --app run.py,
+# gunicorn run:app) the module-level app is there.
+if __name__ != "__mp_main__":
+    from app import create_app
 
-app = create_app()
+    app = create_app()
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,47 @@
+# scripts/attachment_gc.py
+"""
+Remove expired upload sessions and attachment blobs that stayed
+unreferenced longer than the grace period (plus orphaned and abandoned
+staged files), then print the deduplication report. Safe to run from cron
+next to the app.
+
+    python scripts/attachment_gc.py [--grace SECONDS] [--batch-size N] [--report-only]
+"""
+import argparse
+import json
+import sys
+import pathlib
+
+project_root = pathlib.Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app import create_app
+from app.services.blobs import collect_garbage, dedup_report
+from app.services.uploads import expire_sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="attachment blob GC")
+    parser.add_argument("--grace", type=float, help="seconds a blob must stay unreferenced (default BLOB_GC_GRACE)")
+    parser.add_argument("--batch-size", type=int, help="blobs per transaction (default BLOB_GC_BATCH_SIZE)")
+    parser.add_argument("--report-only", action="store_true")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if not args.report_only:
+            storage = app.extensions["storage"]
+            batch_size = args.batch_size or int(app.config.get("BLOB_GC_BATCH_SIZE", 100))
+            print("uploads expired:", expire_sessions(storage, batch_size))
+            result = collect_garbage(
+                storage,
+                batch_size=batch_size,
+                grace=args.grace if args.grace is not None else float(app.config.get("BLOB_GC_GRACE", 3600)),
+            )
+            print("gc:", json.dumps(result))
+        print("report:", json.dumps(dedup_report(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
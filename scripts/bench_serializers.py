@@ -0,0 +1,119 @@
+# scripts/bench_serializers.py
+"""
+Compare the ORM read path (instances + to_dict) with the Core read path
+(plain rows + precompiled serializer) used by the application views.
+
+Runs against a throwaway in-memory SQLite database, so it measures the
+Python side of a read: fetching rows from the driver, building objects and
+encoding dicts. Network and server time on Oracle come on top of both.
+
+    python scripts/bench_serializers.py --rows 10000 100000
+"""
+import argparse
+import sys
+import pathlib
+import time
+from datetime import datetime, timedelta
+
+project_root = pathlib.Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from sqlalchemy.orm import raiseload, selectinload
+
+from app import create_app
+from app.extensions import db
+from app.models import ActionLog, Application, User, gen_uuid
+from app.services.fields import DETAIL_DEFAULT_FIELDS
+from app.services.serializers import application_select, application_serializer, logs_select, serialize_logs
+
+
+class BenchConfig:
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    JWT_SECRET_KEY = "bench"
+    SEARCH_BACKEND = "memory"
+
+
+def seed(n):
+    user_id = gen_uuid()
+    db.session.execute(User.__table__.insert(), [{
+        "id": user_id, "email": "bench@x.com", "password_hash": "x", "role": "admin",
+        "token_version": 0, "created_at": datetime.utcnow(), "updated_at": datetime.utcnow(),
+    }])
+    app_id = gen_uuid()
+    start = datetime(2026, 1, 1)
+    apps, logs = [], []
+    for i in range(n):
+        ts = start + timedelta(seconds=i)
+        apps.append({
+            "id": app_id if i == 0 else gen_uuid(), "sr_no": i, "purpose": "purpose text",
+            "department": "IT", "emp_no": f"E{i}", "emp_name": f"Employee {i}",
+            "designation": "Engineer", "remarks": "remarks " * 20, "status": "submitted",
+            "created_by": user_id, "created_at": ts, "updated_at": ts,
+        })
+        logs.append({
+            "id": gen_uuid(), "application_id": app_id, "action": "verified",
+            "actor_id": user_id, "comment": None, "created_at": ts,
+        })
+    db.session.execute(Application.__table__.insert(), apps)
+    db.session.execute(ActionLog.__table__.insert(), logs)
+    db.session.commit()
+    return app_id
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        t0 = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def bench(n, repeat):
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        app_id = seed(n)
+
+        cases = {
+            "applications": (
+                lambda: [a.to_dict() for a in Application.query.options(raiseload("*")).all()],
+                lambda: application_serializer(DETAIL_DEFAULT_FIELDS).many(
+                    db.session.execute(application_select(DETAIL_DEFAULT_FIELDS))
+                ),
+            ),
+            "logs": (
+                lambda: [
+                    log.to_dict()
+                    for log in ActionLog.query.options(selectinload(ActionLog.actor), raiseload("*"))
+                    .filter_by(application_id=app_id).order_by(ActionLog.created_at.asc()).all()
+                ],
+                lambda: serialize_logs(db.session.execute(logs_select(app_id))),
+            ),
+        }
+        for name, (orm, core) in cases.items():
+            orm_s, orm_out = timed(orm, repeat)
+            core_s, core_out = timed(core, repeat)
+            if sorted(orm_out, key=lambda d: d["id"]) != sorted(core_out, key=lambda d: d["id"]):
+                raise SystemExit(f"{name}: Core output differs from to_dict()")
+            print(f"{name:>12} {n:>7} rows   orm {n / orm_s:>10,.0f} rows/s   "
+                  f"core {n / core_s:>10,.0f} rows/s   x{orm_s / core_s:.1f}")
+        db.session.remove()
+        db.drop_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    args = parser.parse_args()
+    for n in args.rows:
+        bench(n, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# scripts/calibrate_password_cost.py
+"""
+Pick the password hashing cost for this host.
+
+Times one hash per candidate cost and prints the highest cost that stays
+within the target latency, as the env var to put in .env:
+
+    python scripts/calibrate_password_cost.py --target-ms 250
+    python scripts/calibrate_password_cost.py --scheme pbkdf2 --target-ms 100
+"""
+import argparse
+import pathlib
+import sys
+import time
+
+project_root = pathlib.Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.services.passwords import hash_password_sync
+
+
+def _time_hash(**params):
+    started = time.perf_counter()
+    hash_password_sync("calibration-password", **params)
+    return (time.perf_counter() - started) * 1000
+
+
+def calibrate_bcrypt(target_ms):
+    best = 4
+    for rounds in range(4, 18):
+        elapsed = _time_hash(scheme="bcrypt", bcrypt_rounds=rounds)
+        print(f"  bcrypt rounds={rounds:<2} {elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            break
+        best = rounds
+    return f"PASSWORD_BCRYPT_ROUNDS={best}"
+
+
+def calibrate_pbkdf2(target_ms):
+    probe = 100000
+    elapsed = _time_hash(scheme="pbkdf2", pbkdf2_iterations=probe)
+    # PBKDF2 cost is linear in the iteration count
+    iterations = max(int(probe * target_ms / elapsed) // 10000 * 10000, 10000)
+    check = _time_hash(scheme="pbkdf2", pbkdf2_iterations=iterations)
+    print(f"  pbkdf2 iterations={probe} {elapsed:8.1f} ms")
+    print(f"  pbkdf2 iterations={iterations} {check:8.1f} ms")
+    return f"PASSWORD_PBKDF2_ITERATIONS={iterations}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate password hashing cost for a target latency.")
+    parser.add_argument("--scheme", choices=["bcrypt", "pbkdf2"], default="bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250.0,
+                        help="Upper bound for a single hash on this host (default: 250)")
+    args = parser.parse_args()
+
+    print(f"Calibrating {args.scheme} for <= {args.target_ms:.0f} ms per hash:")
+    if args.scheme == "bcrypt":
+        setting = calibrate_bcrypt(args.target_ms)
+    else:
+        setting = calibrate_pbkdf2(args.target_ms)
+    print(f"\nSuggested setting: {setting}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# scripts/process_attachments.py
+"""
+Run the post-upload processing stages over every attachment that is due
+(new, retry due, or abandoned by a dead worker) in this process, then
+print the counts per processing status. For deployments with
+PROCESSING_WORKERS=0, or to drain a backlog after a migration; safe to
+run next to the app's own workers.
+
+    python scripts/process_attachments.py [--batch-size N] [--report-only]
+"""
+import argparse
+import json
+import os
+import sys
+import pathlib
+
+project_root = pathlib.Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+# this process does the work itself; no background pool next to it
+os.environ["PROCESSING_WORKERS"] = "0"
+
+from app import create_app
+from app.services.processing import process_pending, processing_counts, processing_options
+
+
+def main():
+    parser = argparse.ArgumentParser(description="attachment post-upload processing")
+    parser.add_argument("--batch-size", type=int, help="attachments fetched per query (default PROCESSING_BATCH_SIZE)")
+    parser.add_argument("--report-only", action="store_true")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if not args.report_only:
+            result = process_pending(
+                app.extensions["storage"],
+                batch_size=args.batch_size or int(app.config.get("PROCESSING_BATCH_SIZE", 100)),
+                **processing_options(app.config),
+            )
+            print("processed:", json.dumps(result))
+        print("status:", json.dumps(processing_counts(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
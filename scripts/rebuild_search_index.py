@@ -0,0 +1,26 @@
+# scripts/rebuild_search_index.py
+"""
+Rebuild the full-text search index from the applications table using the
+configured SEARCH_BACKEND (creates the SQLite FTS5 table if it is missing).
+"""
+import sys
+import pathlib
+
+project_root = pathlib.Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app import create_app
+from app.services.search import get_backend
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        backend = get_backend()
+        n = backend.rebuild()
+        print(f"search index ({backend.name}) rebuilt: {n} applications")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# scripts/rebuild_stats.py
+"""
+Reconcile the application_stats summary table from the applications table.
+Safe to run at any time; it replaces every counter in one transaction.
+"""
+import sys
+import pathlib
+
+project_root = pathlib.Path(__file__).resolve().parents[1]
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app import create_app
+from app.services.stats import rebuild_stats
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        n = rebuild_stats()
+        print(f"application_stats rebuilt: {n} (department, status) rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 # tests/conftest.py
 import sys
 import pathlib
+from collections import Counter
+from contextlib import contextmanager
 import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Mapper
+from werkzeug.security import generate_password_hash
 
 # Ensure project root is on sys.path so tests can import `app`
 project_root = pathlib.Path(__file__).resolve().parents[1]  # backend/
@@ -10,42 +15,165 @@ if str(project_root) not in sys.path:
 
 from app import create_app
 from app.extensions import db as _db
+from app.models import User
+from app.services.sqlprofile import QueryProfile
 
 TEST_DB = "sqlite:///:memory:"
 
-@pytest.fixture(scope="session")
-def app():
-    config = {
-        "TESTING": True,
-        "SQLALCHEMY_DATABASE_URI": TEST_DB,
-        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
-        "JWT_SECRET_KEY": "test-secret",
-        "CORS_ORIGINS": "http://localhost:3000"
-    }
-    # create app then apply test config (matches how some tests use the factory)
-    app = create_app()
-    app.config.update(config)
-
-    # push app context for session lifetime
-    ctx = app.app_context()
-    ctx.push()
-    yield app
-    ctx.pop()
-
-@pytest.fixture(scope="session")
-def client(app):
+# seeded by the `app` fixture; auth_headers() logs in as this user by default
+TEST_USER = "tester@x.com"
+TEST_PASSWORD = "pass"
+
+
+class TestConfig:
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = TEST_DB
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    JWT_SECRET_KEY = "test-secret"
+    JWT_ACCESS_TOKEN_EXPIRES_MINUTES = 5
+    JWT_REFRESH_TOKEN_EXPIRES_DAYS = 1
+    CORS_ORIGINS = "http://localhost:3000"
+    # the tables don't exist yet when create_app() runs
+    SEARCH_MEMORY_WARM = False
+
+
+@pytest.fixture
+def make_app():
     """
-    Return a test client. Ensure DB tables exist for tests that use only `client`
-    and do not directly request the `db` fixture.
+    Usage:
+        app = make_app(LIST_CACHE_BACKEND="none")
+    create_app() over TestConfig with the given settings on top; no tables,
+    no app context. For tests that need more than one app.
     """
-    # make sure tables exist (safe no-op if already created)
-    _db.create_all()
+    return lambda **overrides: create_app(type("TestConfig", (TestConfig,), overrides))
+
+
+@pytest.fixture
+def app_config():
+    """
+    Settings the `app` fixture applies on top of TestConfig. Override it in
+    a test module (it may take tmp_path or be parametrized):
+
+        @pytest.fixture
+        def app_config(tmp_path):
+            return {"UPLOAD_FOLDER": str(tmp_path / "uploads")}
+    """
+    return {}
+
+
+@pytest.fixture
+def app(make_app, app_config):
+    """
+    A fresh app per test: TestConfig + app_config, tables created and
+    TEST_USER (an admin) seeded, inside a pushed app context. Modules that
+    need more rows wrap it:
+
+        @pytest.fixture
+        def app(app):
+            db.session.add(...)
+            db.session.commit()
+            return app
+    """
+    app = make_app(**app_config)
+    with app.app_context():
+        _db.create_all()
+        _db.session.add(User(email=TEST_USER, password_hash=generate_password_hash(TEST_PASSWORD), role="admin"))
+        _db.session.commit()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+        _db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
     return app.test_client()
 
-@pytest.fixture(scope="session")
+
+@pytest.fixture
 def db(app):
-    # create all tables for tests that explicitly depend on db fixture
-    _db.create_all()
-    yield _db
-    _db.session.remove()
-    _db.drop_all()
+    return _db
+
+
+@pytest.fixture
+def auth_headers(client):
+    """
+    Usage:
+        headers = auth_headers()                 # TEST_USER
+        headers = auth_headers("other@x.com")    # a user the module seeded
+    Logs in through /auth/login and returns the Authorization header.
+    """
+    def login(email=TEST_USER, password=TEST_PASSWORD):
+        rv = client.post("/auth/login", json={"email": email, "password": password})
+        assert rv.status_code == 200, rv.get_json()
+        return {"Authorization": f"Bearer {rv.get_json()['access_token']}"}
+
+    return login
+
+
+@pytest.fixture
+def submit_application(client):
+    """
+    Usage:
+        app_id = submit_application(headers, department="HR")
+    POSTs one application (defaults for every required field) and returns
+    its id.
+    """
+    def submit(headers, **fields):
+        payload = {"sr_no": 1, "purpose": "p", "department": "IT", "emp_no": "E1", "emp_name": "n", **fields}
+        rv = client.post("/api/applications/", headers=headers, json=payload)
+        assert rv.status_code == 201, rv.get_json()
+        return rv.get_json()["id"]
+
+    return submit
+
+
+class QueryBudget(QueryProfile):
+    """
+    QueryProfile that also counts the ORM instances loaded while active
+    (`loaded`, by class name), so tests can pin per-endpoint query budgets.
+    """
+
+    def __init__(self, engine, **kwargs):
+        super().__init__(engine, **kwargs)
+        self.loaded = Counter()
+
+    def _on_load(self, target, context):
+        self.loaded[type(target).__name__] += 1
+
+    def __enter__(self):
+        event.listen(Mapper, "load", self._on_load)
+        return super().__enter__()
+
+    def __exit__(self, *exc):
+        event.remove(Mapper, "load", self._on_load)
+        return super().__exit__(*exc)
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Usage:
+        with query_budget(max_statements=2) as qb:
+            client.get(...)
+        assert qb.loaded == {"Application": 3}
+    Fails with the captured statements when the block runs more statements
+    than allowed or repeats one statement often enough to look like an N+1
+    (pass allow_repeats=True to skip that check). `qb` also exposes
+    count, statements and loaded for finer assertions.
+    Must be used inside the app context of the app under test.
+    """
+    @contextmanager
+    def budget(max_statements=None, allow_repeats=False, n_plus_one_threshold=3):
+        with QueryBudget(_db.engine, n_plus_one_threshold=n_plus_one_threshold) as profile:
+            yield profile
+        listing = "\n".join(f"  {s}" for s in profile.statements)
+        if max_statements is not None:
+            assert profile.count <= max_statements, (
+                f"{profile.count} statements, budget {max_statements}:\n{listing}"
+            )
+        if not allow_repeats:
+            repeated = profile.repeated()
+            assert not repeated, f"likely N+1: {repeated}\n{listing}"
+
+    return budget
@@ -0,0 +1,76 @@
+# tests/test_admission.py
+import pytest
+
+from app import db
+from app.models import Application, User
+from app.services.admission import AdmissionController, parse_limits
+
+
+@pytest.fixture
+def app_config():
+    return {"ADMISSION_LIMITS": "listing=1,export=1,auth=2", "ADMISSION_RETRY_AFTER": 3}
+
+
+@pytest.fixture
+def app(app):
+    db.session.add(Application(sr_no=1, purpose="p", department="IT", emp_no="E1",
+                               emp_name="n", created_by=User.query.one().id))
+    db.session.commit()
+    return app
+
+
+def test_expensive_endpoint_sheds_cheap_one_does_not(app, client, auth_headers):
+    headers = auth_headers()
+    controller = app.extensions["admission"]
+    app_id = Application.query.first().id
+
+    assert controller.try_acquire("listing")  # a list request already running
+    try:
+        rv = client.get("/api/applications/", headers=headers)
+        assert rv.status_code == 503
+        assert rv.headers["Retry-After"] == "3"
+        assert client.get(f"/api/applications/{app_id}", headers=headers).status_code == 200
+        assert client.get("/health").status_code == 200
+        # no token: rejected before the limiter is consulted
+        assert client.get("/api/applications/").status_code == 401
+    finally:
+        controller.release("listing")
+
+    assert client.get("/api/applications/", headers=headers).status_code == 200
+    assert controller.stats()["listing"]["in_flight"] == 0
+    assert controller.stats()["listing"]["rejected"] == 1
+    assert 'admission_rejected_total{class="listing"} 1' in client.get("/metrics").get_data(as_text=True)
+
+
+def test_streamed_export_releases_slot(app, client, auth_headers):
+    headers = auth_headers()
+    assert client.get("/api/applications/export").status_code == 401
+    assert app.extensions["admission"].stats()["export"]["in_flight"] == 0
+    rv = client.get("/api/applications/export", headers=headers)
+    assert rv.status_code == 200
+    rv.get_data()
+    assert app.extensions["admission"].stats()["export"]["in_flight"] == 0
+
+
+def test_limits_follow_pool_wait():
+    wait = {"value": 0.0}
+    controller = AdmissionController({"listing": 8}, wait_source=lambda: wait["value"],
+                                     target_wait=0.05, adjust_interval=0)
+    wait["value"] = 0.2
+    for _ in range(10):
+        controller.adjust()
+    assert controller.limiters["listing"].limit == 1
+
+    wait["value"] = 0.0
+    for _ in range(3):
+        controller.adjust()
+    assert controller.limiters["listing"].limit == 4
+    for _ in range(10):
+        controller.adjust()
+    assert controller.limiters["listing"].limit == 8
+
+
+def test_parse_limits():
+    assert parse_limits("listing=16, auth=8") == {"listing": 16, "auth": 8}
+    assert parse_limits({"export": "2"}) == {"export": 2}
+    assert parse_limits("") == {}
@@ -0,0 +1,115 @@
+# tests/test_attachments.py
+import io
+import os
+
+import pytest
+
+from app.models import Attachment
+from app.services.storage import LocalStorage, TooLarge
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {
+        "UPLOAD_FOLDER": str(tmp_path / "uploads"),
+        "STORAGE_CHUNK_SIZE": 64 * 1024,
+        "ATTACHMENT_MAX_BYTES": 4 * 1024 * 1024,
+    }
+
+
+PAYLOAD = os.urandom(3 * 1024 * 1024 + 123)
+
+
+def test_raw_upload_and_download(client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    rv = client.post(f"/api/applications/{app_id}/attachments?filename=scan.pdf", headers=headers,
+                     data=PAYLOAD, content_type="application/pdf")
+    assert rv.status_code == 201
+    att = rv.get_json()
+    assert att["size"] == len(PAYLOAD)
+    assert att["mime_type"] == "application/pdf"
+    assert rv.headers["Location"].endswith(f"/{app_id}/attachments/{att['id']}")
+
+    listed = client.get(f"/api/applications/{app_id}/attachments", headers=headers).get_json()
+    assert [a["id"] for a in listed["attachments"]] == [att["id"]]
+
+    rv = client.get(f"/api/applications/{app_id}/attachments/{att['id']}", headers=headers)
+    assert rv.status_code == 200
+    assert rv.data == PAYLOAD
+    assert rv.headers["Accept-Ranges"] == "bytes"
+    assert "scan.pdf" in rv.headers["Content-Disposition"]
+    etag = rv.headers["ETag"]
+
+    again = client.get(f"/api/applications/{app_id}/attachments/{att['id']}",
+                       headers={**headers, "If-None-Match": etag})
+    assert again.status_code == 304
+
+
+def test_range_requests(client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    att_id = client.post(f"/api/applications/{app_id}/attachments", headers={**headers, "X-Filename": "a.bin"},
+                         data=PAYLOAD).get_json()["id"]
+    url = f"/api/applications/{app_id}/attachments/{att_id}"
+
+    rv = client.get(url, headers={**headers, "Range": "bytes=100-199"})
+    assert rv.status_code == 206
+    assert rv.data == PAYLOAD[100:200]
+    assert rv.headers["Content-Range"] == f"bytes 100-199/{len(PAYLOAD)}"
+
+    rv = client.get(url, headers={**headers, "Range": "bytes=-10"})
+    assert rv.data == PAYLOAD[-10:]
+
+    rv = client.get(url, headers={**headers, "Range": f"bytes={len(PAYLOAD) + 5}-"})
+    assert rv.status_code == 416
+
+
+def test_multipart_upload(client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    rv = client.post(f"/api/applications/{app_id}/attachments", headers=headers,
+                     data={"file": (io.BytesIO(b"hello"), "note.txt")}, content_type="multipart/form-data")
+    assert rv.status_code == 201
+    body = rv.get_json()
+    assert (body["filename"], body["mime_type"], body["size"]) == ("note.txt", "text/plain", 5)
+
+
+def test_rejections_leave_nothing_behind(app, client, tmp_path, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    url = f"/api/applications/{app_id}/attachments?filename=big.bin"
+    too_big = b"x" * (4 * 1024 * 1024 + 1)
+
+    assert client.post(url, headers=headers, data=too_big).status_code == 413
+    # no Content-Length: caught while streaming
+    rv = client.post(url, headers=headers, input_stream=io.BytesIO(too_big),
+                     environ_overrides={"wsgi.input_terminated": True})
+    assert rv.status_code == 413
+    assert client.post(f"/api/applications/{app_id}/attachments", headers=headers, data=b"x").status_code == 400
+    assert client.post("/api/applications/missing/attachments?filename=a", headers=headers,
+                       data=b"x").status_code == 404
+
+    assert Attachment.query.count() == 0
+    stored = [f for _, _, files in os.walk(tmp_path / "uploads") for f in files]
+    assert stored == []
+
+
+def test_local_storage_reads_in_chunks(tmp_path):
+    class Recorder(io.BytesIO):
+        sizes = []
+
+        def read(self, n=-1):
+            self.sizes.append(n)
+            return super().read(n)
+
+    storage = LocalStorage(str(tmp_path), chunk_size=1000)
+    key, size = storage.save(Recorder(b"a" * 4500))
+    assert size == 4500
+    assert set(Recorder.sizes) == {1000}
+    with storage.open(key) as f:
+        assert f.read() == b"a" * 4500
+
+    with pytest.raises(TooLarge):
+        storage.save(io.BytesIO(b"a" * 2001), max_size=2000)
+    assert os.listdir(tmp_path / ".tmp") == []
@@ -0,0 +1,121 @@
+# tests/test_audit_writer.py
+import json
+import os
+import threading
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models import ActionLog, Application, User, gen_uuid
+from app.services.audit import AuditWriter
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'audit.db'}",
+        "AUDIT_ASYNC": True,
+        "AUDIT_SPOOL_DIR": str(tmp_path / "spool"),
+        "AUDIT_FLUSH_INTERVAL": 0.05,
+        "AUDIT_SPOOL_FSYNC": False,
+    }
+
+
+@pytest.fixture
+def app(app):
+    db.session.add(Application(id="app-1", sr_no=1, purpose="p", department="IT",
+                               emp_no="E", emp_name="n", created_by=User.query.one().id))
+    db.session.commit()
+    yield app
+    app.extensions["audit_writer"].shutdown()
+
+
+def _log(action="x"):
+    return ActionLog(id=gen_uuid(), application_id="app-1", action=action,
+                     created_at=datetime.utcnow())
+
+
+def test_submit_log_written_in_background(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers, sr_no=2)
+
+    writer = app.extensions["audit_writer"]
+    assert writer.flush()
+    assert ActionLog.query.filter_by(application_id=app_id, action="created").count() == 1
+    assert writer.stats()["spool_files"] == 0
+
+    stats = client.get("/api/admin/audit-writer", headers=headers).get_json()
+    assert stats["enabled"] and stats["written"] == 1 and stats["queue_depth"] == 0
+
+
+def test_entries_survive_outage_and_restart(app, tmp_path):
+    writer = app.extensions["audit_writer"]
+    writer._insert = lambda entries: (_ for _ in ()).throw(RuntimeError("db down"))
+    for _ in range(3):
+        writer.enqueue(_log())
+    writer.flush()
+    assert ActionLog.query.count() == 0
+    assert writer.stats()["failed_flushes"] >= 1
+    writer.shutdown(timeout=2)
+    assert os.listdir(tmp_path / "spool")
+
+    # a new worker picks the orphaned spool up on start
+    replacement = AuditWriter(app, spool_dir=str(tmp_path / "spool"), flush_interval=0.05, fsync=False).start()
+    replacement.flush()
+    replacement.shutdown()
+    assert ActionLog.query.count() == 3
+    assert replacement.counters["replayed"] == 3
+    assert os.listdir(tmp_path / "spool") == []
+
+
+def test_full_queue_overflows_to_spool(app, tmp_path):
+    app.extensions["audit_writer"].shutdown()
+    writer = AuditWriter(app, spool_dir=str(tmp_path / "spool"), maxsize=2, fsync=False)
+    os.makedirs(writer.spool_dir, exist_ok=True)
+    for _ in range(5):  # thread not started yet, so the queue stays full
+        writer.enqueue(_log())
+    assert writer.counters["overflowed"] == 3
+    assert writer.flush(timeout=0.05) is False
+
+    hub = app.extensions["change_hub"]
+    published = hub.published
+    writer.start()
+    writer.flush()
+    writer.shutdown()
+    assert ActionLog.query.count() == 5
+    assert hub.published - published == 5  # overflowed entries reach the feed too
+    assert os.listdir(tmp_path / "spool") == []
+
+
+def test_marker_taking_last_slot_overflows_entry(app, tmp_path):
+    app.extensions["audit_writer"].shutdown()
+    writer = AuditWriter(app, spool_dir=str(tmp_path / "spool"), maxsize=2, fsync=False)
+    os.makedirs(writer.spool_dir, exist_ok=True)
+    writer.enqueue(_log())
+    real_full = writer._queue.full
+    writer._queue.full = lambda: False  # a flush() marker lands after the check
+    writer._queue.put_nowait(threading.Event())
+    writer.enqueue(_log())
+    writer._queue.full = real_full
+    assert (writer.counters["enqueued"], writer.counters["overflowed"]) == (1, 1)
+
+    writer.start()
+    writer.flush()
+    writer.shutdown()
+    assert ActionLog.query.count() == 2
+    assert os.listdir(tmp_path / "spool") == []
+
+
+def test_rejected_entries_are_dead_lettered(app, tmp_path):
+    writer = app.extensions["audit_writer"]
+    writer.enqueue(_log())
+    writer.enqueue(_log(action=None))  # NOT NULL violation, never going to succeed
+    writer.enqueue(_log())
+    assert writer.flush()
+    assert ActionLog.query.count() == 2
+    assert writer.counters["dead_lettered"] == 1
+    assert writer.counters["written"] == 2 and writer.counters["failed_flushes"] == 0
+    with open(tmp_path / "spool" / "dead-letter.ndjson", encoding="utf-8") as fh:
+        assert [json.loads(line)["action"] for line in fh] == [None]
+    assert [n for n in os.listdir(tmp_path / "spool") if n.startswith("spool-")] == []
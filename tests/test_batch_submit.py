@@ -0,0 +1,81 @@
+# tests/test_batch_submit.py
+import pytest
+
+from app.models import ActionLog, Application
+
+
+@pytest.fixture
+def app_config():
+    return {"SUBMIT_BATCH_MAX_ROWS": 50, "SUBMIT_BATCH_CHUNK_SIZE": 4}
+
+
+def _row(i, department="IT"):
+    return {"sr_no": i, "purpose": "p", "department": department, "emp_no": f"E{i}", "emp_name": "n"}
+
+
+def test_batch_submit_all_created(client, query_budget, auth_headers):
+    headers = auth_headers()
+    rows = [_row(i, "IT" if i % 2 else "HR") for i in range(10)]
+    with query_budget(allow_repeats=True) as qc:  # one INSERT per chunk
+        rv = client.post("/api/applications/", json=rows, headers=headers)
+    assert rv.status_code == 201
+    body = rv.get_json()
+    assert body["created"] == 10
+    assert [r["index"] for r in body["results"]] == list(range(10))
+
+    # 3 chunks of at most 4 rows, each with one INSERT per table
+    assert sum(1 for s in qc.statements if s.startswith("INSERT INTO applications (")) == 3
+    assert sum(1 for s in qc.statements if s.startswith("INSERT INTO action_logs")) == 3
+
+    assert Application.query.count() == 10
+    assert ActionLog.query.filter_by(action="created").count() == 10
+    stats = client.get("/api/applications/stats", headers=headers).get_json()
+    assert stats["by_department"] == {"HR": 5, "IT": 5}
+
+
+def test_batch_submit_partial(client, auth_headers):
+    headers = auth_headers()
+    rows = [_row(0), {"sr_no": 1}, "nope", _row(3)]
+    rv = client.post("/api/applications/", json=rows, headers=headers)
+    assert rv.status_code == 207
+    results = rv.get_json()["results"]
+    assert [r["status"] for r in results] == ["created", "invalid", "invalid", "created"]
+    assert results[1]["missing"] == ["purpose", "department", "emp_no", "emp_name"]
+    assert Application.query.count() == 2
+
+
+def test_bad_values_fail_only_their_row(client, auth_headers):
+    headers = auth_headers()
+    rows = [_row(i) for i in range(8)]
+    rows[2]["emp_name"] = None
+    rows[5]["sr_no"] = "five"
+    rows[6]["department"] = "x" * 101
+    rv = client.post("/api/applications/", json=rows, headers=headers)
+    assert rv.status_code == 207
+    results = rv.get_json()["results"]
+    statuses = [r["status"] for r in results]
+    assert statuses == ["created", "created", "invalid", "created", "created", "invalid", "invalid", "created"]
+    assert results[2]["invalid"] == {"emp_name": "must not be null"}
+    assert results[5]["invalid"] == {"sr_no": "must be an integer"}
+    assert list(results[6]["invalid"]) == ["department"]
+    assert Application.query.count() == 5
+
+
+def test_db_error_is_not_echoed(client, auth_headers, monkeypatch):
+    import app.routes.applications as routes
+
+    def fail(rows, actor_id):
+        raise RuntimeError("ORA-00001: unique constraint (CRIS.SYS_C0012) violated")
+
+    monkeypatch.setattr(routes, "submit_many", fail)
+    rv = client.post("/api/applications/", json=[_row(0)], headers=auth_headers())
+    assert rv.status_code == 400
+    assert rv.get_json()["results"] == [{"index": 0, "status": "error", "msg": "db error"}]
+
+
+def test_batch_submit_limits(client, auth_headers):
+    headers = auth_headers()
+    assert client.post("/api/applications/", json=[], headers=headers).status_code == 400
+    rv = client.post("/api/applications/", json=[_row(i) for i in range(51)], headers=headers)
+    assert rv.status_code == 400
+    assert rv.get_json()["max"] == 50
@@ -0,0 +1,134 @@
+# tests/test_blobs.py
+import io
+import os
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import Attachment, AttachmentBlob, User
+from app.services.blobs import BlobCollector, collect_garbage, dedup_report
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {"UPLOAD_FOLDER": str(tmp_path / "uploads")}
+
+
+def _upload(client, headers, app_id, data, name="id-card.png"):
+    rv = client.post(f"/api/applications/{app_id}/attachments?filename={name}", headers=headers, data=data)
+    assert rv.status_code == 201
+    return rv.get_json()["id"]
+
+
+def _files(app):
+    root = app.extensions["storage"].root
+    return sorted(f for d, _, files in os.walk(root) if not d.endswith(".tmp") for f in files)
+
+
+SCAN = os.urandom(200_000)
+
+
+def test_identical_uploads_share_one_blob(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    first, second = submit_application(headers), submit_application(headers)
+    a = _upload(client, headers, first, SCAN)
+    b = _upload(client, headers, second, SCAN, name="copy.png")
+    _upload(client, headers, second, b"other")
+
+    assert len(_files(app)) == 2
+    blob = db.session.get(AttachmentBlob, db.session.get(Attachment, a).digest)
+    assert blob.refcount == 2 and blob.size == len(SCAN)
+    assert client.get(f"/api/applications/{second}/attachments/{b}", headers=headers).data == SCAN
+    assert os.listdir(os.path.join(app.extensions["storage"].root, ".tmp")) == []
+
+    report = client.get("/api/admin/storage", headers=headers).get_json()
+    assert report["attachments"] == 3
+    assert report["blobs"] == 2 and report["shared_blobs"] == 1
+    assert report["logical_bytes"] == 2 * len(SCAN) + 5
+    assert report["saved_bytes"] == len(SCAN)
+
+
+def test_unreferenced_blobs_are_collected(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    a = _upload(client, headers, app_id, SCAN)
+    b = _upload(client, headers, app_id, SCAN)
+    storage = app.extensions["storage"]
+
+    assert client.delete(f"/api/applications/{app_id}/attachments/{a}", headers=headers).status_code == 204
+    [blob] = AttachmentBlob.query.all()
+    assert blob.refcount == 1 and blob.unreferenced_at is None
+    client.delete(f"/api/applications/{app_id}/attachments/{b}", headers=headers)
+    db.session.refresh(blob)
+    assert blob.refcount == 0 and blob.unreferenced_at is not None
+
+    # still inside the grace period
+    assert collect_garbage(storage, grace=3600)["blobs_removed"] == 0
+    assert len(_files(app)) == 1
+
+    result = collect_garbage(storage, batch_size=1, grace=0)
+    assert result["blobs_removed"] == 1 and result["bytes_freed"] == len(SCAN)
+    assert AttachmentBlob.query.count() == 0
+    assert _files(app) == []
+    assert dedup_report()["stored_bytes"] == 0
+
+
+def test_revived_blob_survives_gc(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    a = _upload(client, headers, app_id, SCAN)
+    client.delete(f"/api/applications/{app_id}/attachments/{a}", headers=headers)
+    b = _upload(client, headers, app_id, SCAN)
+
+    [blob] = AttachmentBlob.query.all()
+    assert blob.refcount == 1 and blob.unreferenced_at is None
+    assert collect_garbage(app.extensions["storage"], grace=0)["blobs_removed"] == 0
+    assert client.get(f"/api/applications/{app_id}/attachments/{b}", headers=headers).data == SCAN
+
+
+def test_orphans_and_staged_files_are_swept(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    storage = app.extensions["storage"]
+    _upload(client, headers, app_id, SCAN)
+
+    orphan, _ = storage.save(io.BytesIO(b"no row for me"))
+    # stored before content addressing: referenced by storage_key only
+    legacy = "legacy" + "0" * 26
+    staged = storage.stage(io.BytesIO(b"legacy bytes"))
+    storage.place(staged, legacy)
+    db.session.add(Attachment(application_id=app_id, filename="old.pdf", mime_type="application/pdf",
+                              size=12, storage_key=legacy))
+    db.session.commit()
+    abandoned = storage.stage(io.BytesIO(b"crashed upload"))
+
+    result = collect_garbage(storage, grace=0)
+    assert result["orphans_removed"] == 1
+    assert result["staged_removed"] == 1
+    assert not storage.exists(orphan)
+    assert storage.exists(legacy)
+    assert not os.path.exists(abandoned.path)
+    assert len(_files(app)) == 2
+
+
+def test_background_collector(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    a = _upload(client, headers, app_id, SCAN)
+    client.delete(f"/api/applications/{app_id}/attachments/{a}", headers=headers)
+
+    collector = BlobCollector(app, interval=60, batch_size=10, grace=0)
+    assert collector.run_once()["blobs_removed"] == 1
+    assert collector.runs == 1 and collector.last_error is None
+
+
+def test_delete_requires_admin(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    a = _upload(client, headers, app_id, b"x")
+    db.session.add(User(email="u@x.com", password_hash=generate_password_hash("pass"), role="user"))
+    db.session.commit()
+    user_headers = auth_headers("u@x.com")
+    assert client.delete(f"/api/applications/{app_id}/attachments/{a}", headers=user_headers).status_code == 403
+    assert client.delete(f"/api/applications/{app_id}/attachments/nope", headers=headers).status_code == 404
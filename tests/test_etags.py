@@ -0,0 +1,68 @@
+# tests/test_etags.py
+from app import db
+
+
+def test_application_etag(client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+
+    rv = client.get(f"/api/applications/{app_id}", headers=headers)
+    assert rv.status_code == 200
+    etag = rv.headers["ETag"]
+    assert not etag.startswith("W/")
+
+    rv = client.get(f"/api/applications/{app_id}", headers={**headers, "If-None-Match": etag})
+    assert rv.status_code == 304
+    assert rv.headers["ETag"] == etag
+    assert rv.data == b""
+    # weakened by a compressing proxy on the way out
+    rv = client.get(f"/api/applications/{app_id}", headers={**headers, "If-None-Match": f"W/{etag}"})
+    assert rv.status_code == 304
+
+    assert client.patch(f"/api/applications/{app_id}/verify", headers=headers, json={}).status_code == 200
+    rv = client.get(f"/api/applications/{app_id}", headers={**headers, "If-None-Match": etag})
+    assert rv.status_code == 200
+    assert rv.headers["ETag"] != etag
+
+
+def test_logs_etag(client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+
+    etag = client.get(f"/api/applications/{app_id}/logs", headers=headers).headers["ETag"]
+    rv = client.get(f"/api/applications/{app_id}/logs", headers={**headers, "If-None-Match": etag})
+    assert rv.status_code == 304
+
+    client.patch(f"/api/applications/{app_id}/verify", headers=headers, json={})
+    rv = client.get(f"/api/applications/{app_id}/logs", headers={**headers, "If-None-Match": etag})
+    assert rv.status_code == 200
+    assert len(rv.get_json()["logs"]) == 2
+
+
+def test_list_etag(client, auth_headers, submit_application):
+    headers = auth_headers()
+    submit_application(headers, sr_no=1)
+
+    etag = client.get("/api/applications/?status=submitted", headers=headers).headers["ETag"]
+    cond = {**headers, "If-None-Match": etag}
+    assert client.get("/api/applications/?status=submitted", headers=cond).status_code == 304
+
+    submit_application(headers, sr_no=2)
+    rv = client.get("/api/applications/?status=submitted", headers=cond)
+    assert rv.status_code == 200
+    assert rv.get_json()["total"] == 2
+
+    assert "ETag" not in client.get("/api/applications/?include_total=false", headers=headers).headers
+
+
+def test_not_modified_skips_loading(app, client, query_budget, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    etag = client.get(f"/api/applications/{app_id}", headers=headers).headers["ETag"]
+    db.session.remove()
+
+    with query_budget() as qc:
+        rv = client.get(f"/api/applications/{app_id}", headers={**headers, "If-None-Match": etag})
+    assert rv.status_code == 304
+    assert qc.count == 1
+    assert not qc.loaded
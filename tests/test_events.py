@@ -0,0 +1,97 @@
+# tests/test_events.py
+import json
+
+import pytest
+
+from app import db
+from app.services.events import ChangeHub, event_stream
+
+
+@pytest.fixture
+def app_config():
+    return {"SSE_HEARTBEAT": 0.05, "SSE_MAX_SECONDS": 2, "SSE_REPLAY_GRACE": 0}
+
+
+def _next_events(frames, n):
+    """Read SSE frames until n events arrived; returns [(cursor, payload)]."""
+    events = []
+    for frame in frames:
+        frame = frame.decode() if isinstance(frame, bytes) else frame
+        if not frame.startswith("id:"):
+            continue  # retry hint / keepalive comment
+        lines = dict(line.split(": ", 1) for line in frame.strip().split("\n"))
+        events.append((lines["id"], json.loads(lines["data"])))
+        if len(events) == n:
+            return events
+    return events
+
+
+def test_application_stream_history_then_live(client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+
+    rv = client.get(f"/api/applications/{app_id}/events", headers=headers, buffered=False)
+    assert rv.status_code == 200
+    assert rv.mimetype == "text/event-stream"
+    frames = iter(rv.response)
+
+    [(first_cursor, created)] = _next_events(frames, 1)
+    assert created["action"] == "created"
+
+    client.patch(f"/api/applications/{app_id}/verify", headers=headers, json={})
+    [(cursor, verified)] = _next_events(frames, 1)
+    assert verified["action"] == "verified"
+    assert verified["application_id"] == app_id
+    assert cursor != first_cursor
+    rv.close()
+
+
+def test_resume_from_last_event_id(client, auth_headers, submit_application):
+    headers = auth_headers()
+    first = submit_application(headers, sr_no=1)
+    rv = client.get(f"/api/applications/{first}/events", headers=headers, buffered=False)
+    [(cursor, _)] = _next_events(iter(rv.response), 1)
+    rv.close()
+
+    second = submit_application(headers, sr_no=2)
+    rv = client.get("/api/applications/events", buffered=False,
+                    headers={**headers, "Last-Event-ID": cursor})
+    [(_, ev)] = _next_events(iter(rv.response), 1)
+    rv.close()
+    assert ev["application_id"] == second
+
+
+def test_global_stream_is_live_only(client, auth_headers, submit_application):
+    headers = auth_headers()
+    submit_application(headers, sr_no=1)
+    rv = client.get("/api/applications/events?status_only=true", headers=headers, buffered=False)
+    frames = iter(rv.response)
+    next(frames)  # retry hint; the stream is subscribed from here on
+
+    app_id = submit_application(headers, sr_no=2)
+    [(_, ev)] = _next_events(frames, 1)
+    rv.close()
+    assert ev["application_id"] == app_id
+
+
+def test_bad_cursor_and_unknown_application(client, auth_headers):
+    headers = auth_headers()
+    assert client.get("/api/applications/events?cursor=nope", headers=headers).status_code == 400
+    assert client.get("/api/applications/missing/events", headers=headers).status_code == 404
+
+
+def test_overflow_resyncs_from_database(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    hub = ChangeHub(queue_size=1)
+    frames = event_stream(hub, db.engine, application_id=app_id, heartbeat=0.05, max_seconds=2, grace=0)
+    assert len(_next_events(frames, 1)) == 1  # history: "created"
+
+    # two entries committed while the stream's queue only holds one
+    app.extensions["change_hub"] = hub
+    client.patch(f"/api/applications/{app_id}/verify", headers=headers, json={})
+    client.patch(f"/api/applications/{app_id}/approve", headers=headers, json={})
+    events = _next_events(frames, 2)
+    frames.close()
+    assert [ev["action"] for _, ev in events] == ["verified", "approved"]
+    assert hub.stats()["subscribers"] == 0
@@ -0,0 +1,56 @@
+# tests/test_export.py
+import csv
+import io
+import json
+
+import pytest
+
+from app import db
+from app.models import Application, User
+
+
+@pytest.fixture
+def app_config():
+    return {"EXPORT_BATCH_SIZE": 4}
+
+
+@pytest.fixture
+def app(app):
+    user = User.query.one()
+    for i in range(10):
+        db.session.add(Application(sr_no=i, purpose="p, with comma", department="IT" if i < 6 else "HR",
+                                   emp_no=f"E{i}", emp_name="n", remarks="line1\nline2",
+                                   created_by=user.id))
+    db.session.commit()
+    return app
+
+
+def test_export_ndjson_filters(client, auth_headers):
+    rv = client.get("/api/applications/export?format=ndjson&department=IT", headers=auth_headers())
+    assert rv.status_code == 200
+    assert rv.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in rv.get_data(as_text=True).splitlines()]
+    assert len(rows) == 6
+    assert {r["department"] for r in rows} == {"IT"}
+    expected = Application.query.get(rows[0]["id"]).to_dict()
+    assert rows[0] == expected
+
+
+def test_export_csv(client, auth_headers):
+    rv = client.get("/api/applications/export?format=csv", headers=auth_headers())
+    assert rv.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(rv.get_data(as_text=True))))
+    assert len(rows) == 10
+    assert rows[0]["remarks"] == "line1\nline2"
+    assert rows[0]["purpose"] == "p, with comma"
+
+
+def test_export_is_streamed(client, auth_headers):
+    rv = client.get("/api/applications/export", headers=auth_headers(), buffered=False)
+    assert rv.is_streamed
+    rv.close()
+
+
+def test_export_rejects_unknown_format(client, auth_headers):
+    rv = client.get("/api/applications/export?format=xml", headers=auth_headers())
+    assert rv.status_code == 400
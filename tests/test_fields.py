@@ -0,0 +1,66 @@
+# tests/test_fields.py
+import pytest
+
+
+@pytest.fixture
+def app_config():
+    return {"LIST_CACHE_BACKEND": "none"}
+
+
+def _select(statements):
+    [stmt] = [s for s in statements if s.lstrip().upper().startswith("SELECT") and "applications.id" in s]
+    return stmt
+
+
+def test_list_leaves_out_remarks_by_default(client, query_budget, auth_headers, submit_application):
+    headers = auth_headers()
+    submit_application(headers, remarks="long note")
+    with query_budget() as qc:
+        item = client.get("/api/applications/?include_total=false", headers=headers).get_json()["items"][0]
+    assert "remarks" not in item
+    assert item["emp_name"] == "n"
+    assert "applications.remarks" not in _select(qc.statements)
+
+    item = client.get("/api/applications/?fields=emp_name,remarks", headers=headers).get_json()["items"][0]
+    assert set(item) == {"id", "emp_name", "remarks"}
+    assert item["remarks"] == "long note"
+
+
+def test_list_fields_with_cursor_and_etag(client, auth_headers, submit_application):
+    headers = auth_headers()
+    for _ in range(3):
+        submit_application(headers, remarks="long note")
+    rv = client.get("/api/applications/?fields=status&cursor=&per_page=2", headers=headers)
+    body = rv.get_json()
+    assert [set(i) for i in body["items"]] == [{"id", "status"}] * 2
+    assert body["next_cursor"]
+    # different fieldsets are different representations
+    default = client.get("/api/applications/?cursor=&per_page=2", headers=headers)
+    assert default.headers["ETag"] != rv.headers["ETag"]
+
+
+def test_detail_projection(client, query_budget, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers, remarks="long note")
+    full = client.get(f"/api/applications/{app_id}", headers=headers)
+    assert full.get_json()["remarks"] == "long note"
+
+    with query_budget() as qc:
+        rv = client.get(f"/api/applications/{app_id}?fields=status,emp_no", headers=headers)
+    assert rv.get_json() == {"id": app_id, "emp_no": "E1", "status": "submitted"}
+    stmt = _select(qc.statements)
+    assert "applications.remarks" not in stmt and "applications.purpose" not in stmt
+    assert rv.headers["ETag"] != full.headers["ETag"]
+
+    again = client.get(f"/api/applications/{app_id}?fields=status,emp_no",
+                       headers={**headers, "If-None-Match": rv.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_unknown_field_is_rejected(client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers, remarks="long note")
+    rv = client.get("/api/applications/?fields=emp_name,password_hash", headers=headers)
+    assert rv.status_code == 400
+    assert "password_hash" in rv.get_json()["msg"]
+    assert client.get(f"/api/applications/{app_id}?fields=nope", headers=headers).status_code == 400
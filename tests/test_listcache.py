@@ -0,0 +1,117 @@
+# tests/test_listcache.py
+import time
+
+import pytest
+
+from app import db
+from app.services.listcache import ListingCache, MemoryBackend, SQLiteBackend, current_generation
+from app.services.stats import record_transition
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def app_config(request, tmp_path):
+    return {"LIST_CACHE_BACKEND": request.param, "LIST_CACHE_PATH": str(tmp_path / "cache.sqlite")}
+
+
+def test_hit_reads_only_the_generation(app, query_budget, client, auth_headers, submit_application):
+    headers = auth_headers()
+    submit_application(headers)
+    url = "/api/applications/?department=IT&status=submitted"
+
+    first = client.get(url, headers=headers)
+    with query_budget() as qc:
+        second = client.get(url, headers=headers)
+    assert qc.count == 1  # the generation counter; no listing queries
+    assert second.get_json() == first.get_json()
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert client.get(url, headers={**headers, "If-None-Match": first.headers["ETag"]}).status_code == 304
+    assert app.extensions["list_cache"].hits == 2
+
+
+def test_writes_bump_their_department_and_global(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers, department="IT")
+    it_url = "/api/applications/?department=IT&status=submitted"
+    hr_url = "/api/applications/?department=HR"
+    all_url = "/api/applications/"
+    for url in (it_url, hr_url, all_url):
+        client.get(url, headers=headers)
+    cache = app.extensions["list_cache"]
+
+    submit_application(headers, department="IT")
+    hits = cache.hits
+    assert client.get(it_url, headers=headers).get_json()["total"] == 2
+    assert client.get(all_url, headers=headers).get_json()["total"] == 2
+    assert client.get(hr_url, headers=headers).get_json()["total"] == 0
+    assert cache.hits == hits + 1  # only the HR listing was still valid
+
+    client.patch(f"/api/applications/{app_id}/verify", headers=headers, json={})
+    assert client.get(it_url, headers=headers).get_json()["total"] == 1
+
+
+def test_rolled_back_write_does_not_bump(make_app):
+    app = make_app(LIST_CACHE_BACKEND="memory")
+    with app.app_context():
+        db.create_all()
+        record_transition("IT", None, "submitted")
+        db.session.rollback()
+        assert (current_generation("IT"), current_generation()) == (0, 0)
+
+        record_transition("IT", None, "submitted")
+        record_transition("HR", None, "submitted")
+        db.session.commit()
+        assert (current_generation("IT"), current_generation()) == (1, 2)
+        db.drop_all()
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_backend_lru_and_ttl(kind, tmp_path):
+    def make(ttl):
+        if kind == "memory":
+            return MemoryBackend(maxsize=2, ttl=ttl)
+        backend = SQLiteBackend(str(tmp_path / f"c{ttl}.sqlite"), maxsize=2, ttl=ttl)
+        backend.EVICT_EVERY = 1
+        return backend
+
+    backend = make(60)
+    backend.set("a", {"v": 1})
+    time.sleep(0.01)
+    backend.set("b", {"v": 2})
+    time.sleep(0.01)
+    assert backend.get("a") == {"v": 1}  # a is now the most recently used
+    time.sleep(0.01)
+    backend.set("c", {"v": 3})
+    assert backend.get("b") is None
+    assert backend.get("a") == {"v": 1}
+
+    short = make(0.05)
+    short.set("x", {"v": 1})
+    time.sleep(0.1)
+    assert short.get("x") is None
+
+
+def test_sqlite_backend_shared_between_workers(app, tmp_path):
+    path = str(tmp_path / "shared.sqlite")
+    worker_a = ListingCache(SQLiteBackend(path))
+    worker_b = ListingCache(SQLiteBackend(path))
+
+    key = worker_a.key({"department": "IT"}, {"page": 1})
+    worker_a.set(key, {"body": {"items": []}, "etag": None})
+    assert worker_b.key({"department": "IT"}, {"page": 1}) == key
+    assert worker_b.get(key) == {"body": {"items": []}, "etag": None}
+
+
+def test_write_invalidates_other_workers_memory_caches(app):
+    worker_a = ListingCache(MemoryBackend())
+    worker_b = ListingCache(MemoryBackend())
+    it_key = worker_b.key({"department": "IT"}, {"page": 1})
+    hr_key = worker_b.key({"department": "HR"}, {"page": 1})
+    all_key = worker_b.key({}, {"page": 1})
+
+    record_transition("IT", None, "submitted")  # committed by worker A
+    db.session.commit()
+
+    assert worker_b.key({"department": "IT"}, {"page": 1}) != it_key
+    assert worker_b.key({}, {"page": 1}) != all_key
+    assert worker_b.key({"department": "HR"}, {"page": 1}) == hr_key
+    assert worker_a.key({"department": "IT"}, {"page": 1}) == worker_b.key({"department": "IT"}, {"page": 1})
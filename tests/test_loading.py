@@ -0,0 +1,70 @@
+# tests/test_loading.py
+"""
+Per-endpoint SQL budgets: statement count and ORM rows loaded.
+A change that reintroduces eager joins, N+1 lazy loads or ORM instances on
+the Core read paths fails here.
+"""
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import ActionLog, Application, Attachment, User
+
+
+@pytest.fixture
+def app(app):
+    other = User.query.one()  # the seeded admin
+    user = User(email="load@x.com", password_hash=generate_password_hash("pass"))
+    db.session.add(user)
+    db.session.flush()
+    for i in range(5):
+        a = Application(sr_no=i, purpose="p", department="IT", emp_no=f"E{i}",
+                        emp_name="n", created_by=user.id)
+        db.session.add(a)
+        db.session.flush()
+        for j in range(3):
+            db.session.add(Attachment(application_id=a.id, filename=f"f{j}.pdf",
+                                      mime_type="application/pdf", size=10))
+        for actor in (user, other, other):
+            db.session.add(ActionLog(application_id=a.id, action="x", actor_id=actor.id))
+    db.session.commit()
+    db.session.remove()
+    return app
+
+
+def test_list_budget(client, query_budget, auth_headers):
+    headers = auth_headers("load@x.com")
+    with query_budget() as qc:
+        rv = client.get("/api/applications/?per_page=3", headers=headers)
+    assert rv.status_code == 200
+    assert qc.count == 2  # page + count
+    assert not qc.loaded  # plain rows, no ORM instances
+    assert all("attachments" not in s for s in qc.statements)
+
+    with query_budget() as qc:
+        client.get("/api/applications/?cursor=&include_total=false", headers=headers)
+    assert qc.count == 1
+
+
+def test_detail_budget(client, query_budget, auth_headers):
+    headers = auth_headers("load@x.com")
+    app_id = Application.query.first().id
+    db.session.remove()
+    with query_budget() as qc:
+        rv = client.get(f"/api/applications/{app_id}", headers=headers)
+    assert rv.status_code == 200
+    assert qc.count == 1
+    assert not qc.loaded
+
+
+def test_logs_budget(client, query_budget, auth_headers):
+    headers = auth_headers("load@x.com")
+    app_id = Application.query.first().id
+    db.session.remove()
+    with query_budget() as qc:
+        rv = client.get(f"/api/applications/{app_id}/logs", headers=headers)
+    assert rv.status_code == 200
+    assert len(rv.get_json()["logs"]) == 3
+    # existence check + logs joined to their actors
+    assert qc.count == 2
+    assert not qc.loaded
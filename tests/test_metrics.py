@@ -0,0 +1,111 @@
+# tests/test_metrics.py
+import json
+import os
+import re
+import threading
+
+from app.services.metrics import Metrics, mark_process_dead
+
+
+def test_metrics_per_endpoint(client):
+    client.get("/health")
+    client.get("/health")
+    client.post("/api/auth/login", json={})
+    body = client.get("/metrics").get_data(as_text=True)
+
+    assert 'http_requests_total{endpoint="health",method="GET",status="200"} 2' in body
+    assert 'http_requests_total{endpoint="auth_bp.login",method="POST",status="400"} 1' in body
+    assert 'http_request_duration_seconds_bucket{endpoint="health",method="GET",le="+Inf"} 2' in body
+    assert 'http_request_duration_seconds_count{endpoint="auth_bp.login",method="POST"} 1' in body
+    # the scrape itself is in flight while rendering
+    assert "http_requests_in_flight 1" in body
+
+
+def test_multiprocess_merge(tmp_path, make_app):
+    app = make_app(METRICS_MULTIPROC_DIR=str(tmp_path))
+    client = app.test_client()
+    client.get("/health")
+
+    # a snapshot left by another worker that has since exited
+    other = Metrics()
+    other.requests.inc(("health", "GET", "200"), 5)
+    other.latency.observe(("health", "GET"), 0.2)
+    other.in_flight.inc()
+    snap = other.registry.snapshot()
+    snap["pid"] = 2 ** 22 + 12345  # not a live pid
+    with open(os.path.join(tmp_path, "metrics-dead.json"), "w") as fh:
+        json.dump(snap, fh)
+
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'http_requests_total{endpoint="health",method="GET",status="200"} 6' in body
+    assert 'http_request_duration_seconds_count{endpoint="health",method="GET"} 2' in body
+    # gauges from dead workers are dropped
+    assert "http_requests_in_flight 1" in body
+    # the dead worker's file was folded into the archive; totals hold
+    assert not os.path.exists(os.path.join(tmp_path, "metrics-dead.json"))
+    assert os.path.exists(os.path.join(tmp_path, "metrics-archive.json"))
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'http_requests_total{endpoint="health",method="GET",status="200"} 6' in body
+
+
+def _snapshot(pid, started, requests=1):
+    other = Metrics()
+    other.requests.inc(("health", "GET", "200"), requests)
+    other.in_flight.inc()
+    snap = other.registry.snapshot()
+    snap["pid"], snap["started"] = pid, started
+    return snap
+
+
+def test_recycled_pid_is_not_a_live_worker(tmp_path, make_app):
+    app = make_app(METRICS_MULTIPROC_DIR=str(tmp_path))
+    client = app.test_client()
+    # a live pid, but not the process that wrote the file
+    with open(os.path.join(tmp_path, f"metrics-{os.getppid()}-1.json"), "w") as fh:
+        json.dump(_snapshot(os.getppid(), -1, requests=3), fh)
+
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'http_requests_total{endpoint="health",method="GET",status="200"} 3' in body
+    assert "http_requests_in_flight 1" in body  # only the scrape itself
+    assert not os.path.exists(os.path.join(tmp_path, f"metrics-{os.getppid()}-1.json"))
+    assert os.path.exists(os.path.join(tmp_path, "metrics-archive.json"))
+
+
+def test_mark_process_dead(tmp_path):
+    for pid in (101, 102):
+        with open(os.path.join(tmp_path, f"metrics-{pid}-5.json"), "w") as fh:
+            json.dump(_snapshot(pid, 5, requests=pid), fh)
+
+    mark_process_dead(101, str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["metrics-102-5.json", "metrics-archive.json", "metrics.lock"]
+    with open(os.path.join(tmp_path, "metrics-archive.json")) as fh:
+        archive = json.load(fh)["families"]
+    assert "http_requests_in_flight" not in archive
+    assert archive["http_requests_total"]["values"] == [[["health", "GET", "200"], 101]]
+
+
+def test_scrape_during_archive_never_double_counts_or_drops(tmp_path):
+    metrics = Metrics(multiproc_dir=str(tmp_path))
+    total = re.compile(r'http_requests_total\{endpoint="health",method="GET",status="200"\} (\d+)')
+    workers = 200
+
+    def exit_workers():
+        for i in range(workers):
+            pid = 2 ** 22 + i  # not a live pid
+            path = os.path.join(tmp_path, f"metrics-{pid}-5.json")
+            with open(f"{path}.tmp", "w") as fh:
+                json.dump(_snapshot(pid, 5), fh)
+            os.replace(f"{path}.tmp", path)
+            mark_process_dead(pid, str(tmp_path))
+
+    thread = threading.Thread(target=exit_workers)
+    thread.start()
+    seen = []
+    while thread.is_alive():
+        match = total.search(metrics.exposition())
+        seen.append(int(match.group(1)) if match else 0)
+    thread.join()
+
+    assert all(n <= workers for n in seen)
+    assert seen == sorted(seen), "counter went backwards"
+    assert total.search(metrics.exposition()).group(1) == str(workers)
@@ -0,0 +1,62 @@
+# tests/test_pagination.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Application, User
+
+
+@pytest.fixture
+def app(app):
+    user = User.query.one()
+    base = datetime(2026, 1, 1)
+    for i in range(25):
+        db.session.add(Application(
+            sr_no=i,
+            purpose="p",
+            department="IT" if i % 2 else "HR",
+            emp_no=f"E{i}",
+            emp_name=f"Emp {i}",
+            created_by=user.id,
+            # every third row shares a timestamp so the id tie-break matters
+            created_at=base + timedelta(minutes=i - i % 3),
+        ))
+    db.session.commit()
+    return app
+
+
+def test_cursor_walk_matches_offset_order(client, auth_headers):
+    headers = auth_headers()
+    offset = client.get("/api/applications/?per_page=100", headers=headers).get_json()
+    expected = [a["id"] for a in offset["items"]]
+    assert offset["total"] == 25
+
+    seen, cursor = [], ""
+    while cursor is not None:
+        rv = client.get(f"/api/applications/?per_page=7&include_total=false&cursor={cursor}", headers=headers)
+        assert rv.status_code == 200
+        body = rv.get_json()
+        assert "total" not in body
+        seen.extend(a["id"] for a in body["items"])
+        cursor = body["next_cursor"]
+
+    assert seen == expected
+
+
+def test_cursor_respects_filters(client, auth_headers):
+    headers = auth_headers()
+    rv = client.get("/api/applications/?department=IT&per_page=5&cursor=", headers=headers)
+    body = rv.get_json()
+    assert body["total"] == 12
+    assert all(a["department"] == "IT" for a in body["items"])
+
+    rv2 = client.get(f"/api/applications/?department=IT&per_page=5&cursor={body['next_cursor']}", headers=headers)
+    ids = {a["id"] for a in body["items"]}
+    assert not ids & {a["id"] for a in rv2.get_json()["items"]}
+
+
+def test_invalid_cursor_rejected(client, auth_headers):
+    headers = auth_headers()
+    rv = client.get("/api/applications/?cursor=not-a-cursor", headers=headers)
+    assert rv.status_code == 400
@@ -0,0 +1,104 @@
+# tests/test_passwords.py
+import os
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import User
+from app.services.passwords import HashingBusy, PasswordHasher, get_hasher, verify_password_sync
+
+
+@pytest.fixture
+def app_config():
+    return {
+        "PASSWORD_HASH_POOL": "thread",
+        "PASSWORD_HASH_WORKERS": 1,
+        "PASSWORD_HASH_QUEUE": 0,
+        "PASSWORD_BCRYPT_ROUNDS": 4,
+    }
+
+
+@pytest.fixture
+def app(app):
+    # a user from before bcrypt: werkzeug pbkdf2 hash
+    db.session.add(User(email="old@x.com", password_hash=generate_password_hash("pass")))
+    db.session.commit()
+    return app
+
+
+def test_login_upgrades_legacy_hash(app):
+    client = app.test_client()
+    rv = client.post("/auth/login", json={"email": "old@x.com", "password": "pass"})
+    assert rv.status_code == 200
+    stored = User.query.filter_by(email="old@x.com").first().password_hash
+    assert stored.startswith("$2b$04$")
+    assert verify_password_sync("pass", stored)
+
+    assert client.post("/auth/login", json={"email": "old@x.com", "password": "pass"}).status_code == 200
+    assert client.post("/auth/login", json={"email": "old@x.com", "password": "nope"}).status_code == 401
+
+
+def test_register_hashes_with_configured_scheme(app):
+    rv = app.test_client().post("/auth/register", json={"email": "new@x.com", "password": "p" * 100})
+    assert rv.status_code == 201
+    stored = User.query.filter_by(email="new@x.com").first().password_hash
+    assert stored.startswith("$2b$04$")
+    assert verify_password_sync("p" * 100, stored)
+    assert not verify_password_sync("p" * 99, stored)
+
+
+def test_full_pool_returns_503(app):
+    hasher = get_hasher()
+    release = threading.Event()
+    started = threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    blocker = threading.Thread(target=hasher._run, args=(hold,))
+    blocker.start()
+    started.wait(5)
+    try:
+        rv = app.test_client().post("/auth/login", json={"email": "old@x.com", "password": "pass"})
+        assert rv.status_code == 503
+        assert rv.headers["Retry-After"] == "1"
+    finally:
+        release.set()
+        blocker.join()
+
+
+def test_busy_rehash_still_logs_in(app, monkeypatch):
+    hasher = get_hasher()
+    legacy = User.query.filter_by(email="old@x.com").first().password_hash
+
+    def busy(password):
+        raise HashingBusy()
+
+    monkeypatch.setattr(hasher, "hash", busy)
+    rv = app.test_client().post("/auth/login", json={"email": "old@x.com", "password": "pass"})
+    assert rv.status_code == 200
+    # the upgrade waits for a later login
+    assert User.query.filter_by(email="old@x.com").first().password_hash == legacy
+
+
+def test_broken_process_pool_is_replaced():
+    hasher = PasswordHasher(workers=1, queue_size=0, kind="process", bcrypt_rounds=4)
+    try:
+        with pytest.raises(HashingBusy):
+            hasher._run(os._exit, 1)  # the worker dies mid-job
+        assert hasher.verify("pass", hasher.hash("pass"))
+    finally:
+        hasher.shutdown()
+
+
+def test_spawned_children_do_not_build_the_app():
+    import runpy
+
+    run_py = os.path.join(os.path.dirname(__file__), "..", "run.py")
+    # what a spawn-context child does with the parent's main module
+    assert "create_app" not in runpy.run_path(run_py, run_name="__mp_main__")
+    # imported as a module (gunicorn run:app, flask --app run.py)
+    assert "app" in runpy.run_path(run_py, run_name="run")
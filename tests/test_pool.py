@@ -0,0 +1,87 @@
+# tests/test_pool.py
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+from app import db
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {
+        # file-backed sqlite gets a QueuePool, like the production engines
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'pool.db'}",
+        "SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": 1, "max_overflow": 1, "pool_timeout": 0.05},
+        "READY_PING_TTL": 60,
+    }
+
+
+def test_ready_and_stats(app):
+    client = app.test_client()
+    rv = client.get("/ready")
+    assert rv.status_code == 200
+    body = rv.get_json()
+    assert body["status"] == "ready"
+    assert body["pool"]["capacity"] == 2
+    assert body["pool"]["checked_out"] == 0
+
+
+def test_not_ready_when_saturated(app):
+    client = app.test_client()
+    telemetry = app.extensions["pool_telemetry"]
+    first = db.engine.connect()
+    second = db.engine.connect()
+    try:
+        assert telemetry.pool_stats()["overflow"] == 1
+        rv = client.get("/ready")
+        assert rv.status_code == 503
+        assert rv.get_json()["reason"] == "pool saturated"
+
+        with pytest.raises(PoolTimeout):
+            client.post("/api/auth/login", json={"email": "a@x.com", "password": "x"})
+    finally:
+        first.close()
+        second.close()
+    assert client.get("/ready").status_code == 200
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert "db_pool_checkout_timeouts_total 1" in text
+    assert _count(text, "db_pool_checkout_seconds_count") >= 1
+    assert "db_pool_capacity 2" in text
+
+
+def test_ping_is_cached(app):
+    telemetry = app.extensions["pool_telemetry"]
+    assert telemetry.ping() == (True, None)
+    stamp = telemetry._ping[2]
+    assert telemetry.ping() == (True, None)
+    assert telemetry._ping[2] == stamp
+
+
+def test_invalidations_counted(app):
+    conn = db.engine.connect()
+    conn.invalidate()
+    conn.close()
+    text = app.test_client().get("/metrics").get_data(as_text=True)
+    assert 'db_pool_invalidations_total{kind="hard"} 1' in text
+
+
+def _count(text, name):
+    [line] = [line for line in text.splitlines() if line.startswith(name + " ")]
+    return int(line.split()[1])
+
+
+def test_session_checkouts_timed_across_dispose(app):
+    client = app.test_client()
+    text = client.get("/metrics").get_data(as_text=True)
+    checkouts = _count(text, "db_pool_checkout_seconds_count")
+    opened = _count(text, "db_pool_connections_opened_total")
+    db.session.execute(db.text("SELECT 1"))
+    db.session.remove()
+    db.engine.dispose()  # a fresh pool: the next checkout opens a connection
+    db.session.execute(db.text("SELECT 1"))
+    db.session.remove()
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert _count(text, "db_pool_checkout_seconds_count") >= checkouts + 2
+    assert _count(text, "db_pool_connections_opened_total") > opened
+    assert app.extensions["pool_telemetry"].pool_stats()["checked_out"] == 0
@@ -0,0 +1,161 @@
+# tests/test_processing.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Attachment
+from app.services.processing import (
+    ProcessingPipeline, due_attachments, process_attachment, process_pending, processing_options,
+)
+from app.services.attachment_stages import mime_mismatch, sniff_mime
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {
+        # a file database: pipeline threads use their own connections
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'cris.db'}",
+        "UPLOAD_FOLDER": str(tmp_path / "uploads"),
+    }
+
+
+def _upload(client, headers, app_id, data, name):
+    rv = client.post(f"/api/applications/{app_id}/attachments?filename={name}", headers=headers, data=data)
+    assert rv.status_code == 201
+    return rv.get_json()
+
+
+PDF = b"%PDF-1.7\n" + b"x" * 5000
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+
+
+def _status(client, headers, app_id, att_id):
+    rv = client.get(f"/api/applications/{app_id}/attachments/{att_id}/processing", headers=headers)
+    assert rv.status_code == 200
+    return rv.get_json()
+
+
+def test_upload_returns_before_background_processing(app, client, auth_headers, submit_application):
+    pipeline = ProcessingPipeline(app, workers=2, poll_interval=60, **processing_options(app.config)).start()
+    app.extensions["processing"] = pipeline
+    try:
+        headers = auth_headers()
+        app_id = submit_application(headers)
+        att = _upload(client, headers, app_id, PDF, "scan.pdf")
+        assert att["processing_status"] == "pending"
+        assert pipeline.join(timeout=10)
+    finally:
+        pipeline.shutdown()
+
+    status = _status(client, headers, app_id, att["id"])
+    assert status["status"] == "ready" and status["attempts"] == 1
+    assert status["detected_mime_type"] == "application/pdf"
+    assert status["mime_mismatch"] is False and status["error"] is None
+    assert pipeline.stats()["ready"] == 1
+
+
+def test_mismatched_content_type_is_flagged(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    att = _upload(client, headers, app_id, PNG, "form.pdf")
+
+    assert process_pending(app.extensions["storage"]) == {"ready": 1, "failed": 0, "pending": 0}
+    status = _status(client, headers, app_id, att["id"])
+    assert status["detected_mime_type"] == "image/png"
+    assert status["mime_type"] == "application/pdf"
+    assert status["mime_mismatch"] is True
+
+    report = client.get("/api/admin/storage", headers=headers).get_json()
+    assert report["processing"]["counts"] == {"ready": 1}
+
+
+def test_corrupted_bytes_fail_without_retry(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    att = _upload(client, headers, app_id, PDF, "scan.pdf")
+    storage = app.extensions["storage"]
+    with open(storage.local_path(db.session.get(Attachment, att["id"]).storage_key), "wb") as f:
+        f.write(b"bit rot")
+
+    assert process_attachment(att["id"], storage) == "failed"
+    status = _status(client, headers, app_id, att["id"])
+    assert status["attempts"] == 1
+    assert status["error"].startswith("checksum mismatch")
+    assert due_attachments() == []
+
+
+def test_transient_errors_are_retried_with_backoff(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    att_id = _upload(client, headers, app_id, PDF, "scan.pdf")["id"]
+    storage = app.extensions["storage"]
+
+    def broken(fn, *args):
+        raise OSError("disk unavailable")
+
+    assert process_attachment(att_id, storage, runner=broken, backoff=60) == "pending"
+    status = _status(client, headers, app_id, att_id)
+    assert status["error"] == "OSError: disk unavailable"
+    assert status["next_attempt_at"] is not None
+    assert due_attachments() == []  # not before the backoff
+    assert due_attachments(now=datetime.utcnow() + timedelta(seconds=61)) == [att_id]
+
+    assert process_attachment(att_id, storage, runner=broken, backoff=0) is None  # still waiting
+    db.session.execute(Attachment.__table__.update().values(processing_due_at=None))
+    db.session.commit()
+    assert process_attachment(att_id, storage, runner=broken, max_attempts=2) == "failed"
+    assert _status(client, headers, app_id, att_id)["attempts"] == 2
+
+
+def test_abandoned_claim_is_taken_over(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    att_id = _upload(client, headers, app_id, PDF, "scan.pdf")["id"]
+    storage = app.extensions["storage"]
+    table = Attachment.__table__
+    db.session.execute(table.update().values(
+        processing_status="processing", processing_attempts=1, processing_due_at=datetime.utcnow() + timedelta(hours=1),
+    ))
+    db.session.commit()
+    assert process_attachment(att_id, storage) is None  # lease still held
+
+    db.session.execute(table.update().values(processing_due_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+    assert process_attachment(att_id, storage) == "ready"
+    assert _status(client, headers, app_id, att_id)["attempts"] == 2
+
+
+def test_process_pool_executor(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    att_id = _upload(client, headers, app_id, PDF, "scan.pdf")["id"]
+    pipeline = ProcessingPipeline(app, workers=1, executor="process", **processing_options(app.config))
+    try:
+        assert pipeline.run_one(att_id) == "ready"
+        # unpickling run_stages did not pull Flask or SQLAlchemy into the worker
+        loaded = "[m for m in ('flask', 'sqlalchemy', 'app.models') if m in __import__('sys').modules]"
+        assert pipeline._pool.submit(eval, loaded).result() == []
+    finally:
+        pipeline.shutdown()
+    assert _status(client, headers, app_id, att_id)["detected_mime_type"] == "application/pdf"
+
+
+def test_status_endpoint_404(client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    assert client.get(f"/api/applications/{app_id}/attachments/nope/processing", headers=headers).status_code == 404
+
+
+def test_sniffing():
+    assert sniff_mime(b"") is None
+    assert sniff_mime("naïve,csv\n".encode()[:3]) == "text/plain"  # cut inside a character
+    assert sniff_mime(b"\x00\x01\x02") is None
+    assert sniff_mime(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+    assert not mime_mismatch("application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                             "application/zip")
+    assert not mime_mismatch("text/csv; charset=utf-8", "text/plain")
+    assert not mime_mismatch("application/octet-stream", "image/png")
+    assert mime_mismatch("application/pdf", "text/plain")
+    with pytest.raises(ValueError):
+        processing_options({"PROCESSING_STAGES": "checksum,compress"})
@@ -0,0 +1,63 @@
+# tests/test_role_cache.py
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import User
+
+
+@pytest.fixture
+def app(app):
+    db.session.add(User(email="ops@x.com", password_hash=generate_password_hash("pass"), role="admin"))
+    db.session.commit()
+    return app
+
+
+def test_admin_check_served_from_cache(client, query_budget, auth_headers, submit_application):
+    headers = auth_headers()
+    first, second = submit_application(headers), submit_application(headers)
+    client.patch(f"/api/applications/{first}/verify", headers=headers)
+
+    with query_budget() as qc:
+        rv = client.patch(f"/api/applications/{second}/verify", headers=headers)
+    assert rv.status_code == 200
+    assert not [s for s in qc.statements if "FROM users" in s]
+
+
+def test_demote_revokes_outstanding_token(client, auth_headers, submit_application):
+    root = auth_headers()
+    ops = auth_headers("ops@x.com")
+    app_id = submit_application(ops)
+    ops_id = User.query.filter_by(email="ops@x.com").first().id
+
+    rv = client.post("/api/admin/demote", json={"user_id": ops_id, "role": "user"}, headers=root)
+    assert rv.status_code == 200
+    assert User.query.get(ops_id).token_version == 1
+
+    # the old token still claims admin, but its version is stale
+    rv = client.patch(f"/api/applications/{app_id}/verify", headers=ops)
+    assert rv.status_code == 403
+
+    # a fresh login carries the new role and version
+    rv = client.patch(f"/api/applications/{app_id}/verify", headers=auth_headers("ops@x.com"))
+    assert rv.status_code == 403
+    rv = client.post("/api/admin/promote", json={"user_id": ops_id, "role": "admin"}, headers=root)
+    assert rv.status_code == 200
+    rv = client.patch(f"/api/applications/{app_id}/verify", headers=auth_headers("ops@x.com"))
+    assert rv.status_code == 200
+
+
+def test_role_required_fails_closed(client, monkeypatch, auth_headers):
+    import app.utils as utils
+
+    app = client.application
+    app.add_url_rule("/_admin_only", "admin_only", utils.role_required("admin")(lambda: "ok"))
+    headers = auth_headers()
+    assert client.get("/_admin_only", headers=headers).status_code == 200
+
+    def broken(claims, user_id):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(utils, "resolve_role", broken)
+    # the token still claims admin, but the role cannot be verified
+    assert client.get("/_admin_only", headers=headers).status_code == 403
@@ -0,0 +1,130 @@
+# tests/test_s3_storage.py
+import hashlib
+import os
+import threading
+import time
+import urllib.request
+
+import pytest
+
+moto_server = pytest.importorskip("moto.server")
+
+from app.services.blobs import collect_garbage
+from app.services.storage import S3Storage
+
+PART = 5 * 1024 * 1024  # S3's minimum part size
+BIG = os.urandom(2 * PART + 12345)
+
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def app_config(tmp_path, s3_endpoint):
+    return {
+        "UPLOAD_FOLDER": str(tmp_path / "spool"),
+        "STORAGE_BACKEND": "s3",
+        "S3_BUCKET": f"cris-{os.urandom(4).hex()}",
+        "S3_REGION": "us-east-1",
+        "S3_ENDPOINT_URL": s3_endpoint,
+        "S3_ACCESS_KEY": "test",
+        "S3_SECRET_KEY": "test",
+        "S3_ADDRESSING_STYLE": "path",
+        "S3_MULTIPART_THRESHOLD": PART,
+        "S3_MULTIPART_CHUNKSIZE": PART,
+        "S3_MAX_CONCURRENCY": 4,
+    }
+
+
+@pytest.fixture
+def app(app):
+    storage = app.extensions["storage"]
+    storage.client.create_bucket(Bucket=app.config["S3_BUCKET"])
+    yield app
+    storage.close()
+
+
+def _fetch(url, **headers):
+    with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as resp:
+        return resp.status, resp.headers, resp.read()
+
+
+def test_large_upload_goes_up_in_parallel_parts(app, client, auth_headers, submit_application):
+    storage = app.extensions["storage"]
+    assert isinstance(storage, S3Storage)
+    parts = []
+    storage.client.meta.events.register(
+        "before-call.s3.UploadPart", lambda **kw: parts.append(threading.current_thread().name)
+    )
+    headers = auth_headers()
+    app_id = submit_application(headers)
+
+    rv = client.post(f"/api/applications/{app_id}/attachments?filename=scan été.pdf", headers=headers, data=BIG)
+    assert rv.status_code == 201
+    att = rv.get_json()
+    assert len(parts) == 3
+    assert len(set(parts)) > 1  # parts were sent from several pool threads
+    digest = hashlib.sha256(BIG).hexdigest()
+    assert [k for k, _ in storage.iter_keys()] == [digest]
+    assert os.listdir(os.path.join(storage.spool.root, ".tmp")) == []
+
+    rv = client.get(f"/api/applications/{app_id}/attachments/{att['id']}", headers=headers)
+    assert rv.status_code == 302
+    assert rv.headers["Cache-Control"] == "private, no-store"
+    status, resp_headers, body = _fetch(rv.headers["Location"])
+    assert status == 200 and body == BIG
+    assert resp_headers["Content-Type"] == "application/pdf"
+    assert "filename*=UTF-8''scan%20%C3%A9t%C3%A9.pdf" in resp_headers["Content-Disposition"]
+
+    status, _, body = _fetch(rv.headers["Location"], Range="bytes=100-199")
+    assert status == 206 and body == BIG[100:200]
+
+
+def test_small_upload_and_dedup(app, client, auth_headers, submit_application):
+    storage = app.extensions["storage"]
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    for _ in range(2):
+        assert client.post(f"/api/applications/{app_id}/attachments?filename=a.txt",
+                           headers=headers, data=b"hello").status_code == 201
+    assert len(list(storage.iter_keys())) == 1
+    assert storage.open(hashlib.sha256(b"hello").hexdigest()).read() == b"hello"
+
+
+def test_resumable_upload_into_bucket(app, client, auth_headers, submit_application):
+    storage = app.extensions["storage"]
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    rv = client.post(f"/api/applications/{app_id}/uploads", headers=headers,
+                     json={"filename": "big.bin", "size": len(BIG)})
+    url = f"/api/applications/{app_id}/uploads/{rv.get_json()['id']}"
+    for start in range(0, len(BIG), 4 * 1024 * 1024):
+        chunk = BIG[start:start + 4 * 1024 * 1024]
+        assert client.put(url, headers={**headers, "Upload-Offset": str(start)}, data=chunk).status_code == 200
+
+    rv = client.post(f"{url}/complete", headers=headers)
+    assert rv.status_code == 201
+    assert storage.exists(hashlib.sha256(BIG).hexdigest())
+    assert list(storage.iter_sessions()) == []
+
+
+def test_gc_removes_objects_and_stale_multipart_uploads(app, client, auth_headers, submit_application):
+    storage = app.extensions["storage"]
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    rv = client.post(f"/api/applications/{app_id}/attachments?filename=a.txt", headers=headers, data=b"bye")
+    client.delete(f"/api/applications/{app_id}/attachments/{rv.get_json()['id']}", headers=headers)
+    storage.client.create_multipart_upload(Bucket=storage.bucket, Key=storage.prefix + "crashed")
+
+    result = collect_garbage(storage, grace=0)
+    assert result["blobs_removed"] == 1
+    assert result["staged_removed"] == 1
+    assert list(storage.iter_keys()) == []
+    assert storage.client.list_multipart_uploads(Bucket=storage.bucket).get("Uploads", []) == []
+    assert not storage.delete("missing", older_than=time.time())
@@ -0,0 +1,173 @@
+# tests/test_search.py
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture(params=["fts5", "memory"])
+def app_config(request):
+    return {"SEARCH_BACKEND": request.param}
+
+
+def _search(client, headers, query):
+    rv = client.get(f"/api/applications/search?{query}", headers=headers)
+    assert rv.status_code == 200, rv.get_json()
+    return rv.get_json()
+
+
+def test_prefix_match_and_ranking(client, auth_headers, submit_application):
+    headers = auth_headers()
+    by_name = submit_application(headers, emp_name="Rahul Sharma")
+    by_remark = submit_application(headers, emp_name="Anita Rao", remarks="forwarded by rahul")
+    submit_application(headers, emp_name="Someone Else")
+
+    body = _search(client, headers, "q=rah")
+    assert [i["id"] for i in body["items"]] == [by_name, by_remark]
+    assert body["items"][0]["score"] > body["items"][1]["score"]
+    assert body["next_cursor"] is None
+
+
+def test_all_words_must_match_and_filters(client, auth_headers, submit_application):
+    headers = auth_headers()
+    laptop = submit_application(headers, emp_name="Ravi", purpose="laptop purchase", department="IT")
+    submit_application(headers, emp_name="Ravi", purpose="conference travel", department="IT")
+    hr = submit_application(headers, emp_name="Ravi", purpose="laptop repair", department="HR")
+
+    assert {i["id"] for i in _search(client, headers, "q=ravi+laptop")["items"]} == {laptop, hr}
+    assert [i["id"] for i in _search(client, headers, "q=ravi+laptop&department=HR")["items"]] == [hr]
+    assert _search(client, headers, "q=ravi+laptop&status=approved")["items"] == []
+
+
+def test_keyset_pagination(client, auth_headers, submit_application):
+    headers = auth_headers()
+    ids = {submit_application(headers, emp_name=f"Kumar {i}", purpose="kumar " * (i + 1)) for i in range(5)}
+
+    seen, cursor = [], None
+    while True:
+        query = "q=kumar&per_page=2" + (f"&cursor={cursor}" if cursor else "")
+        body = _search(client, headers, query)
+        seen.extend(i["id"] for i in body["items"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert len(seen) == 5
+    assert set(seen) == ids
+
+
+def test_batch_submit_is_indexed(client, auth_headers):
+    headers = auth_headers()
+    _search(client, headers, "q=zed")  # builds the memory index before the writes
+    rows = [{"sr_no": i, "purpose": "p", "department": "IT", "emp_no": f"E{i}", "emp_name": f"Zed {i}"}
+            for i in range(3)]
+    assert client.post("/api/applications/", json=rows, headers=headers).status_code == 201
+    assert len(_search(client, headers, "q=zed")["items"]) == 3
+
+
+def test_bad_requests(client, auth_headers):
+    headers = auth_headers()
+    assert client.get("/api/applications/search?q=", headers=headers).status_code == 400
+    assert client.get("/api/applications/search?q=%21%21", headers=headers).status_code == 400
+    assert client.get("/api/applications/search?q=a&cursor=zzz", headers=headers).status_code == 400
+
+
+def test_rebuild(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    submit_application(headers, emp_name="Meera")
+    submit_application(headers, emp_name="Mohan")
+    assert app.extensions["search"].rebuild() == 2
+    assert len(_search(client, headers, "q=m")["items"]) == 2
+
+
+def test_pages_are_stable_across_writes(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    ids = {submit_application(headers, emp_name=f"Kumar {i}", purpose="kumar " * (i + 1)) for i in range(5)}
+
+    body = _search(client, headers, "q=kumar&per_page=2")
+    seen = [i["id"] for i in body["items"]]
+    # new, better-matching rows shift every score of the live ranking
+    for i in range(3):
+        submit_application(headers, emp_name="Kumar Kumar", purpose="kumar " * 20)
+    cursor = body["next_cursor"]
+    while cursor:
+        body = _search(client, headers, f"q=kumar&per_page=2&cursor={cursor}")
+        seen.extend(i["id"] for i in body["items"])
+        cursor = body["next_cursor"]
+    assert len(seen) == 5 and set(seen) == ids
+
+    # without the snapshot (expired, other worker) the cursor pages by offset
+    app.extensions["search_snapshots"]._items.clear()
+    first = _search(client, headers, "q=kumar&per_page=3")
+    app.extensions["search_snapshots"]._items.clear()
+    second = _search(client, headers, f"q=kumar&per_page=3&cursor={first['next_cursor']}")
+    assert len(second["items"]) == 3 and second["next_cursor"] is not None
+
+    rv = client.get(f"/api/applications/search?q=other&cursor={first['next_cursor']}", headers=headers)
+    assert rv.status_code == 400
+
+
+def test_truncated_snapshot_continues_live(app, client, auth_headers, submit_application):
+    app.config["SEARCH_SNAPSHOT_SIZE"] = 3
+    headers = auth_headers()
+    ids = {submit_application(headers, emp_name=f"Kumar {i}", purpose="kumar " * (i + 1)) for i in range(5)}
+    seen, cursor = [], None
+    while True:
+        body = _search(client, headers, "q=kumar&per_page=2" + (f"&cursor={cursor}" if cursor else ""))
+        seen.extend(i["id"] for i in body["items"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert len(seen) == 5 and set(seen) == ids
+
+
+def test_memory_rebuild_runs_once(app, client, auth_headers, submit_application):
+    backend = app.extensions["search"]
+    if backend.name != "memory":
+        pytest.skip("memory backend only")
+    headers = auth_headers()
+    submit_application(headers, emp_name="Meera")
+    _search(client, headers, "q=meera")
+
+    calls = []
+    real = backend.rebuild
+    started, release = threading.Event(), threading.Event()
+
+    def slow_rebuild():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return real()
+
+    backend.rebuild = slow_rebuild
+    backend.refresh = 0  # stale on every request
+    try:
+        _search(client, headers, "q=meera")  # starts one background refresh
+        assert started.wait(5)
+        for _ in range(3):
+            # the stale index keeps serving; no second rebuild starts
+            assert len(_search(client, headers, "q=meera")["items"]) == 1
+    finally:
+        release.set()
+    time.sleep(0.2)
+    assert len(calls) == 1
+
+
+def test_memory_index_warmed_in_background(app, client, auth_headers, submit_application):
+    backend = app.extensions["search"]
+    if backend.name != "memory":
+        pytest.skip("memory backend only")
+    headers = auth_headers()
+    submit_application(headers, emp_name="Meera")
+    backend.warm(app)
+    assert backend._start_refresh(app).wait(5)
+
+    calls = []
+    real = backend.rebuild
+    backend.rebuild = lambda: calls.append(1) or real()
+    assert len(_search(client, headers, "q=meera")["items"]) == 1
+    assert calls == []  # the request used the warmed index
+
+
+def test_auto_backend_does_not_connect(make_app):
+    app = make_app(SEARCH_BACKEND="auto", SQLALCHEMY_DATABASE_URI="sqlite:////nonexistent/dir/cris.db")
+    assert app.extensions["search"].name == "fts5"
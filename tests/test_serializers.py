@@ -0,0 +1,53 @@
+# tests/test_serializers.py
+import pytest
+
+from app import db
+from app.models import ActionLog, Application
+
+
+@pytest.fixture
+def app_config():
+    return {"LIST_CACHE_BACKEND": "none"}
+
+
+def _setup(client, headers):
+    rv = client.post("/api/applications/", headers=headers, json={
+        "sr_no": 7, "purpose": "p", "department": "IT", "emp_no": "E7", "emp_name": "n",
+        "designation": None, "remarks": "r",
+    })
+    app_id = rv.get_json()["id"]
+    client.patch(f"/api/applications/{app_id}/verify", headers=headers, json={"comment": "ok"})
+    # a log entry without an actor exercises the outer join
+    db.session.add(ActionLog(application_id=app_id, action="note", actor_id=None))
+    db.session.commit()
+    return app_id
+
+
+def test_rows_match_to_dict(client, auth_headers):
+    headers = auth_headers()
+    app_id = _setup(client, headers)
+    db.session.expire_all()
+    model = db.session.get(Application, app_id)
+
+    assert client.get(f"/api/applications/{app_id}", headers=headers).get_json() == model.to_dict()
+
+    listed = client.get("/api/applications/?fields=" + ",".join(model.to_dict()), headers=headers)
+    assert listed.get_json()["items"] == [model.to_dict()]
+    listed = client.get("/api/applications/?cursor=", headers=headers)
+    assert listed.get_json()["items"] == [{k: v for k, v in model.to_dict().items() if k != "remarks"}]
+
+    logs = ActionLog.query.filter_by(application_id=app_id).order_by(ActionLog.created_at.asc()).all()
+    body = client.get(f"/api/applications/{app_id}/logs", headers=headers).get_json()
+    assert body["logs"] == [log.to_dict() for log in logs]
+    assert [log["actor_role"] for log in body["logs"]] == ["admin", "admin", None]
+
+
+def test_read_views_build_no_orm_instances(client, query_budget, auth_headers):
+    headers = auth_headers()
+    app_id = _setup(client, headers)
+    with query_budget() as qc:
+        client.get("/api/applications/", headers=headers)
+        client.get(f"/api/applications/{app_id}", headers=headers)
+        client.get(f"/api/applications/{app_id}/logs", headers=headers)
+    # only the token's user is loaded by the auth check
+    assert set(qc.loaded) <= {"User"}
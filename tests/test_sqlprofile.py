@@ -0,0 +1,103 @@
+# tests/test_sqlprofile.py
+import logging
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.models import ActionLog, Application, User
+from app.services.sqlprofile import QueryProfile
+
+
+@pytest.fixture
+def app_config():
+    return {"SQL_PROFILE_ENABLED": True}
+
+
+@pytest.fixture
+def app(app):
+    @app.route("/_n_plus_one")
+    def n_plus_one():
+        # deliberately lazy-loads each application's logs in a loop
+        return {"logs": sum(len(a.action_logs) for a in Application.query.all())}
+
+    user = User.query.one()
+    for i in range(4):
+        a = Application(sr_no=i, purpose="p", department="IT", emp_no=f"E{i}",
+                        emp_name="n", created_by=user.id)
+        db.session.add(a)
+        db.session.flush()
+        db.session.add(ActionLog(application_id=a.id, action="created", actor_id=user.id))
+    db.session.commit()
+    db.session.remove()
+    return app
+
+
+def test_profile_headers(client, auth_headers):
+    rv = client.get("/api/applications/?per_page=2", headers=auth_headers())
+    assert rv.status_code == 200
+    assert int(rv.headers["X-SQL-Count"]) >= 2
+    assert float(rv.headers["X-SQL-Time-ms"]) >= 0
+    assert "X-SQL-N-Plus-One" not in rv.headers
+
+
+def test_n_plus_one_flagged(client, caplog):
+    with caplog.at_level(logging.INFO, logger="app.services.sqlprofile"):
+        rv = client.get("/_n_plus_one")
+    assert rv.get_json() == {"logs": 4}
+    assert rv.headers["X-SQL-N-Plus-One"] == "1"
+    record = [r for r in caplog.records if r.name == "app.services.sqlprofile"][-1]
+    assert record.levelno == logging.WARNING
+    assert record.sql_n_plus_one[0]["times"] == 4
+    assert "action_logs" in record.sql_n_plus_one[0]["sql"]
+
+
+def test_profile_slowest_and_repeats():
+    profile = QueryProfile(n_plus_one_threshold=2, keep_slowest=2)
+    for stmt, seconds in [("a", 0.1), ("b", 0.3), ("a", 0.2), ("c", 0.05)]:
+        profile.record(stmt, seconds)
+    assert profile.count == 4
+    assert [s for _, s in profile.slowest] == ["b", "a"]
+    assert profile.repeated() == [("a", 2)]
+    assert profile.summary()["sql_ms"] == pytest.approx(650.0)
+
+
+def test_failed_statement_is_popped(app):
+    with app.app_context(), QueryProfile(db.engine) as profile, db.engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        conn.execute(text("SELECT 1"))
+        assert conn.info[profile._key] == []
+    assert profile.count == 2
+
+    # same for the per-request profiler's listeners
+    with app.app_context(), db.engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        assert conn.info["_sqlprofile_start"] == []
+
+
+def test_query_budget_lists(app, client, query_budget, auth_headers):
+    headers = auth_headers()
+    with app.app_context():
+        with query_budget(max_statements=2):
+            rv = client.get("/api/applications/?per_page=3", headers=headers)
+    assert rv.status_code == 200
+
+
+def test_query_budget_logs(app, client, query_budget, auth_headers):
+    headers = auth_headers()
+    with app.app_context():
+        app_id = Application.query.first().id
+        db.session.remove()
+        with query_budget(max_statements=3):
+            rv = client.get(f"/api/applications/{app_id}/logs", headers=headers)
+    assert rv.status_code == 200
+
+
+def test_query_budget_catches_n_plus_one(app, client, query_budget):
+    with app.app_context():
+        with pytest.raises(AssertionError, match="likely N\\+1"):
+            with query_budget():
+                client.get("/_n_plus_one")
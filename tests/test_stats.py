@@ -0,0 +1,34 @@
+# tests/test_stats.py
+from app import db
+from app.models import ApplicationStat
+from app.services.stats import rebuild_stats
+
+
+def test_stats_follow_workflow(client, auth_headers, submit_application):
+    headers = auth_headers()
+    a = submit_application(headers, department="IT")
+    submit_application(headers, department="IT")
+    submit_application(headers, department="HR")
+    client.patch(f"/api/applications/{a}/verify", headers=headers)
+    client.patch(f"/api/applications/{a}/approve", headers=headers)
+
+    body = client.get("/api/applications/stats", headers=headers).get_json()
+    assert body["total"] == 3
+    assert body["by_department"] == {"HR": 1, "IT": 2}
+    assert body["by_status"] == {"submitted": 2, "verified": 0, "approved": 1}
+
+    it_only = client.get("/api/applications/stats?department=IT", headers=headers).get_json()
+    assert it_only["total"] == 2
+
+
+def test_rebuild_reconciles(client, auth_headers, submit_application):
+    headers = auth_headers()
+    submit_application(headers, department="IT")
+    submit_application(headers, department="IT")
+    ApplicationStat.query.delete()
+    db.session.add(ApplicationStat(department="Ghost", status="submitted", total=7))
+    db.session.commit()
+
+    assert rebuild_stats() == 1
+    body = client.get("/api/applications/stats", headers=headers).get_json()
+    assert body["stats"] == [{"department": "IT", "status": "submitted", "total": 2}]
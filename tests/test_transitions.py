@@ -0,0 +1,80 @@
+# tests/test_transitions.py
+from app import db
+from app.models import ActionLog, Application
+
+
+def test_verify_is_single_guarded_update(client, query_budget, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    with query_budget() as qc:
+        rv = client.patch(f"/api/applications/{app_id}/verify", json={"note": "ok"}, headers=headers)
+    assert rv.status_code == 200
+    app_reads = [s for s in qc.statements if s.lstrip().upper().startswith("SELECT") and "applications" in s]
+    assert app_reads == []
+    assert sum(1 for s in qc.statements if s.startswith("UPDATE applications")) == 1
+    assert sum(1 for s in qc.statements if s.startswith("INSERT INTO action_logs")) == 1
+
+
+def test_missing_and_wrong_state(client, auth_headers, submit_application):
+    headers = auth_headers()
+    assert client.patch("/api/applications/nope/verify", headers=headers).status_code == 404
+
+    app_id = submit_application(headers)
+    rv = client.patch(f"/api/applications/{app_id}/approve", headers=headers)
+    assert rv.status_code == 400
+    assert rv.get_json() == {"msg": "invalid transition", "from": "submitted", "to": "approved"}
+
+
+def test_log_failure_rolls_back_status(client, monkeypatch, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+
+    def boom(**kwargs):
+        raise RuntimeError("audit down")
+
+    monkeypatch.setattr("app.services.workflow.create_action_log", boom)
+    rv = client.patch(f"/api/applications/{app_id}/verify", headers=headers)
+    assert rv.status_code == 500
+    db.session.expire_all()
+    assert db.session.get(Application, app_id).status == "submitted"
+    assert ActionLog.query.filter_by(application_id=app_id, action="verified").count() == 0
+
+
+def test_bulk_transition(client, query_budget, auth_headers, submit_application):
+    headers = auth_headers()
+    ids = [submit_application(headers) for _ in range(4)]
+    client.patch(f"/api/applications/{ids[0]}/verify", headers=headers)
+
+    with query_budget() as qc:
+        rv = client.post("/api/applications/bulk-transition",
+                         json={"ids": ids + ["ghost"], "to": "verified", "note": "batch"},
+                         headers=headers)
+    assert rv.status_code == 200
+    body = rv.get_json()
+    assert body["transitioned"] == ids[1:]
+    assert {s["id"]: s["reason"] for s in body["skipped"]} == {ids[0]: "invalid transition", "ghost": "not found"}
+    assert sum(1 for s in qc.statements if s.startswith("UPDATE applications")) == 1
+    assert sum(1 for s in qc.statements if s.startswith("INSERT INTO action_logs")) == 1
+
+    assert ActionLog.query.filter_by(action="verified", comment="batch").count() == 3
+    stats = client.get("/api/applications/stats", headers=headers).get_json()
+    assert stats["by_status"] == {"submitted": 0, "verified": 4}
+
+
+def test_bulk_transition_db_error_is_not_echoed(client, monkeypatch, auth_headers):
+    def boom(*args, **kwargs):
+        raise RuntimeError("ORA-00060: deadlock detected while waiting for resource on APPLICATIONS")
+
+    monkeypatch.setattr("app.routes.applications.bulk_transition", boom)
+    rv = client.post("/api/applications/bulk-transition", json={"ids": ["a"], "to": "verified"},
+                     headers=auth_headers())
+    assert rv.status_code == 500
+    assert rv.get_json() == {"msg": "db error"}
+
+
+def test_bulk_transition_validation(client, auth_headers):
+    headers = auth_headers()
+    rv = client.post("/api/applications/bulk-transition", json={"ids": ["a"], "to": "rejected"}, headers=headers)
+    assert rv.status_code == 400
+    rv = client.post("/api/applications/bulk-transition", json={"ids": [], "to": "approved"}, headers=headers)
+    assert rv.status_code == 400
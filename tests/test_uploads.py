@@ -0,0 +1,190 @@
+# tests/test_uploads.py
+import hashlib
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import Attachment, UploadSession, User
+from app.services.uploads import expire_sessions
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {"UPLOAD_FOLDER": str(tmp_path / "uploads"), "STORAGE_CHUNK_SIZE": 16 * 1024}
+
+
+DATA = os.urandom(300_000)
+SHA = hashlib.sha256(DATA).hexdigest()
+
+
+def _create(client, headers, app_id, **extra):
+    rv = client.post(f"/api/applications/{app_id}/uploads", headers=headers,
+                     json={"filename": "big.pdf", "size": len(DATA), **extra})
+    assert rv.status_code == 201, rv.get_json()
+    return f"/api/applications/{app_id}/uploads/{rv.get_json()['id']}"
+
+
+def test_resume_after_interrupted_chunk(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    url = _create(client, headers, app_id, sha256=SHA)
+
+    rv = client.put(url, headers={**headers, "Upload-Offset": "0"}, data=DATA[:100_000])
+    assert rv.get_json() == {"offset": 100_000, "size": len(DATA), "complete": False}
+
+    # the connection drops after 50k of the next 100k chunk: what arrived is kept
+    class Broken(io.BytesIO):
+        def read(self, n=-1):
+            chunk = super().read(n)
+            if not chunk:
+                raise ConnectionResetError("client went away")
+            return chunk
+
+    with pytest.raises(ConnectionResetError):
+        client.put(url, headers={**headers, "Content-Range": f"bytes 100000-199999/{len(DATA)}"},
+                   input_stream=Broken(DATA[100_000:150_000]),
+                   environ_overrides={"wsgi.input_terminated": True})
+
+    rv = client.get(url, headers=headers)
+    offset = rv.get_json()["offset"]
+    assert offset == 150_000 and rv.headers["Upload-Offset"] == "150000"
+
+    rv = client.put(url, headers={**headers, "Content-Range": f"bytes {offset}-{len(DATA) - 1}/{len(DATA)}"},
+                    data=DATA[offset:])
+    assert rv.get_json()["complete"] is True
+
+    rv = client.post(f"{url}/complete", headers=headers, json={})
+    assert rv.status_code == 201
+    att = rv.get_json()
+    assert att["size"] == len(DATA) and att["filename"] == "big.pdf"
+    assert db.session.get(Attachment, att["id"]).digest == SHA
+    assert client.get(rv.headers["Location"], headers=headers).data == DATA
+    assert UploadSession.query.count() == 0
+    assert client.get(url, headers=headers).status_code == 404
+
+
+def test_offset_conflicts_and_overruns(client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    url = _create(client, headers, app_id)
+    client.put(url, headers={**headers, "Upload-Offset": "0"}, data=DATA[:1000])
+
+    rv = client.put(url, headers={**headers, "Upload-Offset": "0"}, data=DATA[:1000])
+    assert rv.status_code == 409
+    assert rv.get_json()["offset"] == 1000
+    assert client.put(url, headers=headers, data=b"x").status_code == 400
+    rv = client.put(url, headers={**headers, "Content-Range": "bytes 1000-1999/5"}, data=DATA[1000:2000])
+    assert rv.status_code == 400
+
+    rv = client.put(url, headers={**headers, "Upload-Offset": "1000"}, data=DATA[1000:] + b"extra")
+    assert rv.status_code == 413
+    assert client.post(f"{url}/complete", headers=headers).status_code == 409
+
+
+def test_checksum_is_verified_before_commit(client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    url = _create(client, headers, app_id)
+    client.put(url, headers={**headers, "Upload-Offset": "0"}, data=DATA)
+
+    rv = client.post(f"{url}/complete", headers=headers, json={"sha256": "0" * 64})
+    assert rv.status_code == 422
+    assert rv.get_json()["sha256"] == SHA
+    assert Attachment.query.count() == 0
+    assert UploadSession.query.count() == 0
+
+
+def test_completion_on_another_worker_rehashes(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    url = _create(client, headers, app_id, sha256=SHA)
+    client.put(url, headers={**headers, "Upload-Offset": "0"}, data=DATA)
+    app.extensions["upload_digests"]._items.clear()  # as if served by a different worker
+
+    rv = client.post(f"{url}/complete", headers=headers)
+    assert rv.status_code == 201
+
+
+def test_sessions_are_private_and_validated(client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    url = _create(client, headers, app_id)
+    db.session.add(User(email="other@x.com", password_hash=generate_password_hash("pass"), role="user"))
+    db.session.commit()
+    other = auth_headers("other@x.com")
+    assert client.get(url, headers=other).status_code == 404
+
+    base = f"/api/applications/{app_id}/uploads"
+    assert client.post(base, headers=headers, json={"filename": "a"}).status_code == 400
+    assert client.post(base, headers=headers, json={"filename": "a", "size": 1, "sha256": "zz"}).status_code == 400
+    assert client.post(base, headers=headers, json={"filename": "a", "size": 10 ** 12}).status_code == 413
+    assert client.post("/api/applications/missing/uploads", headers=headers,
+                       json={"filename": "a", "size": 1}).status_code == 404
+
+    assert client.delete(url, headers=headers).status_code == 204
+    assert UploadSession.query.count() == 0
+
+
+def test_expired_sessions_are_removed(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    url = _create(client, headers, app_id)
+    client.put(url, headers={**headers, "Upload-Offset": "0"}, data=DATA[:10])
+    storage = app.extensions["storage"]
+    upload_id = url.rsplit("/", 1)[1]
+
+    assert expire_sessions(storage) == 0
+    assert expire_sessions(storage, now=datetime.utcnow() + timedelta(days=2)) == 1
+    assert storage.session_size(upload_id) is None
+    assert client.get(url, headers=headers).status_code == 404
+
+
+def test_failed_commit_keeps_the_session(app, client, monkeypatch, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    url = _create(client, headers, app_id, sha256=SHA)
+    client.put(url, headers={**headers, "Upload-Offset": "0"}, data=DATA)
+    storage = app.extensions["storage"]
+    upload_id = url.rsplit("/", 1)[1]
+
+    commit = db.session.commit
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database went away")
+        commit()
+
+    monkeypatch.setattr(db.session, "commit", flaky)
+    assert client.post(f"{url}/complete", headers=headers).status_code == 500
+    assert storage.session_size(upload_id) == len(DATA)
+    assert client.get(url, headers=headers).status_code == 200
+
+    rv = client.post(f"{url}/complete", headers=headers)
+    assert rv.status_code == 201
+    assert storage.session_size(upload_id) is None
+    assert storage.open(SHA).read() == DATA
+
+
+def test_expiry_is_pushed_out_at_most_every_half_ttl(app, client, auth_headers, submit_application):
+    headers = auth_headers()
+    app_id = submit_application(headers)
+    url = _create(client, headers, app_id)
+    upload_id = url.rsplit("/", 1)[1]
+    created = db.session.get(UploadSession, upload_id).expires_at
+
+    client.put(url, headers={**headers, "Upload-Offset": "0"}, data=DATA[:10])
+    db.session.expire_all()
+    assert db.session.get(UploadSession, upload_id).expires_at == created  # no write per chunk
+
+    soon = datetime.utcnow() + timedelta(hours=1)
+    db.session.execute(UploadSession.__table__.update().values(expires_at=soon))
+    db.session.commit()
+    client.put(url, headers={**headers, "Upload-Offset": "10"}, data=DATA[10:20])
+    db.session.expire_all()
+    assert db.session.get(UploadSession, upload_id).expires_at > datetime.utcnow() + timedelta(hours=23)